@@ -1,13 +1,19 @@
-from datetime import datetime, timedelta  # 导入时间工具，用于按时间统计记录
-from fastapi import APIRouter, Depends  # 导入 FastAPI 路由与依赖注入工具
-from sqlalchemy import func  # 导入聚合函数工具，用于统计数量
+from datetime import datetime, timezone  # 导入时间工具，用于解析推送量查询的时间范围
+from fastapi import APIRouter, Depends, HTTPException, Query  # 导入 FastAPI 路由、依赖注入、异常类与查询参数工具
 from sqlalchemy.orm import Session  # 导入数据库会话类型
+from app.db.pagination import keyset_page  # 导入游标分页工具
 from app.db.session import get_db  # 导入获取数据库会话的依赖函数
 from app.models.email_config import EmailConfig  # 导入邮箱配置模型
-from app.models.user import User  # 导入用户模型，用于统计平台用户
+from app.models.user import User  # 导入用户模型，用于查询近期订阅用户
 from app.models.subscription import ResearchProfile  # 导入科研订阅配置模型，用于统计研究方向覆盖
-from app.models.digest import DailyDigest  # 导入每日摘要模型，用于统计发送邮件数量
 from app.schemas.email_config import EmailConfigCreate, EmailConfigOut  # 导入邮箱配置相关模式类
+from app.services.email import invalidate_smtp_settings_cache  # 导入 SMTP 配置缓存失效函数
+from app.services.admin_stats import admin_stats  # 导入物化的管理后台统计
+from app.services.delivery_rollups import STEPS, delivery_series  # 导入推送量时间桶步长与序列读取函数
+from app.services.user_cache import user_cache  # 导入登录用户缓存，用于查看命中统计
+from app.services.summary_cache import summary_store  # 导入摘要缓存，用于查看命中统计
+from app.services.digest_renderer import digest_renderer  # 导入日报渲染器，用于查看片段缓存命中统计
+from app.services.digest_detail_cache import digest_detail_cache  # 导入日报详情响应缓存，用于查看命中统计
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])  # 创建带有前缀的路由对象，并归类到 admin 标签
@@ -49,6 +55,7 @@ def upsert_email_settings(  # 定义创建或更新邮箱配置的接口函数
     db.add(config)  # 将新配置添加到当前会话中
     db.commit()  # 提交事务将更改写入数据库
     db.refresh(config)  # 刷新对象以获取数据库生成的字段（例如自增 id）
+    invalidate_smtp_settings_cache()  # 使发送邮件时缓存的旧配置失效
     return config  # 返回新创建的邮箱配置对象
 
 
@@ -56,47 +63,57 @@ def upsert_email_settings(  # 定义创建或更新邮箱配置的接口函数
 def admin_overview(db: Session = Depends(get_db)):  # 定义管理后台总览统计接口函数，并注入数据库会话
     """
     管理后台总览统计：用户数量、订阅开关与近24小时邮件发送量
+    计数读取物化的 admin_stats 单行，并在进程内短暂缓存，不再逐项执行 COUNT
     """
-    total_users = db.query(func.count(User.id)).scalar() or 0  # 统计平台总用户数量
-    active_users = (  # 统计处于激活状态的用户数量
-        db.query(func.count(User.id))
-        .filter(User.is_active == True)
-        .scalar()
-        or 0
-    )  # 结束激活用户统计
-    subscribed_users = (  # 统计开启订阅开关的用户数量
-        db.query(func.count(User.id))
-        .filter(User.subscription_enabled == True)
-        .scalar()
-        or 0
-    )  # 结束订阅用户统计
-
-    total_profiles = db.query(func.count(ResearchProfile.id)).scalar() or 0  # 统计已配置科研订阅画像的数量
-
-    now = datetime.utcnow()  # 获取当前 UTC 时间
-    since = now - timedelta(days=1)  # 计算近 24 小时时间边界
-    daily_emails = (  # 统计近 24 小时内发送的摘要邮件数量
-        db.query(func.count(DailyDigest.id))  # 统计每日摘要记录主键数量
-        .filter(DailyDigest.sent_at >= since)  # 使用 sent_at 字段过滤近 24 小时内的记录
-        .scalar()
-        or 0
-    )  # 结束邮件统计
-
-    return {  # 返回汇总统计结果字典
-        "total_users": total_users,  # 平台用户总数
-        "active_users": active_users,  # 激活用户数量
-        "subscribed_users": subscribed_users,  # 开启订阅开关的用户数量
-        "total_profiles": total_profiles,  # 已配置科研订阅画像的数量
-        "daily_emails": daily_emails,  # 近 24 小时发送的摘要邮件数量
+    return admin_stats.overview(db)  # 返回包含 total_users、active_users、subscribed_users、total_profiles、daily_emails 的字典
+
+
+MAX_SERIES_BUCKETS = 5000  # 单次查询最多返回的时间桶数量
+
+
+def _as_utc(value: datetime) -> datetime:  # 把查询参数中的时间统一为不带时区的 UTC 时间
+    if value.tzinfo is not None:  # 如果携带了时区信息
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)  # 转换为 UTC 并去掉时区
+    return value  # 返回 UTC 时间
+
+
+@router.get("/delivery-series")  # 声明推送量时间序列接口路由
+def delivery_series_view(  # 定义推送量时间序列接口函数
+    from_: datetime = Query(..., alias="from"),  # 起始时间（含），ISO 8601 格式
+    to: datetime | None = Query(None),  # 结束时间（不含），默认当前时间
+    bucket: str = Query("day", pattern="^(hour|day)$"),  # 时间桶粒度：hour 或 day
+    db: Session = Depends(get_db),  # 注入数据库会话
+):  # 结束函数签名
+    """
+    按小时或按天返回成功推送数、失败次数与推送论文数，读取预汇总的时间桶而不扫描 daily_digests
+    """
+    start = _as_utc(from_)  # 统一起始时间为 UTC
+    end = _as_utc(to) if to is not None else datetime.utcnow()  # 统一结束时间为 UTC，默认当前时间
+    if end <= start:  # 如果时间范围为空或颠倒
+        raise HTTPException(status_code=400, detail="'to' must be later than 'from'")  # 返回 400 错误
+    if (end - start) / STEPS[bucket] > MAX_SERIES_BUCKETS:  # 如果时间桶数量超过上限
+        raise HTTPException(status_code=400, detail=f"Range too large for bucket={bucket}: at most {MAX_SERIES_BUCKETS} buckets")  # 提示缩小范围或改用更粗的粒度
+
+    items = delivery_series(db, start, end, bucket)  # 读取时间范围内的时间桶，缺失的时间桶补零
+    return {  # 返回时间序列与合计
+        "bucket": bucket,  # 时间桶粒度
+        "from": start.isoformat(),  # 起始时间（UTC）
+        "to": end.isoformat(),  # 结束时间（UTC）
+        "items": items,  # 时间桶列表
+        "totals": {name: sum(item[name] for item in items) for name in ("delivered", "failed", "papers")},  # 整个范围的合计
     }  # 结束返回字典
 
 
 @router.get("/recent-subscriptions")  # 声明近期订阅状态列表接口路由
-def recent_subscriptions(db: Session = Depends(get_db)):  # 定义近期订阅状态列表接口函数，并注入数据库会话
+def recent_subscriptions(  # 定义近期订阅状态列表接口函数
+    cursor: str | None = Query(None),  # 上一页返回的游标，为空表示第一页
+    limit: int = Query(10, ge=1, le=100),  # 每页条数，最多 100
+    db: Session = Depends(get_db),  # 注入数据库会话
+):  # 结束函数签名
     """
-    获取最近注册或更新的订阅用户列表
+    获取最近注册或更新的订阅用户列表，按 (created_at, id) 倒序做游标分页
     """
-    rows = (  # 构造查询，联合用户与科研画像信息
+    query = (  # 构造查询，联合用户与科研画像信息
         db.query(
             User.email,  # 用户邮箱字段
             User.subscription_enabled,  # 用户订阅开关字段
@@ -106,10 +123,11 @@ def recent_subscriptions(db: Session = Depends(get_db)):  # 定义近期订阅
             ResearchProfile,
             ResearchProfile.user_id == User.id,
         )  # 结束外连接条件
-        .order_by(User.created_at.desc())  # 按用户创建时间倒序，最近的用户排在最前
-        .limit(10)  # 仅返回前 10 条记录
-        .all()  # 执行查询
     )  # 结束查询表达式
+    try:  # 游标格式不合法时返回 400
+        rows, next_cursor = keyset_page(db, query, User.created_at, User.id, cursor, limit)  # 按用户创建时间倒序取一页（命中 created_at 索引）
+    except ValueError:  # 游标无法解析
+        raise HTTPException(status_code=400, detail="Invalid cursor")  # 返回 400 错误
 
     items = []  # 初始化返回列表
     for email, subscription_enabled, disciplines in rows:  # 遍历查询结果中的每一行
@@ -125,4 +143,17 @@ def recent_subscriptions(db: Session = Depends(get_db)):  # 定义近期订阅
             }  # 结束记录字典
         )  # 结束追加操作
 
-    return {"items": items}  # 返回包含记录列表的字典
+    return {"items": items, "next_cursor": next_cursor}  # 返回记录列表与下一页游标，没有下一页时游标为空
+
+
+@router.get("/cache-stats")  # 声明进程内缓存统计接口路由
+def cache_stats():  # 定义缓存统计接口函数
+    """
+    查看当前进程内各缓存的命中统计：登录用户缓存（含命中与未命中的平均耗时）、摘要缓存、日报片段缓存与日报详情缓存
+    """
+    return {  # 返回各缓存的统计字典
+        "users": user_cache.stats(),  # 登录用户解析缓存
+        "summaries": summary_store.stats(),  # 结构化摘要缓存
+        "digest_fragments": digest_renderer.stats(),  # 日报论文卡片片段缓存
+        "digest_details": digest_detail_cache.stats(),  # 日报详情响应缓存
+    }  # 结束返回字典
@@ -1,5 +1,6 @@
 from datetime import timedelta, datetime  # 导入时间相关工具，用于生成过期时间与 token 有效期
 from fastapi import APIRouter, Depends, HTTPException  # 导入 FastAPI 路由与依赖注入及异常类
+from fastapi.concurrency import run_in_threadpool  # 导入线程池执行工具，异步接口中的数据库访问放到线程池执行
 from fastapi.security import OAuth2PasswordRequestForm  # 导入 OAuth2 表单，用于登录接口
 from sqlalchemy.orm import Session  # 导入数据库会话类型
 from app.db.session import get_db  # 导入获取数据库会话的依赖函数
@@ -9,23 +10,34 @@ from app.models.user import User as UserModel  # 导入用户模型
 from app.models.verification_code import VerificationCode  # 导入验证码模型
 from app.schemas.user import Token  # 导入 token 响应模型
 from app.schemas.auth_extra import EmailCodeRequest, RegisterWithCodeRequest  # 导入验证码相关请求模型
+from app.services.admin_stats import admin_stats  # 导入物化的管理后台统计，注册成功时累加用户计数
 from app.services.email import send_email  # 导入发送邮件服务函数
+from app.services.user_cache import user_cache  # 导入登录用户缓存，密码哈希升级后使其失效
 
 router = APIRouter()  # 创建当前模块的路由对象
 
 
 @router.post("/login/access-token", response_model=Token)  # 声明登录接口路由与返回模型
-def login_access_token(  # 定义登录接口函数
+async def login_access_token(  # 定义异步登录接口函数，bcrypt 校验期间不占用共享线程池
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()  # 注入数据库会话以及 OAuth2 表单数据
 ):  # 结束函数签名
     """
     OAuth2 兼容的令牌登录，获取访问令牌
     """
-    user = db.query(UserModel).filter(UserModel.email == form_data.username).first()  # 根据邮箱查询用户记录
-    if not user or not security.verify_password(form_data.password, user.hashed_password):  # 如果用户不存在或密码校验失败
+    user = await run_in_threadpool(  # 在线程池中执行数据库查询，避免阻塞事件循环
+        lambda: db.query(UserModel).filter(UserModel.email == form_data.username).first()  # 根据邮箱查询用户记录
+    )  # 结束用户查询
+    if not user:  # 如果用户不存在
+        raise HTTPException(status_code=400, detail="Incorrect email or password")  # 抛出 400 错误提示登录信息错误
+    valid, new_hash = await security.verify_password_async(form_data.password, user.hashed_password)  # 在专用进程池中校验密码，成本变化时同时得到新哈希
+    if not valid:  # 如果密码校验失败
         raise HTTPException(status_code=400, detail="Incorrect email or password")  # 抛出 400 错误提示登录信息错误
     if not user.is_active:  # 如果用户被标记为未激活
         raise HTTPException(status_code=400, detail="Inactive user")  # 抛出 400 错误提示用户未激活
+    if new_hash:  # 如果 bcrypt 成本配置发生了变化
+        user.hashed_password = new_hash  # 透明地以当前成本重新哈希
+        await run_in_threadpool(db.commit)  # 在线程池中提交新哈希
+        user_cache.invalidate(user.id)  # 使缓存中的旧用户对象失效
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)  # 计算访问令牌的过期时间跨度
     return {  # 返回包含访问令牌与类型的字典
@@ -69,17 +81,19 @@ def send_register_code(  # 定义发送注册验证码接口函数
 
 
 @router.post("/register-with-code")  # 声明使用验证码注册的新接口路由
-def register_with_code(  # 定义注册接口函数
+async def register_with_code(  # 定义异步注册接口函数，bcrypt 哈希期间不占用共享线程池
     payload: RegisterWithCodeRequest,  # 从请求体接收邮箱、密码与验证码
     db: Session = Depends(get_db),  # 注入数据库会话
 ):  # 结束函数签名
-    existing_user = db.query(UserModel).filter(UserModel.email == payload.email).first()  # 查询该邮箱是否已经注册
+    existing_user = await run_in_threadpool(  # 在线程池中执行数据库查询，避免阻塞事件循环
+        lambda: db.query(UserModel).filter(UserModel.email == payload.email).first()  # 查询该邮箱是否已经注册
+    )  # 结束用户查询
     if existing_user:  # 如果用户已存在
         raise HTTPException(status_code=400, detail="User already exists, please login directly")  # 提示用户直接登录
 
     now = datetime.utcnow()  # 获取当前 UTC 时间，用于比较过期时间
-    verification = (  # 查询最新的一条尚未使用且未过期的注册验证码
-        db.query(VerificationCode)  # 在验证码表中查询
+    verification = await run_in_threadpool(  # 在线程池中查询最新的一条尚未使用且未过期的注册验证码
+        lambda: db.query(VerificationCode)  # 在验证码表中查询
         .filter(  # 添加查询条件
             VerificationCode.email == payload.email,  # 绑定同一邮箱
             VerificationCode.purpose == "register",  # 用途为注册
@@ -104,12 +118,13 @@ def register_with_code(  # 定义注册接口函数
 
     db_user = UserModelInternal(  # 创建新的用户实体对象
         **user_data,  # 展开除密码外的字段
-        hashed_password=security_module.get_password_hash(user_in.password),  # 使用工具函数生成密码哈希并写入字段
+        hashed_password=await security_module.get_password_hash_async(user_in.password),  # 在专用进程池中生成密码哈希并写入字段
         is_verified=True,  # 将用户标记为已完成邮箱验证
     )  # 结束用户对象创建
 
     db.add(db_user)  # 把新用户添加到数据库会话中
-    db.commit()  # 提交事务保存用户与验证码的状态更新
-    db.refresh(db_user)  # 刷新用户对象以获取数据库生成的 ID
+    await run_in_threadpool(admin_stats.user_created, db, db_user)  # 在同一事务内累加管理后台的用户计数
+    await run_in_threadpool(db.commit)  # 在线程池中提交事务，保存用户与验证码的状态更新
+    await run_in_threadpool(db.refresh, db_user)  # 在线程池中刷新用户对象以获取数据库生成的 ID
 
     return {"message": "User registered successfully"}  # 返回注册成功的提示信息
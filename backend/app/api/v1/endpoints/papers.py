@@ -0,0 +1,56 @@
+from typing import Any  # 引入 Any 类型用于函数返回值标注
+from fastapi import APIRouter, Depends, Query  # 导入路由、依赖注入与查询参数工具
+from sqlalchemy.orm import Session  # 导入数据库会话类型
+from app.api.v1.endpoints.users import get_current_user  # 导入当前登录用户依赖，检索接口仅对登录用户开放
+from app.db.session import get_db  # 导入获取数据库会话的依赖函数
+from app.models.paper import Paper  # 导入论文模型以加载检索结果
+from app.models.user import User as UserModel  # 导入用户模型用于类型标注
+from app.services.search import search_papers  # 导入本地全文检索函数
+
+
+router = APIRouter()  # 创建论文相关路由对象
+
+
+@router.get("/search")  # 声明本地论文全文检索接口路由
+def search_local_papers(  # 定义论文全文检索接口函数
+    q: str = Query(..., min_length=1, max_length=200),  # 检索关键词，多个词之间为“且”关系
+    page: int = Query(1, ge=1),  # 页码，从 1 开始
+    page_size: int = Query(20, ge=1, le=100),  # 每页条数，最多 100
+    db: Session = Depends(get_db),  # 注入数据库会话依赖
+    current_user: UserModel = Depends(get_current_user),  # 注入当前登录用户对象
+) -> Any:  # 返回值类型为任意对象，这里为分页结果字典
+    """
+    在已入库的论文标题与摘要中全文检索，按相关性排序并分页返回（SQLite 为 BM25，MySQL 为 FULLTEXT 布尔模式评分），近似重复论文不返回
+    """
+    total, hits = search_papers(db, q, limit=page_size, offset=(page - 1) * page_size)  # 在全文索引中检索当前页的论文主键与相关性分值
+
+    papers = {  # 一次 IN 查询加载当前页的论文
+        paper.id: paper  # 论文主键到论文对象的映射
+        for paper in db.query(Paper).filter(Paper.id.in_([paper_id for paper_id, _ in hits]))  # 只加载命中的论文
+    } if hits else {}  # 没有命中时无需查询
+
+    items: list[dict[str, Any]] = []  # 初始化返回的论文列表
+    for paper_id, score in hits:  # 按相关性顺序遍历命中结果
+        paper = papers.get(paper_id)  # 取出对应的论文
+        if paper is None:  # 索引中存在但论文已被删除
+            continue  # 跳过该条结果
+        items.append(  # 追加组装后的论文字典
+            {
+                "id": paper.id,  # 论文主键
+                "title": paper.title,  # 论文标题
+                "authors": paper.authors or [],  # 作者列表
+                "abstract": paper.abstract,  # 原始摘要
+                "structured_abstract": paper.structured_abstract,  # LLM 生成的结构化摘要（如有）
+                "url": paper.url,  # 论文链接
+                "source": paper.source,  # 数据来源
+                "published_date": paper.published_date.isoformat() if paper.published_date else None,  # 发布日期
+                "score": score,  # 相关性分值，越大越相关
+            }  # 结束论文字典
+        )  # 结束追加操作
+
+    return {  # 返回分页结果
+        "total": total,  # 命中总数
+        "page": page,  # 当前页码
+        "page_size": page_size,  # 每页条数
+        "items": items,  # 当前页的论文列表
+    }  # 结束返回字典
@@ -1,18 +1,26 @@
+from datetime import datetime  # 引入 datetime 用于计算下一次推送时间
 from typing import Any  # 引入 Any 类型用于函数返回值标注
-from fastapi import APIRouter, Depends, HTTPException  # 引入 FastAPI 路由、依赖注入与异常类
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response  # 引入 FastAPI 路由、依赖注入、异常类、查询参数工具与请求响应对象
+from fastapi.concurrency import run_in_threadpool  # 引入线程池执行工具，异步接口中的数据库访问放到线程池执行
 from fastapi.security import OAuth2PasswordBearer  # 引入 OAuth2PasswordBearer，用于从请求中提取访问令牌
 from jose import JWTError, jwt  # 引入 JWT 工具与异常类型，用于解析与校验 token
 from pydantic import BaseModel  # 引入 BaseModel，用于定义科研画像与测试投递请求体模型
 from sqlalchemy.orm import Session  # 引入数据库会话类型
+from app.db.pagination import keyset_page  # 引入游标分页工具
 from app.db.session import get_db  # 引入获取数据库会话的依赖函数
 from app.models.user import User as UserModel  # 引入用户模型
 from app.models.subscription import ResearchProfile  # 引入科研订阅配置模型
 from app.models.digest import DailyDigest  # 引入每日摘要模型，用于查询与记录历史推送
-from app.models.paper import Paper  # 引入论文模型，用于根据每日摘要中的论文 ID 查询论文详情
 from app.schemas.user import User as UserSchema, UserCreate  # 引入用户相关 Pydantic 模型
 from app.core import security  # 引入安全工具模块，用于密码哈希等
 from app.core.config import settings  # 引入全局配置对象，读取 JWT 密钥与算法
-from scripts.run_daily_digest import _run_digest_for_user  # 从脚本中导入为单个用户执行推送的工具函数
+from app.services.digest_detail_cache import digest_detail_cache, etag_matches  # 引入日报详情响应缓存与 ETag 比较函数
+from app.services.digest_papers import digest_papers  # 引入日报论文关联查询，按推送顺序读取论文详情
+from app.services.admin_stats import admin_stats  # 引入物化的管理后台统计，新增用户、切换订阅与创建画像时增量更新
+from app.services.paper_router import paper_router  # 引入入库路由器，画像或订阅变化时增量更新
+from app.services.schedule import compute_next_digest_at  # 引入下一次推送时间计算函数
+from app.services.user_cache import user_cache  # 引入登录用户缓存，修改用户的接口需显式使其失效
+from scripts.run_daily_digest import DigestDeliveryError, _run_digest_for_user  # 从脚本中导入为单个用户执行推送的工具函数及发送失败异常
 
 
 oauth2_scheme = OAuth2PasswordBearer(  # 创建 OAuth2PasswordBearer 实例，用于在依赖中获取 Bearer token
@@ -36,6 +44,7 @@ class TestDigestResponse(BaseModel):  # 定义测试推送接口的返回数据
 
 class DigestTimePayload(BaseModel):  # 定义更新用户推送时间配置的请求体模型
     digest_time: str | None = None  # 用户希望设置的每日推送时间，格式为 HH:MM；为 None 时表示清除自定义配置
+    timezone: str | None = None  # 推送时间所在的 IANA 时区，例如 Asia/Shanghai；为 None 时使用服务器时区
 
 
 def get_current_user(  # 定义依赖函数，用于根据访问令牌解析并加载当前登录用户
@@ -60,14 +69,14 @@ def get_current_user(  # 定义依赖函数，用于根据访问令牌解析并
     except JWTError:  # 捕获 JWT 解析错误
         raise credentials_exception  # 抛出统一的认证失败异常
 
-    user = db.query(UserModel).filter(UserModel.id == int(user_id)).first()  # 根据解析出的用户 ID 查询数据库中的用户记录
+    user = user_cache.get(db, int(user_id))  # 优先从短期缓存中解析用户，未命中时再查询数据库
     if user is None:  # 如果用户不存在
         raise credentials_exception  # 抛出认证失败异常
     return user  # 返回当前登录用户对象
 
 
 @router.post("/", response_model=UserSchema)  # 声明创建用户接口路由与返回模型
-def create_user(  # 定义创建用户接口函数
+async def create_user(  # 定义异步创建用户接口函数，bcrypt 哈希期间不占用共享线程池
     *,  # 使用命名参数以提高调用可读性
     db: Session = Depends(get_db),  # 注入数据库会话依赖
     user_in: UserCreate,  # 从请求体中接收用户创建模型
@@ -75,7 +84,9 @@ def create_user(  # 定义创建用户接口函数
     """
     创建新用户
     """
-    user = db.query(UserModel).filter(UserModel.email == user_in.email).first()  # 根据邮箱查询是否已存在用户
+    user = await run_in_threadpool(  # 在线程池中执行数据库查询，避免阻塞事件循环
+        lambda: db.query(UserModel).filter(UserModel.email == user_in.email).first()  # 根据邮箱查询是否已存在用户
+    )  # 结束用户查询
     if user:  # 如果查询到用户
         raise HTTPException(  # 抛出 HTTP 异常提示用户已存在
             status_code=400,  # 使用 400 错误码
@@ -86,11 +97,12 @@ def create_user(  # 定义创建用户接口函数
 
     db_user = UserModel(  # 创建新的用户实体对象
         **user_data,  # 展开除密码外的字段
-        hashed_password=security.get_password_hash(user_in.password),  # 对密码进行哈希后写入字段
+        hashed_password=await security.get_password_hash_async(user_in.password),  # 在专用进程池中对密码进行哈希后写入字段
     )  # 结束用户实体构造
     db.add(db_user)  # 将新用户添加到当前数据库会话
-    db.commit()  # 提交事务将更改持久化到数据库
-    db.refresh(db_user)  # 刷新用户对象以获取数据库生成的 ID 等字段
+    await run_in_threadpool(admin_stats.user_created, db, db_user)  # 在同一事务内累加管理后台的用户计数
+    await run_in_threadpool(db.commit)  # 在线程池中提交事务将更改持久化到数据库
+    await run_in_threadpool(db.refresh, db_user)  # 在线程池中刷新用户对象以获取数据库生成的 ID 等字段
     return db_user  # 返回新创建的用户对象
 
 
@@ -113,9 +125,14 @@ def toggle_subscription(  # 定义切换订阅状态接口函数
     切换当前用户的订阅开关
     """
     current_user.subscription_enabled = not current_user.subscription_enabled  # 将订阅状态取反实现开关切换
+    if current_user.subscription_enabled:  # 如果本次操作重新开启了订阅
+        current_user.next_digest_at = None  # 清空旧的推送时间，由调度器重新计算，避免立即补发关闭期间错过的推送
     db.add(current_user)  # 将修改后的用户对象加入当前会话
+    admin_stats.increment(db, subscribed_users=1 if current_user.subscription_enabled else -1)  # 在同一事务内调整管理后台的订阅用户计数
     db.commit()  # 提交事务保存更改
     db.refresh(current_user)  # 刷新用户对象以获取最新状态
+    user_cache.invalidate(current_user.id)  # 使缓存中的旧用户对象失效
+    paper_router.update_user(current_user)  # 同步入库路由器：关闭订阅时移除该用户，重新开启时恢复其关键词
     return current_user  # 返回更新后的用户对象
 
 
@@ -170,6 +187,7 @@ def update_user_profile(  # 定义更新当前用户科研画像信息的接口
             journal_preferences=payload.journal_preferences,  # 使用请求体中的期刊偏好标签列表
         )  # 结束科研画像实体构造
         db.add(profile)  # 将新建的科研画像记录加入当前会话
+        admin_stats.increment(db, total_profiles=1)  # 在同一事务内累加管理后台的画像计数
     else:  # 如果已经存在科研画像记录
         profile.disciplines = payload.disciplines  # 更新研究方向标签列表
         profile.keywords = payload.keywords  # 更新关注关键词标签列表
@@ -178,6 +196,9 @@ def update_user_profile(  # 定义更新当前用户科研画像信息的接口
 
     db.commit()  # 提交事务以持久化科研画像更改
     db.refresh(profile)  # 刷新科研画像对象以获取数据库中的最新字段
+    db.refresh(current_user)  # 刷新用户对象，使其关联到最新的科研画像
+    user_cache.invalidate(current_user.id)  # 使缓存中的旧用户对象失效
+    paper_router.update_user(current_user)  # 增量更新入库路由器中该用户的关键词
 
     return {  # 返回更新后的科研画像配置字典
         "disciplines": profile.disciplines or [],  # 返回更新后的研究方向标签列表
@@ -188,19 +209,25 @@ def update_user_profile(  # 定义更新当前用户科研画像信息的接口
 
 @router.get("/me/digests")  # 声明获取当前用户历史推送记录列表的接口路由
 def read_user_digests(  # 定义获取当前登录用户每日摘要历史记录列表的接口函数
+    cursor: str | None = Query(None),  # 上一页返回的游标，为空表示第一页
+    limit: int = Query(20, ge=1, le=100),  # 每页条数，最多 100
     db: Session = Depends(get_db),  # 注入数据库会话依赖
     current_user: UserModel = Depends(get_current_user),  # 注入当前登录用户对象
 ) -> Any:  # 返回值类型为任意对象，这里为包含历史记录的列表
     """
-    获取当前登录用户的历史推送记录列表
+    获取当前登录用户的历史推送记录列表，按 (sent_at, id) 倒序做游标分页
     """
-    digests = (  # 查询当前用户的每日摘要记录
-        db.query(DailyDigest)  # 从每日摘要表中构造查询
-        .filter(DailyDigest.user_id == current_user.id)  # 仅筛选当前用户的记录
-        .order_by(DailyDigest.sent_at.desc())  # 按发送时间倒序排列，最近的记录排在最前
-        .limit(20)  # 限制最多返回 20 条历史记录，避免一次返回过多数据
-        .all()  # 执行查询并返回列表
-    )  # 结束查询表达式
+    try:  # 游标格式不合法时返回 400
+        digests, next_cursor = keyset_page(  # 按游标查询当前用户的一页每日摘要记录
+            db,  # 数据库会话
+            db.query(DailyDigest).filter(DailyDigest.user_id == current_user.id),  # 仅筛选当前用户的记录（命中 user_id, sent_at 复合索引）
+            DailyDigest.sent_at,  # 按发送时间倒序排列，最近的记录排在最前
+            DailyDigest.id,  # 发送时间相同时按主键倒序
+            cursor,  # 上一页游标
+            limit,  # 每页条数
+        )  # 结束分页查询
+    except ValueError:  # 游标无法解析
+        raise HTTPException(status_code=400, detail="Invalid cursor")  # 返回 400 错误
 
     items: list[dict[str, Any]] = []  # 初始化用于存放返回记录字典的列表
     for digest in digests:  # 遍历每一条每日摘要记录
@@ -212,18 +239,35 @@ def read_user_digests(  # 定义获取当前登录用户每日摘要历史记录
             }  # 结束记录字典
         )  # 结束追加操作
 
-    return {"items": items}  # 返回包含历史记录列表的字典
+    return {"items": items, "next_cursor": next_cursor}  # 返回历史记录列表与下一页游标，没有下一页时游标为空
+
+
+def _digest_detail_response(request: Request, etag: str, body: bytes) -> Response:  # 根据条件请求头构造日报详情响应
+    headers = {  # 日报不可变，允许浏览器长期缓存；响应依赖登录用户，只允许私有缓存
+        "ETag": etag,  # 强 ETag
+        "Cache-Control": "private, max-age=31536000, immutable",  # 私有、长期且不可变
+    }  # 结束响应头
+    if etag_matches(request.headers.get("if-none-match"), etag):  # 如果客户端已持有相同版本
+        return Response(status_code=304, headers=headers)  # 返回 304，不再传输响应体
+    return Response(content=body, media_type="application/json", headers=headers)  # 返回缓存的 JSON 响应体
 
 
 @router.get("/me/digests/{digest_id}")  # 声明获取指定每日摘要详情的接口路由
 def read_user_digest_detail(  # 定义获取某一次每日摘要详情的接口函数
     digest_id: int,  # 路径参数中的每日摘要记录主键 ID
+    request: Request,  # 当前请求，用于读取 If-None-Match 条件请求头
     db: Session = Depends(get_db),  # 注入数据库会话依赖
     current_user: UserModel = Depends(get_current_user),  # 注入当前登录用户对象
-) -> Any:  # 返回值类型为任意对象，这里为包含论文列表的字典
+) -> Any:  # 返回值类型为任意对象，这里为包含论文列表的 JSON 响应
     """
     获取当前用户某一次每日摘要推送对应的论文列表详情
+    日报发送后不再变化：响应按 (digest_id, user_id) 缓存在进程内 LRU 中并带强 ETag，
+    重复查看不访问数据库，条件请求命中时返回 304
     """
+    cached = digest_detail_cache.get(digest_id, current_user.id)  # 先查进程内缓存
+    if cached is not None:  # 如果缓存命中
+        return _digest_detail_response(request, *cached)  # 直接返回缓存的响应体或 304
+
     digest = (  # 查询当前用户指定 ID 的每日摘要记录
         db.query(DailyDigest)  # 从每日摘要表中构造查询
         .filter(  # 添加过滤条件限定记录范围
@@ -239,26 +283,7 @@ def read_user_digest_detail(  # 定义获取某一次每日摘要详情的接口
             detail="Digest not found",  # 返回简要的错误提示信息
         )  # 结束异常抛出
 
-    paper_ids = digest.paper_ids or []  # 从每日摘要记录中读取论文 ID 列表，空值回退为空列表
-    if not paper_ids:  # 如果该次每日摘要未记录任何论文 ID
-        return {  # 直接返回空论文列表
-            "id": digest.id,  # 返回每日摘要记录主键 ID
-            "sent_at": digest.sent_at.isoformat() if digest.sent_at else None,  # 返回发送时间的 ISO 字符串
-            "papers": [],  # 返回空论文列表
-        }  # 结束返回字典
-
-    papers = (  # 构造查询以根据论文 ID 列表加载所有论文详情
-        db.query(Paper)  # 从论文表中构造查询
-        .filter(Paper.id.in_(paper_ids))  # 使用 in 条件筛选出所有相关论文
-        .all()  # 执行查询并返回论文列表
-    )  # 结束论文查询表达式
-
-    paper_map: dict[int, Paper] = {paper.id: paper for paper in papers}  # 将论文列表构造成以 ID 为键的字典便于按照原始顺序重排
-    ordered_papers: list[Paper] = [  # 构造按照每日摘要中记录顺序排列的论文列表
-        paper_map[pid]  # 根据论文 ID 从字典中取出对应论文对象
-        for pid in paper_ids  # 遍历每日摘要记录中的论文 ID 列表
-        if pid in paper_map  # 仅保留在数据库中仍然存在的论文
-    ]  # 结束列表推导
+    ordered_papers = digest_papers(db, digest.id)  # 一次按推送顺序的关联查询加载日报中的全部论文
 
     paper_items: list[dict[str, Any]] = []  # 初始化用于承载论文详情字典的列表
     for paper in ordered_papers:  # 遍历排序后的论文对象列表
@@ -275,11 +300,18 @@ def read_user_digest_detail(  # 定义获取某一次每日摘要详情的接口
             }  # 结束论文详情字典
         )  # 结束追加操作
 
-    return {  # 返回包含每日摘要元信息与论文列表的字典
+    payload = {  # 组装包含每日摘要元信息与论文列表的字典
         "id": digest.id,  # 返回每日摘要记录主键 ID
         "sent_at": digest.sent_at.isoformat() if digest.sent_at else None,  # 返回发送时间的 ISO 字符串
         "papers": paper_items,  # 返回论文详情列表
-    }  # 结束返回字典
+    }  # 结束字典组装
+    etag, body = digest_detail_cache.put(  # 序列化响应并计算 ETag
+        digest.id,  # 每日摘要记录主键 ID
+        current_user.id,  # 当前用户 ID
+        payload,  # 响应内容
+        cache=bool(paper_items),  # 没有论文时（例如历史日报尚未迁移到关联表）不缓存，迁移后即可看到论文
+    )  # 结束序列化
+    return _digest_detail_response(request, etag, body)  # 返回带 ETag 的响应或 304
 
 
 @router.post("/me/test-digest", response_model=TestDigestResponse)  # 声明触发当前用户测试推送邮件的接口路由与返回模型
@@ -296,7 +328,13 @@ def test_user_digest(  # 定义测试触发当前用户一次科研日报投递
             message="请先开启订阅开关后再尝试测试推送。",  # 提示前端用户需要先打开订阅
         )  # 结束返回对象构造
 
-    ok = _run_digest_for_user(db, current_user)  # 复用脚本中的逻辑，为当前用户执行一次推送与记录写入
+    try:  # 捕获邮件发送失败
+        ok = _run_digest_for_user(db, current_user)  # 复用脚本中的逻辑，为当前用户执行一次推送与记录写入
+    except DigestDeliveryError:  # 邮件发送失败
+        return TestDigestResponse(  # 返回提示信息并标记为失败
+            success=False,  # 标记本次测试未成功发送邮件
+            message="测试邮件发送失败，请检查邮箱配置后重试。",  # 提示用户或管理员检查 SMTP 配置
+        )  # 结束返回对象构造
 
     if not ok:  # 如果返回结果表示没有发送任何邮件
         return TestDigestResponse(  # 返回提示信息并标记为失败
@@ -321,6 +359,8 @@ def read_user_digest_time(  # 定义获取当前登录用户每日推送时间
     """
     return {  # 返回简单的时间配置字典
         "digest_time": current_user.digest_time,  # 将用户模型中的 digest_time 字段原样返回给前端
+        "timezone": current_user.digest_timezone,  # 返回推送时间所在的时区
+        "next_digest_at": current_user.next_digest_at.isoformat() if current_user.next_digest_at else None,  # 返回下一次推送的 UTC 时间
     }  # 结束返回字典
 
 
@@ -333,11 +373,22 @@ def update_user_digest_time(  # 定义更新当前登录用户每日推送时间
     """
     更新当前登录用户的每日推送时间配置
     """
-    current_user.digest_time = payload.digest_time  # 将请求体中的新时间字符串写入用户模型
+    digest_time = payload.digest_time.strip() if payload.digest_time else None  # 去除首尾空白，空字符串视为清除自定义配置
+    try:  # 校验推送时间与时区并计算下一次推送时间
+        next_digest_at = compute_next_digest_at(digest_time, payload.timezone, datetime.utcnow())  # 计算严格晚于当前时间的下一次推送时间
+    except ValueError as exc:  # 推送时间格式或时区名称不合法
+        raise HTTPException(status_code=400, detail=str(exc))  # 返回 400 错误提示
+
+    current_user.digest_time = digest_time  # 将请求体中的新时间字符串写入用户模型
+    current_user.digest_timezone = payload.timezone  # 写入推送时间所在的时区
+    current_user.next_digest_at = next_digest_at  # 同步更新调度器使用的下一次推送时间
     db.add(current_user)  # 将修改后的用户对象加入当前会话
     db.commit()  # 提交事务以持久化更改
     db.refresh(current_user)  # 刷新用户对象以获取数据库中的最新值
+    user_cache.invalidate(current_user.id)  # 使缓存中的旧用户对象失效
 
     return {  # 返回更新后的时间配置字典
         "digest_time": current_user.digest_time,  # 返回当前用户的推送时间配置
+        "timezone": current_user.digest_timezone,  # 返回推送时间所在的时区
+        "next_digest_at": current_user.next_digest_at.isoformat() if current_user.next_digest_at else None,  # 返回下一次推送的 UTC 时间
     }  # 结束返回字典
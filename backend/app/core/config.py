@@ -31,4 +31,77 @@ class Settings:
     EMAILS_FROM_EMAIL: str = os.getenv("EMAILS_FROM_EMAIL")
     EMAILS_FROM_NAME: str = os.getenv("EMAILS_FROM_NAME")
 
+    # 每日推送调度配置 - 用户未设置推送时间时使用默认时间；未设置时区时使用服务器本地时区
+    DEFAULT_DIGEST_TIME: str = os.getenv("DEFAULT_DIGEST_TIME", "08:00")
+    DIGEST_TIMEZONE: str | None = os.getenv("DIGEST_TIMEZONE")
+
+    # 推送任务队列配置 - 单批领取数量、最大尝试次数、失败重试间隔与领取超时（秒）
+    DIGEST_JOB_BATCH_SIZE: int = int(os.getenv("DIGEST_JOB_BATCH_SIZE", 100))
+    DIGEST_JOB_MAX_ATTEMPTS: int = int(os.getenv("DIGEST_JOB_MAX_ATTEMPTS", 3))
+    DIGEST_JOB_RETRY_DELAY: int = int(os.getenv("DIGEST_JOB_RETRY_DELAY", 300))
+    DIGEST_JOB_LEASE_SECONDS: int = int(os.getenv("DIGEST_JOB_LEASE_SECONDS", 900))
+
+    # 推送执行器配置 - 执行器类型（thread/process）、执行者数量与单用户超时（秒）
+    # 执行者数量默认取 CPU 数 + 4 且不超过 8，保证不超过 MySQL 默认连接池容量（5 + 10 溢出）
+    DIGEST_EXECUTOR: str = os.getenv("DIGEST_EXECUTOR", "thread")
+    DIGEST_WORKERS: int = int(os.getenv("DIGEST_WORKERS", min(8, (os.cpu_count() or 1) + 4)))
+    DIGEST_USER_TIMEOUT: float = float(os.getenv("DIGEST_USER_TIMEOUT", 120))
+
+    # 入库路由配置 - 路由器从数据库全量重建的间隔（秒，用于感知其他进程的画像修改）、单封日报最多附带的匹配论文数量
+    # 与匹配的有效天数（超过后不再推送并被清理）
+    PAPER_ROUTER_REFRESH_SECONDS: int = int(os.getenv("PAPER_ROUTER_REFRESH_SECONDS", 300))
+    DIGEST_MAX_MATCHED_PAPERS: int = int(os.getenv("DIGEST_MAX_MATCHED_PAPERS", 20))
+    DIGEST_MATCH_WINDOW_DAYS: int = int(os.getenv("DIGEST_MATCH_WINDOW_DAYS", 7))
+
+    # 近似重复检测配置 - MinHash 估计的 Jaccard 相似度达到该阈值的新论文视为已有论文的重复
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", 0.8))
+
+    # 相关性排序配置 - 每个查询抓取的候选论文数、每封日报保留的论文数、哈希特征维度与论文向量索引目录
+    DIGEST_CANDIDATES_PER_QUERY: int = int(os.getenv("DIGEST_CANDIDATES_PER_QUERY", 10))
+    DIGEST_TOP_K: int = int(os.getenv("DIGEST_TOP_K", 10))
+    RANKING_HASH_DIM: int = int(os.getenv("RANKING_HASH_DIM", 2 ** 18))
+    RANKING_INDEX_DIR: str = os.getenv(
+        "RANKING_INDEX_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "ranking"),
+    )
+
+    # 密码哈希配置 - bcrypt 成本因子（每加 1 计算量翻倍）与专用哈希进程池的大小
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+    # 登录用户缓存配置 - 已解析的用户在进程内缓存的秒数与最多缓存的用户数量
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 30))
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 10000))
+
+    # 管理后台统计配置 - 总览统计在进程内缓存的秒数
+    ADMIN_STATS_TTL: float = float(os.getenv("ADMIN_STATS_TTL", 10))
+
+    # 日报详情缓存配置 - 进程内最多缓存的日报详情响应数量
+    DIGEST_DETAIL_CACHE_SIZE: int = int(os.getenv("DIGEST_DETAIL_CACHE_SIZE", 2048))
+
+    # arXiv 抓取配置 - arXiv API 使用规范要求连续请求之间至少间隔 3 秒
+    ARXIV_API_BASE: str = os.getenv("ARXIV_API_BASE", "http://export.arxiv.org/api/query")
+    ARXIV_REQUEST_INTERVAL: float = float(os.getenv("ARXIV_REQUEST_INTERVAL", 3))
+    CRAWLER_MAX_WORKERS: int = int(os.getenv("CRAWLER_MAX_WORKERS", 4))
+    CRAWLER_TIMEOUT: float = float(os.getenv("CRAWLER_TIMEOUT", 20))
+    CRAWLER_MAX_RETRIES: int = int(os.getenv("CRAWLER_MAX_RETRIES", 3))
+    ARXIV_PAGE_SIZE: int = int(os.getenv("ARXIV_PAGE_SIZE", 100))
+
+    # PubMed 抓取配置 - NCBI E-utilities 未配置 API Key 时每秒最多 3 次请求，配置后每秒最多 10 次
+    PUBMED_API_BASE: str = os.getenv("PUBMED_API_BASE", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+    PUBMED_API_KEY: str = os.getenv("PUBMED_API_KEY", "")
+    PUBMED_REQUEST_INTERVAL: float = float(os.getenv("PUBMED_REQUEST_INTERVAL", 0.1 if os.getenv("PUBMED_API_KEY") else 0.34))
+    PUBMED_MAX_WORKERS: int = int(os.getenv("PUBMED_MAX_WORKERS", 3))
+    PUBMED_PAGE_SIZE: int = int(os.getenv("PUBMED_PAGE_SIZE", 200))
+
+    # 多数据源入库配置 - 每次提交的论文数量，以及抓取线程与入库线程之间缓冲的最大批次数
+    INGEST_CHUNK_SIZE: int = int(os.getenv("INGEST_CHUNK_SIZE", 500))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", 16))
+
+    # 后台预抓取配置 - 入库任务的运行间隔与每个查询每轮最多抓取的新论文数量；
+    # DIGEST_LOCAL_ONLY 开启时日报投递只读取本地论文库，不在投递路径上访问 arXiv
+    INGEST_INTERVAL_SECONDS: int = int(os.getenv("INGEST_INTERVAL_SECONDS", 600))
+    INGEST_MAX_PER_QUERY: int = int(os.getenv("INGEST_MAX_PER_QUERY", 100))
+    DIGEST_LOCAL_ONLY: bool = os.getenv("DIGEST_LOCAL_ONLY", "True").lower() == "true"
+
 settings = Settings()
@@ -1,10 +1,24 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Union, Any
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 最小与最大成本都固定为配置值，成本调整后旧哈希在下次登录验证时被 needs_update 识别并重新哈希
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
@@ -32,3 +46,44 @@ def get_password_hash(password: str) -> str:
     获取密码哈希值
     """
     return pwd_context.hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    """
+    验证密码，若哈希使用的成本与当前配置不一致则同时返回新的哈希
+    :return: (是否验证通过, 新哈希或 None)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    """
+    获取进程内共享的密码哈希进程池；使用 spawn 启动子进程，避免在多线程的服务进程中 fork
+    """
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple:
+    """
+    在独立的有界进程池中验证密码，不占用 FastAPI 的共享线程池
+    :return: (是否验证通过, 成本变化时的新哈希或 None)
+    """
+    future = _get_hash_pool().submit(verify_and_update_password, plain_password, hashed_password)
+    return await asyncio.wrap_future(future)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在独立的有界进程池中计算密码哈希
+    """
+    return await asyncio.wrap_future(_get_hash_pool().submit(get_password_hash, password))
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
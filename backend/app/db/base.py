@@ -5,3 +5,10 @@ from app.models.subscription import ResearchProfile  # 导入科研订阅配置
 from app.models.digest import DailyDigest  # 导入每日摘要投递记录模型
 from app.models.email_config import EmailConfig  # 导入邮箱配置模型，支持在数据库中管理 SMTP 配置
 from app.models.verification_code import VerificationCode  # 导入验证码模型，用于邮箱验证码注册与验证
+from app.models.crawl_state import CrawlState  # 导入抓取水位线模型，记录每个查询已抓取到的最新论文
+from app.models.digest_job import DigestJob  # 导入推送任务队列模型，记录每个用户每个逻辑日期的推送任务
+from app.models.paper_match import PaperMatch  # 导入论文匹配模型，记录入库时路由给订阅用户的论文
+from app.models.paper_lsh_band import PaperLSHBand  # 导入论文 MinHash 分段索引模型，用于入库时查找近似重复论文
+from app.models.admin_stats import AdminStats  # 导入管理后台统计模型，物化后台总览所需的计数
+from app.models.delivery_rollup import DeliveryRollup  # 导入推送量时间桶汇总模型，记录每小时与每天的推送统计
+from app.models.digest_paper import DigestPaper  # 导入日报论文关联模型，按顺序记录每次推送包含的论文
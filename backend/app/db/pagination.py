@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, String, or_, type_coerce
+from sqlalchemy.orm import Query, Session
+
+
+def encode_cursor(value, row_id: int) -> str:
+    """
+    把一页最后一行的 (排序键, 主键) 编码为不透明的 URL 安全游标
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """
+    解析 encode_cursor 生成的游标，格式不合法时抛出 ValueError
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(value, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return value, row_id
+
+
+def _sort_key(db: Session, column):
+    # SQLite 以文本保存时间，服务端默认值不带微秒而 ORM 绑定的参数带微秒，
+    # 按 datetime 比较会把游标所在行再返回一次；改为按原始文本比较，与 ORDER BY 的顺序一致
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(column, String)
+    return column
+
+
+def keyset_page(db: Session, query: Query, sort_column, id_column, cursor: str | None, limit: int) -> tuple[list, str | None]:
+    """
+    按 (sort_column, id_column) 倒序做游标分页：条件 sort <= v AND (sort < v OR id < last_id) 可以直接走
+    (…, sort_column) 复合索引的范围扫描，任意深度的页与第一页代价相同
+    :param cursor: 上一页返回的游标，为空表示第一页；格式不合法时抛出 ValueError
+    :return: (本页行, 下一页游标)，没有下一页时游标为 None；只查询一个实体或列时行不再包装为元组
+    """
+    sort_key = _sort_key(db, sort_column)
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        if sort_key is sort_column and isinstance(sort_column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        query = query.filter(sort_key <= value, or_(sort_key < value, id_column < last_id))
+
+    rows = (
+        query.add_columns(sort_key, id_column)
+        .order_by(sort_column.desc(), id_column.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(rows[limit - 1][-2], rows[limit - 1][-1]) if len(rows) > limit else None
+    items = [row[0] if len(row) == 3 else tuple(row[:-2]) for row in rows[:limit]]
+    return items, next_cursor
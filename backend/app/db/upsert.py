@@ -0,0 +1,76 @@
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+
+def insert_ignore(db: Session, model, rows: list):
+    """
+    批量插入记录，遇到唯一键冲突的行直接跳过
+    SQLite 使用 INSERT ... ON CONFLICT DO NOTHING，MySQL 使用 INSERT IGNORE
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing()
+    elif dialect == "mysql":
+        stmt = mysql.insert(model).prefix_with("IGNORE")
+    else:
+        stmt = insert(model)
+    db.execute(stmt, rows)
+
+
+def insert_ignore_returning(db: Session, model, rows: list, key: str) -> set:
+    """
+    批量插入记录，遇到唯一键冲突的行直接跳过，返回实际由本次语句插入的行的 key 列取值；
+    被并发写入者抢先插入的行不包含在内
+    SQLite 使用 INSERT ... ON CONFLICT DO NOTHING RETURNING；MySQL 不支持 RETURNING，先在保存点中整体 INSERT IGNORE，
+    影响行数与行数一致说明全部由本次插入，否则回滚到保存点逐行插入并按影响行数判断
+    """
+    if not rows:
+        return set()
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing().returning(getattr(model, key))
+        return set(db.scalars(stmt, rows))
+    if dialect == "mysql":
+        stmt = mysql.insert(model).prefix_with("IGNORE")
+        savepoint = db.begin_nested()
+        if db.execute(stmt, rows).rowcount == len(rows):
+            savepoint.commit()
+            return {row[key] for row in rows}
+        savepoint.rollback()
+        return {row[key] for row in rows if db.execute(stmt, [row]).rowcount == 1}
+    db.execute(insert(model), rows)
+    return {row[key] for row in rows}
+
+
+def insert_or_increment(db: Session, model, rows: list, keys: list[str], counters: list[str]):
+    """
+    批量插入计数行，唯一键冲突时把 counters 列累加到已有行上，不读取旧值，并发写入不会丢失更新
+    SQLite 使用 INSERT ... ON CONFLICT DO UPDATE，MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE
+    :param keys: 构成唯一键的列名，SQLite 需要据此指定冲突目标
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: getattr(model, name) + stmt.excluded[name] for name in counters},
+        )
+        db.execute(stmt, rows)
+    elif dialect == "mysql":
+        stmt = mysql.insert(model)
+        stmt = stmt.on_duplicate_key_update({name: getattr(model, name) + stmt.inserted[name] for name in counters})
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            updated = db.execute(
+                update(model)
+                .where(*(getattr(model, key) == row[key] for key in keys))
+                .values({name: getattr(model, name) + row[name] for name in counters})
+            ).rowcount
+            if not updated:
+                db.execute(insert(model), [row])
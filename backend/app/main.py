@@ -3,6 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware  # 导入 CORS 中间件以
 import asyncio  # 导入 asyncio 库以便创建异步后台任务
 import contextlib  # 导入 contextlib 以便在取消任务时优雅捕获异常
 from scripts.run_daily_digest import run_digest  # 导入每日科研摘要投递脚本的入口函数，用作定时任务的执行目标
+from scripts.run_ingest import run_ingest  # 导入后台预抓取脚本的入口函数，用作入库任务的执行目标
+from app.core.config import settings  # 导入全局配置对象，读取预抓取间隔
+from app.core.security import shutdown_hash_pool  # 导入密码哈希进程池的关闭函数
 
 
 app = FastAPI(  # 创建 FastAPI 应用实例
@@ -41,11 +44,26 @@ async def _digest_scheduler_loop():  # 定义内部异步函数，用于在后
         await asyncio.sleep(60)  # 休眠 60 秒后再次触发下一轮任务调度
 
 
+async def _ingest_loop():  # 定义内部异步函数，用于在后台持续预抓取订阅查询的新论文
+    """
+    后台入库任务：独立于日报调度循环，每隔 INGEST_INTERVAL_SECONDS 抓取一次所有订阅查询的新论文，
+    日报投递时只读取本地论文库，网络延迟不再出现在投递路径上
+    """
+    while True:  # 使用无限循环以便持续运行预抓取逻辑
+        try:  # 使用 try 块捕获任务执行过程中的所有异常
+            await asyncio.to_thread(run_ingest)  # 在后台线程中调用同步的 run_ingest 函数，避免阻塞事件循环
+        except Exception as exc:  # 捕获任意异常对象
+            print(f"[ingest] run_ingest error: {exc}")  # 在控制台打印预抓取任务执行异常，便于运维排查
+        await asyncio.sleep(settings.INGEST_INTERVAL_SECONDS)  # 休眠一个抓取间隔后再次预抓取
+
+
 @app.on_event("startup")
 async def start_scheduler():  # 定义应用启动事件处理函数，用于启动简单定时任务调度循环
     """
-    在应用启动时创建并启动每日科研摘要后台调度任务
+    在应用启动时创建并启动后台预抓取任务与每日科研摘要后台调度任务
     """
+    if getattr(app.state, "ingest_task", None) is None:  # 如果当前应用状态中尚未记录预抓取任务
+        app.state.ingest_task = asyncio.create_task(_ingest_loop())  # 创建后台预抓取任务并存入应用状态
     if getattr(app.state, "digest_task", None) is None:  # 如果当前应用状态中尚未记录调度任务
         app.state.digest_task = asyncio.create_task(_digest_scheduler_loop())  # 创建后台调度任务并存入应用状态
 
@@ -53,13 +71,15 @@ async def start_scheduler():  # 定义应用启动事件处理函数，用于启
 @app.on_event("shutdown")
 async def stop_scheduler():  # 定义应用关闭事件处理函数，用于优雅取消后台调度任务
     """
-    在应用关闭时取消每日科研摘要后台调度任务
+    在应用关闭时取消后台预抓取任务与每日科研摘要后台调度任务，并关闭密码哈希进程池
     """
-    task = getattr(app.state, "digest_task", None)  # 从应用状态中读取调度任务引用
-    if task is not None:  # 如果确实存在调度任务
-        task.cancel()  # 向任务发送取消请求
-        with contextlib.suppress(asyncio.CancelledError):  # 在捕获任务取消异常时静默处理
-            await task  # 等待任务退出以确保资源被正确清理
+    for name in ("digest_task", "ingest_task"):  # 依次处理两个后台任务
+        task = getattr(app.state, name, None)  # 从应用状态中读取任务引用
+        if task is not None:  # 如果确实存在该任务
+            task.cancel()  # 向任务发送取消请求
+            with contextlib.suppress(asyncio.CancelledError):  # 在捕获任务取消异常时静默处理
+                await task  # 等待任务退出以确保资源被正确清理
+    shutdown_hash_pool()  # 关闭密码哈希进程池
 
 
 @app.get("/")
@@ -78,4 +98,11 @@ from app.db.base import Base  # 导入 Base 元数据对象
 
 Base.metadata.create_all(bind=engine)  # 在应用启动时根据模型元数据创建数据库表
 
+from app.db.session import SessionLocal  # 导入会话工厂以便初始化全文索引
+from app.services.search import ensure_search_index  # 导入全文索引初始化函数
+
+with SessionLocal() as _db:  # 创建临时会话
+    ensure_search_index(_db)  # 创建论文全文索引（SQLite FTS5 虚拟表或 MySQL FULLTEXT 索引）
+    _db.commit()  # 提交索引创建
+
 app.include_router(api_router, prefix="/api/v1")  # 将版本化 API 路由挂载到应用并设置统一前缀
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class AdminStats(Base):
+    __tablename__ = "admin_stats"
+
+    id = Column(Integer, primary_key=True)  # 固定为 1，整张表只有一行
+    total_users = Column(Integer, nullable=False, default=0)  # 平台用户总数
+    active_users = Column(Integer, nullable=False, default=0)  # 激活用户数量
+    subscribed_users = Column(Integer, nullable=False, default=0)  # 开启订阅开关的用户数量
+    total_profiles = Column(Integer, nullable=False, default=0)  # 已配置科研画像的数量
+    rebuilt_at = Column(DateTime(timezone=True), server_default=func.now())  # 最近一次全量重算的时间
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
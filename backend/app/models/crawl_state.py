@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class CrawlState(Base):
+    __tablename__ = "crawl_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    query = Column(String(512), unique=True, index=True, nullable=False)  # 规范化后的查询字符串
+    last_published_date = Column(DateTime)  # 已见过的最新论文发布时间（水位线）
+    last_arxiv_id = Column(String(64))  # 已见过的最新论文 arXiv ID（不含版本号）
+    resume_offset = Column(Integer)  # 上一次抓取达到数量上限而中断时，下一次继续抓取的结果偏移量；为空表示没有未完成的抓取
+    pending_published_date = Column(DateTime)  # 未完成抓取中见过的最新论文发布时间，追上旧水位线后成为新水位线
+    pending_arxiv_id = Column(String(64))  # 未完成抓取中见过的最新论文 arXiv ID
+    recent_paper_ids = Column(JSON)  # 该查询最近的论文 ID 列表，按发布时间倒序
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from app.db.session import Base
+
+class DeliveryRollup(Base):
+    __tablename__ = "delivery_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", name="uq_delivery_rollups_granularity_bucket"),  # 按粒度与时间范围查询，同时作为累加的冲突键
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(8), nullable=False)  # 时间桶粒度：hour / day
+    bucket_start = Column(DateTime, nullable=False)  # 时间桶起点（UTC，按粒度取整）
+    delivered = Column(Integer, nullable=False, default=0)  # 成功推送的日报数量
+    failed = Column(Integer, nullable=False, default=0)  # 推送失败的尝试次数
+    papers = Column(Integer, nullable=False, default=0)  # 推送的论文总数
@@ -1,15 +1,18 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
 
 class DailyDigest(Base):
     __tablename__ = "daily_digests"
+    __table_args__ = (
+        Index("ix_daily_digests_user_sent_at", "user_id", "sent_at"),  # 按用户游标分页读取历史推送
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(DateTime, default=func.now())
-    paper_ids = Column(JSON)  # 推送的论文 ID 列表
-    sent_at = Column(DateTime(timezone=True), server_default=func.now())
+    paper_ids = Column(JSON)  # 推送的论文 ID 列表；按顺序的可索引副本见 digest_papers
+    sent_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # 管理后台按发送时间做范围统计
 
     user = relationship("User", back_populates="digests")
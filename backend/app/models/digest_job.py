@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class DigestJob(Base):
+    __tablename__ = "digest_jobs"
+    __table_args__ = (
+        UniqueConstraint("user_id", "logical_date", name="uq_digest_jobs_user_date"),  # 同一用户同一逻辑日期只入队一次
+        Index("ix_digest_jobs_status_run_after", "status", "run_after"),  # 执行阶段按状态与可执行时间取任务
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    logical_date = Column(Date, nullable=False)  # 用户本地时区下的推送日期
+    scheduled_for = Column(DateTime, nullable=False)  # 计划推送的 UTC 时间
+    run_after = Column(DateTime, nullable=False)  # 最早可执行的 UTC 时间，失败重试时向后推迟
+    status = Column(String(16), nullable=False, default="pending")  # pending / running / done / skipped / failed
+    attempts = Column(Integer, nullable=False, default=0)  # 已尝试执行的次数
+    locked_at = Column(DateTime)  # 被执行者领取的 UTC 时间，用于回收超时任务
+    locked_by = Column(String(32))  # 领取该任务的批次令牌，保证同一任务只被一个执行者领取
+    last_error = Column(Text)  # 最近一次失败的错误信息
+    digest_id = Column(Integer, ForeignKey("daily_digests.id"))  # 成功推送后对应的每日摘要记录
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
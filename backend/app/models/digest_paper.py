@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
+from app.db.session import Base
+
+class DigestPaper(Base):
+    __tablename__ = "digest_papers"
+    __table_args__ = (
+        UniqueConstraint("digest_id", "position", name="uq_digest_papers_digest_position"),  # 按推送顺序读取一次日报的论文
+        Index("ix_digest_papers_user_paper", "user_id", "paper_id"),  # 判断用户是否已经收到过某篇论文
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    digest_id = Column(Integer, ForeignKey("daily_digests.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # 冗余保存接收用户，避免判断是否已推送时关联每日摘要表
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    position = Column(Integer, nullable=False)  # 论文在日报中的顺序，从 0 开始
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, LargeBinary, ForeignKey
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -10,9 +10,12 @@ class Paper(Base):
     authors = Column(JSON)  # 存储作者列表
     abstract = Column(Text)
     structured_abstract = Column(Text)  # LLM 生成的结构化摘要
+    summary_key = Column(String(64), index=True)  # 结构化摘要的内容哈希（原始摘要 + 提示词 + 模型），用于摘要缓存
     url = Column(String(512), unique=True, index=True)
     source = Column(String(50))  # arXiv, PubMed, etc.
     published_date = Column(DateTime)
+    minhash = Column(LargeBinary)  # 标题与摘要词组的 MinHash 签名，用于近似重复检测
+    duplicate_of = Column(Integer, ForeignKey("papers.id"), index=True)  # 近似重复论文指向的原始论文，为空表示不是重复论文
     # embedding = Column(Vector(1536)) # 如果使用 pgvector，但在 MySQL 中可能需要存储为 JSON 或 Blob，或者使用专门的向量数据库
     # 为了简化，这里先不加 embedding 字段，后续可以用专门的向量库或者 MySQL 插件
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, ForeignKey, Index, UniqueConstraint
+from app.db.session import Base
+
+class PaperLSHBand(Base):
+    __tablename__ = "paper_lsh_bands"
+    __table_args__ = (
+        UniqueConstraint("paper_id", "band", "bucket", name="uq_paper_lsh_bands_paper_band_bucket"),  # 同一论文的同一分段只记录一次，重复写入由 insert_ignore 跳过
+        Index("ix_paper_lsh_bands_bucket_band", "bucket", "band"),  # 按分桶查找候选近似重复论文
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    band = Column(SmallInteger, nullable=False)  # MinHash 签名的分段序号
+    bucket = Column(BigInteger, nullable=False)  # 该分段签名的 64 位哈希
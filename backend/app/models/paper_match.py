@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class PaperMatch(Base):
+    __tablename__ = "paper_matches"
+    __table_args__ = (
+        UniqueConstraint("user_id", "paper_id", name="uq_paper_matches_user_paper"),  # 同一篇论文对同一用户只匹配一次
+        Index("ix_paper_matches_user_digest", "user_id", "digest_id"),  # 按用户查找尚未推送的匹配
+        Index("ix_paper_matches_digest_matched", "digest_id", "matched_at"),  # 清理过期的未推送匹配
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    digest_id = Column(Integer, ForeignKey("daily_digests.id"))  # 推送该匹配的每日摘要记录，为空表示尚未推送
+    matched_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -14,7 +14,9 @@ class User(Base):  # 定义用户模型类
     is_verified = Column(Boolean, default=False)  # 标记用户邮箱是否已经完成验证
     subscription_enabled = Column(Boolean, default=True)  # 订阅开关，控制是否参与每日摘要推送
     digest_time = Column(String(5), nullable=True)  # 用户配置的每日推送时间，格式为 HH:MM，可为空表示使用默认时间
-    created_at = Column(DateTime(timezone=True), server_default=func.now())  # 记录用户创建时间
+    digest_timezone = Column(String(64), nullable=True)  # 用户推送时间所在的 IANA 时区，可为空表示使用服务器时区
+    next_digest_at = Column(DateTime, nullable=True, index=True)  # 下一次推送的 UTC 时间，调度器按该索引做范围查询
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # 记录用户创建时间，管理后台按该索引游标分页
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())  # 记录用户最近一次更新时间
 
     profile = relationship("ResearchProfile", back_populates="user", uselist=False)  # 一对一关联科研画像配置
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.admin_stats import AdminStats
+from app.models.subscription import ResearchProfile
+from app.models.user import User
+from app.services.delivery_rollups import delivered_since
+
+STATS_ID = 1
+COUNTERS = ("total_users", "active_users", "subscribed_users", "total_profiles")
+
+
+class AdminStatsStore:
+    """
+    管理后台总览统计：用户与画像计数物化在 admin_stats 的单行中，由注册、订阅开关与画像创建在各自事务内增量更新，
+    读取前置一个短 TTL 缓存。近 24 小时邮件数汇总推送时增量维护的小时时间桶（delivery_rollups），与计数行一起缓存。
+    计数出现漂移时调用 rebuild 全量重算
+    """
+
+    def __init__(self, ttl: float | None = None):
+        self._cache = TTLCache(ttl=settings.ADMIN_STATS_TTL if ttl is None else ttl, capacity=1)
+
+    def increment(self, db: Session, **deltas: int):
+        """
+        在调用方事务内原子累加计数（UPDATE ... SET col = col + delta），不读取旧值，并发写入不会丢失更新；
+        统计行尚不存在时在同一事务内全量重算并创建统计行，重算结果已包含本次变更
+        """
+        values = {name: getattr(AdminStats, name) + delta for name, delta in deltas.items() if delta}
+        if not values:
+            return
+        statement = update(AdminStats).where(AdminStats.id == STATS_ID).values(**values)
+        if db.execute(statement).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                self.rebuild(db)
+        except IntegrityError:
+            # 其他事务抢先创建了统计行，其重算结果不包含本次变更
+            db.execute(statement)
+
+    def user_created(self, db: Session, user: User):
+        """
+        记录一个新用户；先 flush 以便列默认值生效
+        """
+        db.flush()
+        self.increment(
+            db,
+            total_users=1,
+            active_users=int(bool(user.is_active)),
+            subscribed_users=int(bool(user.subscription_enabled)),
+        )
+
+    def overview(self, db: Session) -> dict:
+        """
+        返回管理后台总览统计，缓存命中时不访问数据库
+        """
+        cached = self._cache.get("overview")
+        if cached is not None:
+            return cached
+
+        row = db.get(AdminStats, STATS_ID)
+        if row is None:
+            try:
+                row = self.rebuild(db)
+                db.commit()
+            except IntegrityError:
+                # 其他进程抢先完成了首次重算
+                db.rollback()
+                row = db.get(AdminStats, STATS_ID)
+
+        result = {name: getattr(row, name) for name in COUNTERS}
+        result["daily_emails"] = delivered_since(db, datetime.utcnow() - timedelta(days=1))
+        self._cache.set("overview", result)
+        return result
+
+    def rebuild(self, db: Session) -> AdminStats:
+        """
+        从用户表与画像表全量重算计数并写入统计行，调用方负责提交
+        """
+        total_users, active_users, subscribed_users = db.query(
+            func.count(User.id),
+            func.coalesce(func.sum(case((User.is_active == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((User.subscription_enabled == True, 1), else_=0)), 0),
+        ).one()
+        total_profiles = db.query(func.count(ResearchProfile.id)).scalar() or 0
+
+        row = db.get(AdminStats, STATS_ID)
+        if row is None:
+            row = AdminStats(id=STATS_ID)
+            db.add(row)
+        row.total_users = total_users
+        row.active_users = active_users
+        row.subscribed_users = subscribed_users
+        row.total_profiles = total_profiles
+        row.rebuilt_at = func.now()
+        db.flush()
+        db.refresh(row)
+        self._cache.clear()
+        return row
+
+    def clear(self):
+        self._cache.clear()
+
+
+admin_stats = AdminStatsStore()
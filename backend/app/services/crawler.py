@@ -1,10 +1,203 @@
-import urllib.request
-import urllib.parse
+import threading
 import xml.etree.ElementTree as ET
+from contextlib import closing
+from itertools import islice
+from typing import Iterable, Iterator
 from datetime import datetime
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.models.paper import Paper
+from app.models.paper_lsh_band import PaperLSHBand
 from app.db.session import SessionLocal
+from app.db.upsert import insert_ignore, insert_ignore_returning
+from app.services.dedup import band_rows, find_near_duplicates, minhash_signature, signature_to_bytes
+from app.services.rate_limiter import TokenBucket
+from app.services.sources import SourceAdapter, register_source
+from app.services.paper_router import paper_router
+from app.services.search import index_papers
+
+# arXiv API 返回的是 Atom 格式，需要处理命名空间
+ATOM_NS = {'atom': 'http://www.w3.org/2005/Atom'}
+ENTRY_TAG = '{http://www.w3.org/2005/Atom}entry'
+
+# 进程内共享的 arXiv 限速器，所有抓取线程共用，保证整体遵守 arXiv 的请求间隔要求
+arxiv_rate_limiter = TokenBucket(rate=1 / settings.ARXIV_REQUEST_INTERVAL)
+
+
+def _parse_entry(entry) -> dict:
+    """
+    将单个 Atom entry 元素解析为论文字典
+    """
+    # 获取标题
+    title_elem = entry.find('atom:title', ATOM_NS)
+    title = title_elem.text.replace('\n', ' ').strip() if title_elem is not None else "No Title"
+
+    # 获取摘要
+    summary_elem = entry.find('atom:summary', ATOM_NS)
+    abstract = summary_elem.text.replace('\n', ' ').strip() if summary_elem is not None else "No Abstract"
+
+    # 获取 URL (通常是 id)
+    id_elem = entry.find('atom:id', ATOM_NS)
+    url = id_elem.text.strip() if id_elem is not None else ""
+
+    # 获取发布时间
+    published_elem = entry.find('atom:published', ATOM_NS)
+    published_str = published_elem.text.strip() if published_elem is not None else ""
+    try:
+        # arXiv 时间格式: 2023-10-10T10:10:10Z
+        published_date = datetime.strptime(published_str, '%Y-%m-%dT%H:%M:%SZ')
+    except ValueError:
+        published_date = datetime.now()
+
+    # 获取作者
+    authors = []
+    for author in entry.findall('atom:author', ATOM_NS):
+        name_elem = author.find('atom:name', ATOM_NS)
+        if name_elem is not None:
+            authors.append(name_elem.text.strip())
+
+    # 获取分类，例如 cs.AI、stat.ML，用于入库时按分类路由给订阅用户
+    categories = [c.get('term') for c in entry.findall('atom:category', ATOM_NS) if c.get('term')]
+
+    return {
+        'title': title,
+        'abstract': abstract,
+        'url': url,
+        'published_date': published_date,
+        'authors': authors,
+        'categories': categories,
+        'source': 'arXiv'
+    }
+
+
+def arxiv_id_from_url(url: str) -> str:
+    """
+    从论文链接中提取不含版本号的 arXiv ID，例如 http://arxiv.org/abs/2310.12345v2 -> 2310.12345
+    """
+    arxiv_id = url.rstrip('/').split('/abs/')[-1]
+    base, sep, version = arxiv_id.rpartition('v')
+    return base if sep and version.isdigit() else arxiv_id
+
+
+def iter_arxiv_feed(stream) -> Iterator[dict]:
+    """
+    增量解析 arXiv Atom 文档，逐条产出论文字典；每解析完一个 entry 就清理已处理的元素，保证内存占用平稳
+    :param stream: 可读的二进制文件对象，例如 HTTP 响应的原始流
+    """
+    root = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == ENTRY_TAG:
+            yield _parse_entry(elem)
+            # 清空已解析的 entry 并从根节点中移除，避免整棵树在内存中累积
+            elem.clear()
+            root.clear()
+
+
+class ArxivCrawler(SourceAdapter):
+    """
+    arXiv 数据源适配器：基于连接池复用 keep-alive 连接，多个查询由入库引擎按 max_workers 并发执行，
+    所有请求共享同一个令牌桶限速器，并为每个请求设置超时与带抖动的指数退避重试
+    """
+
+    name = 'arxiv'
+    default_base_url = settings.ARXIV_API_BASE
+
+    def __init__(
+        self,
+        base_url: str = settings.ARXIV_API_BASE,
+        max_workers: int = settings.CRAWLER_MAX_WORKERS,
+        timeout: float = settings.CRAWLER_TIMEOUT,
+        max_retries: int = settings.CRAWLER_MAX_RETRIES,
+        limiter: TokenBucket = arxiv_rate_limiter,
+        page_size: int = settings.ARXIV_PAGE_SIZE,
+    ):
+        super().__init__(
+            base_url=base_url,
+            request_interval=settings.ARXIV_REQUEST_INTERVAL,
+            max_workers=max_workers,
+            page_size=page_size,
+            timeout=timeout,
+            max_retries=max_retries,
+            limiter=limiter,
+        )
+
+    def source_id(self, url: str) -> str:
+        return arxiv_id_from_url(url)
+
+    def _iter_page(self, query: str, start: int, max_results: int) -> Iterator[dict]:
+        params = {
+            'search_query': query,
+            'start': start,
+            'max_results': max_results,
+            'sortBy': 'submittedDate',
+            'sortOrder': 'descending',
+        }
+        with closing(self._request(self.base_url, params)) as response:
+            yield from iter_arxiv_feed(response.raw)
+
+    def fetch(self, query: str, max_results: int = 10, start: int = 0, since: tuple | None = None) -> list:
+        """
+        抓取单个查询的一页结果
+        :param query: 搜索关键词，例如 'cat:cs.AI'
+        :param max_results: 最大抓取数量
+        :param start: 结果偏移量
+        :param since: (最新发布时间, 最新 arXiv ID) 水位线，遇到已见过的论文即停止解析
+        """
+        return list(self.iter_query(query, page_size=max_results, max_total=max_results, start=start, since=since))
+
+    def iter_query(
+        self,
+        query: str,
+        page_size: int | None = None,
+        max_total: int | None = None,
+        start: int = 0,
+        since: tuple | None = None,
+    ) -> Iterator[dict]:
+        """
+        按 start/max_results 窗口逐页抓取并逐条产出论文，适合大批量回填
+        :param query: 搜索关键词，例如 'cat:cs.AI'
+        :param page_size: 每页抓取数量，默认使用数据源的分页大小
+        :param max_total: 最多产出的论文数量，为 None 时抓取到最后一页为止
+        :param start: 起始偏移量
+        :param since: (最新发布时间, 最新 arXiv ID) 水位线，遇到已见过的论文时停止解析与翻页
+        """
+        page_size = page_size or self.page_size
+        produced = 0
+        while max_total is None or produced < max_total:
+            limit = page_size if max_total is None else min(page_size, max_total - produced)
+            count = 0
+            for paper in self._iter_page(query, start, limit):
+                if since is not None and self.reached_watermark(paper, since):
+                    return
+                count += 1
+                produced += 1
+                yield paper
+            # 返回条数不足一页说明已经到达结果末尾
+            if count < limit:
+                return
+            start += count
+
+_default_crawler = None
+_default_crawler_lock = threading.Lock()
+
+
+def get_default_crawler() -> ArxivCrawler:
+    """
+    获取进程内共享的默认抓取引擎实例
+    """
+    global _default_crawler
+    with _default_crawler_lock:
+        if _default_crawler is None:
+            _default_crawler = ArxivCrawler()
+        return _default_crawler
+
+
+register_source(ArxivCrawler.name, get_default_crawler)
+
 
 def fetch_arxiv_papers(query: str, max_results: int = 10):
     """
@@ -12,90 +205,117 @@ def fetch_arxiv_papers(query: str, max_results: int = 10):
     :param query: 搜索关键词，例如 'cat:cs.AI'
     :param max_results: 最大抓取数量
     """
-    base_url = 'http://export.arxiv.org/api/query?'
-    search_query = f'search_query={query}&start=0&max_results={max_results}&sortBy=submittedDate&sortOrder=descending'
-    
     try:
-        response = urllib.request.urlopen(base_url + search_query).read()
-        root = ET.fromstring(response)
-        
-        # arXiv API 返回的是 Atom 格式，需要处理命名空间
-        ns = {'atom': 'http://www.w3.org/2005/Atom'}
-        
-        papers = []
-        for entry in root.findall('atom:entry', ns):
-            # 获取标题
-            title_elem = entry.find('atom:title', ns)
-            title = title_elem.text.replace('\n', ' ').strip() if title_elem is not None else "No Title"
-            
-            # 获取摘要
-            summary_elem = entry.find('atom:summary', ns)
-            abstract = summary_elem.text.replace('\n', ' ').strip() if summary_elem is not None else "No Abstract"
-            
-            # 获取 URL (通常是 id)
-            id_elem = entry.find('atom:id', ns)
-            url = id_elem.text.strip() if id_elem is not None else ""
-            
-            # 获取发布时间
-            published_elem = entry.find('atom:published', ns)
-            published_str = published_elem.text.strip() if published_elem is not None else ""
-            try:
-                # arXiv 时间格式: 2023-10-10T10:10:10Z
-                published_date = datetime.strptime(published_str, '%Y-%m-%dT%H:%M:%SZ')
-            except ValueError:
-                published_date = datetime.now()
-
-            # 获取作者
-            authors = []
-            for author in entry.findall('atom:author', ns):
-                name_elem = author.find('atom:name', ns)
-                if name_elem is not None:
-                    authors.append(name_elem.text.strip())
-            
-            paper = {
-                'title': title,
-                'abstract': abstract,
-                'url': url,
-                'published_date': published_date,
-                'authors': authors,
-                'source': 'arXiv'
-            }
-            papers.append(paper)
-        
-        return papers
+        return get_default_crawler().fetch(query, max_results=max_results)
     except Exception as e:
         print(f"Error parsing arXiv response: {e}")
         return []
 
-def save_papers_to_db(papers: list, db: Session):
+def iter_arxiv_papers(query: str, page_size: int = 100, max_total: int | None = None):
     """
-    保存论文到数据库
+    以生成器方式分页抓取 arXiv 论文，逐条产出论文字典
+    :param query: 搜索关键词，例如 'cat:cs.AI'
+    :param page_size: 每页抓取数量
+    :param max_total: 最多抓取数量，为 None 时抓取全部结果
     """
-    count = 0
-    for paper_data in papers:
-        # 检查是否已存在
-        existing_paper = db.query(Paper).filter(Paper.url == paper_data['url']).first()
-        if existing_paper:
-            continue
-        
-        paper = Paper(
-            title=paper_data['title'],
-            abstract=paper_data['abstract'],
-            url=paper_data['url'],
-            published_date=paper_data['published_date'],
-            authors=paper_data['authors'],
-            source=paper_data['source']
-        )
-        db.add(paper)
-        count += 1
-    
-    db.commit()
-    return count
-
-if __name__ == "__main__":
-    # 测试代码
-    print("开始抓取 arXiv 论文...")
-    papers = fetch_arxiv_papers('cat:cs.AI', 5)
-    print(f"抓取到 {len(papers)} 篇论文")
-    for p in papers:
-        print(f"- {p['title']}")
+    return get_default_crawler().iter_query(query, page_size=page_size, max_total=max_total)
+
+def _upsert_batch(db: Session, batch: list) -> tuple:
+    """
+    对一批论文执行集合式入库：一次 IN 查询找出已存在的论文，再批量插入缺失的论文
+    缺失的论文先经过 MinHash/LSH 近似重复检测，重复论文只记录 duplicate_of，不进入索引、路由与后续摘要
+    返回 (url -> id 映射，重复论文映射到原始论文, 新插入的非重复论文的 id 列表)
+    """
+    rows = {}
+    for paper_data in batch:
+        # 同一批次内按 URL 去重，缺失 URL 的记录无法去重，直接跳过
+        if paper_data.get('url'):
+            rows.setdefault(paper_data['url'], paper_data)
+    if not rows:
+        return {}, []
+
+    url_to_id = {
+        url: duplicate_of or paper_id
+        for url, paper_id, duplicate_of in db.query(Paper.url, Paper.id, Paper.duplicate_of).filter(Paper.url.in_(list(rows))).all()
+    }
+    missing = [url for url in rows if url not in url_to_id]
+    if not missing:
+        return url_to_id, []
+
+    signatures = {url: minhash_signature(rows[url]['title'], rows[url]['abstract']) for url in missing}
+    duplicates = find_near_duplicates(db, signatures)
+    inserted_urls = insert_ignore_returning(db, Paper, [
+        {
+            'title': rows[url]['title'],
+            'abstract': rows[url]['abstract'],
+            'url': url,
+            'published_date': rows[url]['published_date'],
+            'authors': rows[url]['authors'],
+            'source': rows[url]['source'],
+            'minhash': signature_to_bytes(signatures[url]),
+            'duplicate_of': duplicates[url][1] if duplicates.get(url, (None,))[0] == 'paper' else None,
+        }
+        for url in missing
+    ], 'url')
+    stored = {
+        url: (paper_id, duplicate_of)
+        for url, paper_id, duplicate_of in db.query(Paper.url, Paper.id, Paper.duplicate_of).filter(Paper.url.in_(missing)).all()
+    }
+    # 并发写入时冲突的行由抢先插入的写入者负责索引与路由，这里只记录其主键
+    inserted = {url: stored[url][0] for url in missing if url in inserted_urls}
+    for url in missing:
+        if url not in inserted_urls and url in stored:
+            url_to_id[url] = stored[url][1] or stored[url][0]
+
+    new_urls = []
+    for url, paper_id in inserted.items():
+        kind, target = duplicates.get(url, (None, None))
+        if kind == 'batch':
+            # 同批次内的重复论文要等原始论文插入后才知道其主键
+            target = stored.get(target, (None,))[0]
+            if target is not None:
+                db.query(Paper).filter(Paper.id == paper_id).update({'duplicate_of': target}, synchronize_session=False)
+        if target is None:
+            new_urls.append(url)
+        url_to_id[url] = target or paper_id
+
+    new_ids = [inserted[url] for url in new_urls]
+    insert_ignore(db, PaperLSHBand, [row for url in new_urls for row in band_rows(inserted[url], signatures[url])])
+    # 新论文与其近似重复索引、全文索引、路由匹配在同一事务中提交
+    index_papers(db, new_ids)
+    paper_router.route(db, [dict(rows[url], id=inserted[url]) for url in new_urls])
+    if len(new_ids) < len(inserted):
+        print(f"Skipped {len(inserted) - len(new_ids)} near-duplicate papers")
+    return url_to_id, new_ids
+
+
+def upsert_papers(papers: Iterable, db: Session, chunk_size: int = 500, new_ids: list | None = None) -> dict:
+    """
+    批量入库论文，返回包含新旧论文在内的 url -> id 映射，近似重复论文映射到原始论文
+    :param papers: 论文字典的列表或生成器，生成器会按块消费
+    :param chunk_size: 每批处理并提交的论文数量
+    :param new_ids: 提供时追加本次新插入的非重复论文的 id
+    """
+    url_to_id = {}
+    iterator = iter(papers)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        batch_ids, batch_new_ids = _upsert_batch(db, chunk)
+        url_to_id.update(batch_ids)
+        if new_ids is not None:
+            new_ids.extend(batch_new_ids)
+        db.commit()
+    return url_to_id
+
+
+def save_papers_to_db(papers: Iterable, db: Session, chunk_size: int = 500):
+    """
+    保存论文到数据库，返回新插入的论文数量
+    :param papers: 论文字典的列表或生成器，生成器会按块消费
+    :param chunk_size: 每次提交的论文数量
+    """
+    new_ids = []
+    upsert_papers(papers, db, chunk_size=chunk_size, new_ids=new_ids)
+    return len(new_ids)
@@ -0,0 +1,172 @@
+import hashlib
+import re
+import zlib
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.upsert import insert_ignore
+from app.models.paper import Paper
+from app.models.paper_lsh_band import PaperLSHBand
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# 大于 2^32 的最小素数，作为通用哈希 (a*x + b) mod p 的模数
+PRIME = 4294967311
+MAX_HASH = np.uint64(0xFFFFFFFF)
+# 固定种子：签名会落库，不同进程与不同版本必须使用同一组置换
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 2**31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2**31, size=NUM_PERM).astype(np.uint64)
+# 单次查询的 IN 列表长度上限，避免超出数据库的参数数量限制
+LOOKUP_CHUNK = 500
+
+
+def _shingles(text: str) -> set:
+    words = TOKEN_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(title: str, abstract: str | None) -> np.ndarray:
+    """
+    计算标题与摘要的 MinHash 签名：以连续三个词为一个词组，
+    每个词组用 crc32 映射为整数后经过 NUM_PERM 个随机线性置换，各取最小值
+    """
+    shingles = _shingles(f"{title or ''} {abstract or ''}")
+    if not shingles:
+        return np.full(NUM_PERM, MAX_HASH, dtype=np.uint32)
+    values = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a*x + b) 最大约 2^63，不会溢出 uint64
+    hashed = (np.outer(values, _A) + _B) % np.uint64(PRIME)
+    return (hashed.min(axis=0) & MAX_HASH).astype(np.uint32)
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    两个签名中取值相同的位置比例，即 Jaccard 相似度的无偏估计
+    """
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def band_keys(signature: np.ndarray) -> list:
+    """
+    把签名切成 BANDS 段，每段哈希为一个有符号 64 位分桶，返回 [(段序号, 分桶), ...]。
+    两篇 Jaccard 相似度为 s 的论文至少在一段上落入同一分桶的概率为 1 - (1 - s^ROWS)^BANDS
+    """
+    raw = signature.astype("<u4").tobytes()
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(), "big", signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def band_rows(paper_id: int, signature: np.ndarray) -> list:
+    return [{"paper_id": paper_id, "band": band, "bucket": bucket} for band, bucket in band_keys(signature)]
+
+
+def find_near_duplicates(db: Session, signatures: dict, threshold: float | None = None) -> dict:
+    """
+    为一批待入库论文查找近似重复：先按 LSH 分桶从已入库论文中取出候选，只对候选比对完整签名，
+    查找代价与候选数量而不是论文库大小成正比；同一批次内互相重复的论文也会被识别，批次中先出现的一篇视为原始论文
+    :param signatures: 论文标识（例如 url）-> MinHash 签名，按入库顺序排列
+    :return: 被判定为重复的论文标识 -> ("paper", 原始论文主键) 或 ("batch", 同批次原始论文的标识)
+    """
+    if not signatures:
+        return {}
+    threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+    keys = {key: band_keys(signature) for key, signature in signatures.items()}
+
+    buckets = sorted({bucket for pairs in keys.values() for _, bucket in pairs})
+    bucket_papers: dict = {}
+    for start in range(0, len(buckets), LOOKUP_CHUNK):
+        rows = (
+            db.query(PaperLSHBand.band, PaperLSHBand.bucket, PaperLSHBand.paper_id)
+            .filter(PaperLSHBand.bucket.in_(buckets[start:start + LOOKUP_CHUNK]))
+            .all()
+        )
+        for band, bucket, paper_id in rows:
+            bucket_papers.setdefault((band, bucket), set()).add(paper_id)
+
+    candidate_ids = sorted({pid for pairs in keys.values() for pair in pairs for pid in bucket_papers.get(pair, ())})
+    stored: dict = {}
+    for start in range(0, len(candidate_ids), LOOKUP_CHUNK):
+        rows = (
+            db.query(Paper.id, Paper.minhash, Paper.duplicate_of)
+            .filter(Paper.id.in_(candidate_ids[start:start + LOOKUP_CHUNK]), Paper.minhash.isnot(None))
+            .all()
+        )
+        for paper_id, minhash, duplicate_of in rows:
+            stored[paper_id] = (signature_from_bytes(minhash), duplicate_of or paper_id)
+
+    duplicates: dict = {}
+    batch_buckets: dict = {}
+    for key, signature in signatures.items():
+        best, match = threshold, None
+        for pair in keys[key]:
+            for paper_id in bucket_papers.get(pair, ()):
+                if paper_id in stored:
+                    score = similarity(signature, stored[paper_id][0])
+                    if score >= best:
+                        best, match = score, ("paper", stored[paper_id][1])
+        if match is None:
+            for pair in keys[key]:
+                for other in batch_buckets.get(pair, ()):
+                    score = similarity(signature, signatures[other])
+                    if score >= best:
+                        best, match = score, ("batch", other)
+        if match is not None:
+            duplicates[key] = match
+            continue
+        # 只有原始论文参与后续比对，重复论文总是指向最早入库的那一篇
+        for pair in keys[key]:
+            batch_buckets.setdefault(pair, []).append(key)
+    return duplicates
+
+
+def backfill_signatures(db: Session, chunk_size: int = 500) -> tuple:
+    """
+    为尚未计算签名的历史论文按主键顺序补算签名并建立分段索引，同时标记其中的近似重复论文，每块提交一次
+    :return: (处理的论文数量, 标记为重复的论文数量)
+    """
+    processed = flagged = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Paper.id, Paper.title, Paper.abstract)
+            .filter(Paper.id > last_id, Paper.minhash.is_(None))
+            .order_by(Paper.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            break
+        signatures = {paper_id: minhash_signature(title, abstract) for paper_id, title, abstract in rows}
+        duplicates = find_near_duplicates(db, signatures)
+        for paper_id, signature in signatures.items():
+            # 批次内重复时标识本身就是原始论文主键
+            duplicate_of = duplicates[paper_id][1] if paper_id in duplicates else None
+            db.query(Paper).filter(Paper.id == paper_id).update(
+                {"minhash": signature_to_bytes(signature), "duplicate_of": duplicate_of},
+                synchronize_session=False,
+            )
+        insert_ignore(db, PaperLSHBand, [
+            row for paper_id, signature in signatures.items() if paper_id not in duplicates for row in band_rows(paper_id, signature)
+        ])
+        db.commit()
+        processed += len(rows)
+        flagged += len(duplicates)
+        last_id = rows[-1][0]
+    return processed, flagged
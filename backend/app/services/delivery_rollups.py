@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.upsert import insert_or_increment
+from app.models.delivery_rollup import DeliveryRollup
+from app.models.digest import DailyDigest
+from app.models.digest_job import DigestJob
+
+GRANULARITIES = ("hour", "day")
+COUNTERS = ["delivered", "failed", "papers"]
+STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    """
+    把时间按粒度向下取整为时间桶起点
+    """
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_delivery(db: Session, at: datetime | None = None, delivered: int = 0, failed: int = 0, papers: int = 0):
+    """
+    在调用方事务内把一次推送结果累加到所在小时与所在天的时间桶，由调用方负责提交
+    :param at: 推送时间（UTC），默认当前时间
+    """
+    at = at or datetime.utcnow()
+    insert_or_increment(
+        db,
+        DeliveryRollup,
+        [
+            {
+                "granularity": granularity,
+                "bucket_start": bucket_start(at, granularity),
+                "delivered": delivered,
+                "failed": failed,
+                "papers": papers,
+            }
+            for granularity in GRANULARITIES
+        ],
+        keys=["granularity", "bucket_start"],
+        counters=COUNTERS,
+    )
+
+
+def delivery_series(db: Session, start: datetime, end: datetime, granularity: str) -> list[dict]:
+    """
+    读取 [start, end) 范围内的预汇总时间桶，缺失的时间桶补零，保证序列连续
+    """
+    first = bucket_start(start, granularity)
+    rows = {
+        row.bucket_start: row
+        for row in db.query(DeliveryRollup)
+        .filter(
+            DeliveryRollup.granularity == granularity,
+            DeliveryRollup.bucket_start >= first,
+            DeliveryRollup.bucket_start < end,
+        )
+    }
+    series = []
+    current = first
+    while current < end:
+        row = rows.get(current)
+        series.append({
+            "bucket_start": current.isoformat(),
+            **{name: getattr(row, name) if row is not None else 0 for name in COUNTERS},
+        })
+        current += STEPS[granularity]
+    return series
+
+
+def delivered_since(db: Session, since: datetime) -> int:
+    """
+    汇总 since 所在小时及之后的小时时间桶中成功推送的日报数量，最多读取窗口内的几十行；
+    since 所在的整个小时都会被计入，结果按小时粒度近似
+    """
+    total = (
+        db.query(func.coalesce(func.sum(DeliveryRollup.delivered), 0))
+        .filter(DeliveryRollup.granularity == "hour", DeliveryRollup.bucket_start >= bucket_start(since, "hour"))
+        .scalar()
+    )
+    return int(total or 0)
+
+
+def _job_failures(job: DigestJob) -> int:
+    # 历史任务只保留了尝试次数：除最后一次成功或跳过的尝试外，其余尝试都视为失败
+    if job.status in ("done", "skipped", "running"):
+        return max(job.attempts - 1, 0)
+    return job.attempts
+
+
+def rebuild_rollups(db: Session, chunk_size: int = 5000) -> int:
+    """
+    清空并从 daily_digests 与 digest_jobs 全量重算时间桶，调用方负责提交。
+    成功推送按 sent_at 计入；历史失败只能从任务的尝试次数推算，按任务最后更新时间计入
+    :return: 写入的时间桶数量
+    """
+    buckets: dict[tuple[str, datetime], dict] = {}
+
+    def add(at: datetime | None, **deltas: int):
+        if at is None:
+            return
+        at = at.replace(tzinfo=None)
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(at, granularity))
+            counts = buckets.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for name, delta in deltas.items():
+                counts[name] += delta
+
+    digests = db.query(DailyDigest.sent_at, DailyDigest.paper_ids).yield_per(chunk_size)
+    for sent_at, paper_ids in digests:
+        add(sent_at, delivered=1, papers=len(paper_ids or []))
+    jobs = db.query(DigestJob).filter(DigestJob.attempts > 0).yield_per(chunk_size)
+    for job in jobs:
+        failures = _job_failures(job)
+        if failures:
+            add(job.updated_at or job.created_at, failed=failures)
+
+    db.query(DeliveryRollup).delete(synchronize_session=False)
+    rows = [
+        {"granularity": granularity, "bucket_start": start, **counts}
+        for (granularity, start), counts in buckets.items()
+    ]
+    for offset in range(0, len(rows), chunk_size):
+        db.bulk_insert_mappings(DeliveryRollup, rows[offset:offset + chunk_size])
+    return len(rows)
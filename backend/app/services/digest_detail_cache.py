@@ -0,0 +1,48 @@
+import hashlib
+import json
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+
+class DigestDetailCache:
+    """
+    日报详情响应缓存：日报发送后不再变化，按 (digest_id, user_id) 缓存序列化后的响应体与强 ETag，
+    重复查看时不访问数据库、也不重新序列化论文列表
+    """
+
+    def __init__(self, capacity: int | None = None):
+        self._lru = LRUCache(capacity or settings.DIGEST_DETAIL_CACHE_SIZE)
+
+    def get(self, digest_id: int, user_id: int) -> tuple[str, bytes] | None:
+        return self._lru.get((digest_id, user_id))
+
+    def put(self, digest_id: int, user_id: int, payload: dict, cache: bool = True) -> tuple[str, bytes]:
+        """
+        序列化响应并计算强 ETag（响应体的 SHA-256），返回 (etag, 响应体)
+        :param cache: 为 False 时只计算不缓存
+        """
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        if cache:
+            self._lru.set((digest_id, user_id), entry)
+        return entry
+
+    def clear(self):
+        self._lru.clear()
+
+    def stats(self) -> dict:
+        return self._lru.stats()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    判断 If-None-Match 请求头是否命中当前 ETag，按 RFC 9110 对 If-None-Match 使用弱比较
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+digest_detail_cache = DigestDetailCache()
@@ -0,0 +1,104 @@
+from sqlalchemy.orm import Session
+from app.db.upsert import insert_ignore
+from app.models.digest import DailyDigest
+from app.models.digest_paper import DigestPaper
+from app.models.paper import Paper
+
+CHECK_CHUNK = 1000
+
+
+def record_digest_papers(db: Session, digest: DailyDigest, paper_ids: list[int]):
+    """
+    按推送顺序写入一次日报包含的论文，由调用方负责提交
+    """
+    db.add_all(
+        DigestPaper(digest_id=digest.id, user_id=digest.user_id, paper_id=paper_id, position=position)
+        for position, paper_id in enumerate(paper_ids)
+    )
+
+
+def digest_papers(db: Session, digest_id: int) -> list[Paper]:
+    """
+    一次按顺序的关联查询读取日报中的论文
+    """
+    return (
+        db.query(Paper)
+        .join(DigestPaper, DigestPaper.paper_id == Paper.id)
+        .filter(DigestPaper.digest_id == digest_id)
+        .order_by(DigestPaper.position)
+        .all()
+    )
+
+
+def delivered_paper_ids(db: Session, user_ids: list[int], paper_ids: list[int]) -> dict[int, set[int]]:
+    """
+    批量判断一批用户已经收到过哪些论文，走 (user_id, paper_id) 索引
+    :return: 用户主键 -> 已收到过的论文主键集合，只包含给定的论文
+    """
+    delivered: dict[int, set[int]] = {}
+    if not user_ids or not paper_ids:
+        return delivered
+    paper_ids = sorted(set(paper_ids))
+    for offset in range(0, len(paper_ids), CHECK_CHUNK):
+        rows = (
+            db.query(DigestPaper.user_id, DigestPaper.paper_id)
+            .filter(
+                DigestPaper.user_id.in_(user_ids),
+                DigestPaper.paper_id.in_(paper_ids[offset:offset + CHECK_CHUNK]),
+            )
+            .distinct()
+        )
+        for user_id, paper_id in rows:
+            delivered.setdefault(user_id, set()).add(paper_id)
+    return delivered
+
+
+def exclude_delivered(db: Session, candidates: dict[int, list[dict]]) -> dict[int, list[dict]]:
+    """
+    从每个用户的候选论文中去掉该用户已经收到过的论文，避免跨天重复推送
+    :param candidates: 用户主键 -> 候选论文字典列表（需包含 id）
+    """
+    delivered = delivered_paper_ids(
+        db,
+        list(candidates),
+        [paper["id"] for papers in candidates.values() for paper in papers if paper.get("id") is not None],
+    )
+    return {
+        user_id: [paper for paper in papers if paper.get("id") not in delivered.get(user_id, ())]
+        for user_id, papers in candidates.items()
+    }
+
+
+def migrate_digest_papers(db: Session, chunk_size: int = 1000) -> int:
+    """
+    把历史每日摘要中 paper_ids JSON 展开写入 digest_papers，可重复执行：
+    已写入的 (digest_id, position) 直接跳过，已被删除的论文不再写入。每处理一块提交一次
+    :return: 处理的每日摘要数量
+    """
+    migrated = 0
+    last_id = 0
+    while True:
+        digests = (
+            db.query(DailyDigest.id, DailyDigest.user_id, DailyDigest.paper_ids)
+            .filter(DailyDigest.id > last_id, DailyDigest.paper_ids.isnot(None))
+            .order_by(DailyDigest.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not digests:
+            return migrated
+        wanted = {paper_id for _, _, paper_ids in digests for paper_id in paper_ids or []}
+        existing = {paper_id for (paper_id,) in db.query(Paper.id).filter(Paper.id.in_(wanted))} if wanted else set()
+        insert_ignore(
+            db,
+            DigestPaper,
+            [
+                {"digest_id": digest_id, "user_id": user_id, "paper_id": paper_id, "position": position}
+                for digest_id, user_id, paper_ids in digests
+                for position, paper_id in enumerate(paper_ids or [])
+                if paper_id in existing
+            ],
+        )
+        db.commit()
+        migrated += len(digests)
+        last_id = digests[-1][0]
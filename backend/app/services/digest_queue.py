@@ -0,0 +1,222 @@
+import uuid  # 导入 uuid 用于生成领取批次令牌
+from datetime import datetime, timedelta  # 导入时间工具用于计算重试与超时时间
+from sqlalchemy.orm import Session  # 导入 Session 类型用于类型标注
+from app.core.config import settings  # 导入全局配置对象，读取队列批量大小与重试策略
+from app.db.upsert import insert_ignore  # 导入插入忽略冲突的工具函数，保证入队幂等
+from app.models.digest import DailyDigest  # 导入每日摘要模型用于关联任务结果
+from app.models.digest_job import DigestJob  # 导入推送任务队列模型
+from app.models.user import User  # 导入用户模型以查询到期用户
+from app.services.schedule import local_date, schedule_next  # 导入逻辑日期计算与下一次推送时间推进函数
+
+
+JOB_PENDING = "pending"  # 等待执行
+JOB_RUNNING = "running"  # 已被执行者领取
+JOB_SENDING = "sending"  # 执行者正在发送邮件，结果未知时不再重试，避免重复发送
+JOB_DONE = "done"  # 已成功推送
+JOB_SKIPPED = "skipped"  # 无需推送（没有论文或用户已关闭订阅）
+JOB_FAILED = "failed"  # 超过最大尝试次数仍未成功
+
+
+def _backfill_schedules(db: Session, now: datetime):  # 定义内部工具函数，为尚未计算推送时间的订阅用户补齐 next_digest_at
+    users = (  # 查询尚未计算下一次推送时间的订阅用户（新注册用户或历史数据）
+        db.query(User)  # 从用户表中查询
+        .filter(  # 添加过滤条件
+            User.next_digest_at.is_(None),  # 下一次推送时间为空
+            User.is_active == True,  # 用户处于活跃状态
+            User.subscription_enabled == True,  # 用户开启了订阅
+        )  # 结束过滤条件
+        .all()  # 执行查询并返回列表
+    )  # 结束查询表达式
+    for user in users:  # 遍历每一个需要补齐的用户
+        schedule_next(user, now)  # 计算下一次推送时间
+    if users:  # 如果补齐了任意用户
+        db.commit()  # 提交推送时间更新
+
+
+def enqueue_due_jobs(db: Session, now: datetime) -> int:  # 定义入队函数，把所有到期用户记录为推送任务
+    """
+    为 next_digest_at 已到期的订阅用户各记录一条 (用户, 逻辑日期) 推送任务并推进其下一次推送时间。
+    同一用户同一逻辑日期只会入队一次，重复执行或与其他调度进程并发执行都是幂等的；
+    上一轮执行超时期间到期的用户仍满足 next_digest_at <= now，会在本轮补齐入队
+    :return: 本轮到期的用户数量
+    """
+    _backfill_schedules(db, now)  # 为尚未计算推送时间的订阅用户补齐调度信息
+
+    due_users = (  # 构造索引范围查询，只加载已经到期的订阅用户
+        db.query(User)  # 从用户表中查询
+        .filter(  # 添加过滤条件
+            User.next_digest_at <= now,  # 下一次推送时间已到（命中 next_digest_at 索引）
+            User.is_active == True,  # 仅选择活跃用户
+            User.subscription_enabled == True,  # 仅选择开启订阅的用户
+        )  # 结束过滤条件
+        .order_by(User.next_digest_at)  # 按到期时间先后处理
+        .all()  # 执行查询并返回列表
+    )  # 结束查询表达式
+    if not due_users:  # 如果没有到期用户
+        return 0  # 直接返回
+
+    insert_ignore(  # 批量写入推送任务，唯一键冲突（同一天已入队）的行直接跳过
+        db,  # 数据库会话
+        DigestJob,  # 推送任务模型
+        [  # 任务行列表
+            {  # 单个任务行
+                "user_id": user.id,  # 所属用户
+                "logical_date": local_date(user.next_digest_at, user.digest_timezone),  # 用户本地时区下的推送日期
+                "scheduled_for": user.next_digest_at,  # 计划推送时间
+                "run_after": user.next_digest_at,  # 立即可执行
+                "status": JOB_PENDING,  # 初始状态
+                "attempts": 0,  # 尚未尝试
+            }  # 结束任务行
+            for user in due_users  # 遍历每个到期用户
+        ],  # 结束任务行列表
+    )  # 结束批量写入
+    for user in due_users:  # 遍历每个到期用户
+        schedule_next(user, now)  # 推进下一次推送时间，避免下一轮重复入队
+    db.commit()  # 任务与推送时间在同一事务中提交
+    return len(due_users)  # 返回到期用户数量
+
+
+def claim_jobs(db: Session, now: datetime, limit: int | None = None) -> list[DigestJob]:  # 定义领取函数，原子地领取一批可执行任务
+    """
+    领取最多 limit 条可执行任务并标记为 running，每次领取计入一次尝试；领取超时（执行者崩溃）的任务视为一次失败的尝试，
+    记录 last_error 后退回 pending，达到最大尝试次数时标记为 failed；发送中超时的任务直接标记为 failed。
+    通过带状态条件的 UPDATE 与批次令牌领取，多个执行者并发领取时同一任务只会被一个执行者拿到
+    """
+    limit = limit or settings.DIGEST_JOB_BATCH_SIZE  # 未指定时使用配置的单批领取数量
+    expired = (  # 领取超时（执行者崩溃或被调度者放弃）的任务，领取时已计入一次尝试
+        DigestJob.status == JOB_RUNNING,  # 处于执行中
+        DigestJob.locked_at < now - timedelta(seconds=settings.DIGEST_JOB_LEASE_SECONDS),  # 且领取时间已超过租约
+    )  # 结束过滤条件
+    (  # 已达到最大尝试次数的超时任务标记为最终失败
+        db.query(DigestJob)  # 从任务表中查询
+        .filter(*expired, DigestJob.attempts >= settings.DIGEST_JOB_MAX_ATTEMPTS)  # 尝试次数已用完
+        .update(  # 标记为最终失败
+            {"status": JOB_FAILED, "locked_by": None, "last_error": "Lease expired; max attempts reached"},  # 记录原因
+            synchronize_session=False,  # 批量更新无需同步会话中的对象
+        )  # 结束 update 调用
+    )  # 结束回收语句
+    (  # 其余超时任务退回等待状态；租约本身已经推迟了重试，回收后即可再次领取
+        db.query(DigestJob)  # 从任务表中查询
+        .filter(*expired)  # 尚未用完尝试次数的超时任务
+        .update(  # 重新置为等待执行
+            {  # 更新字段
+                "status": JOB_PENDING,  # 等待执行
+                "locked_by": None,  # 释放领取令牌，原执行者之后的条件更新不会生效
+                "last_error": "Lease expired",  # 记录原因
+                "run_after": now,  # 立即可执行
+            },  # 结束更新字段
+            synchronize_session=False,  # 批量更新无需同步会话中的对象
+        )  # 结束 update 调用
+    )  # 结束回收语句
+    (  # 发送中途执行者退出的任务：邮件可能已经发出，标记为失败而不重试，避免重复发送
+        db.query(DigestJob)  # 从任务表中查询
+        .filter(  # 添加过滤条件
+            DigestJob.status == JOB_SENDING,  # 处于发送中
+            DigestJob.locked_at < now - timedelta(seconds=settings.DIGEST_JOB_LEASE_SECONDS),  # 且已超过租约
+        )  # 结束过滤条件
+        .update(  # 标记为最终失败
+            {"status": JOB_FAILED, "locked_by": None, "last_error": "Worker lost while sending; delivery state unknown, not retried"},  # 记录原因
+            synchronize_session=False,  # 批量更新无需同步会话中的对象
+        )  # 结束 update 调用
+    )  # 结束回收语句
+
+    ids = [  # 查询最早可执行的一批任务主键
+        job_id  # 任务主键
+        for (job_id,) in db.query(DigestJob.id)  # 只读取主键列
+        .filter(DigestJob.status == JOB_PENDING, DigestJob.run_after <= now)  # 等待执行且已到可执行时间（命中状态索引）
+        .order_by(DigestJob.run_after, DigestJob.id)  # 先到期的先执行，积压任务按顺序补齐
+        .limit(limit)  # 限制单批数量
+    ]  # 结束主键列表
+    if not ids:  # 如果没有可执行任务
+        db.commit()  # 提交回收语句
+        return []  # 返回空列表
+
+    token = uuid.uuid4().hex  # 生成本批次的领取令牌
+    (  # 条件更新领取任务，其他执行者已领取的任务不会被覆盖
+        db.query(DigestJob)  # 从任务表中查询
+        .filter(DigestJob.id.in_(ids), DigestJob.status == JOB_PENDING)  # 仍处于等待状态的任务
+        .update(  # 标记为执行中
+            {  # 更新字段
+                "status": JOB_RUNNING,  # 执行中
+                "locked_at": now,  # 领取时间
+                "locked_by": token,  # 领取令牌
+                "attempts": DigestJob.attempts + 1,  # 尝试次数加一
+            },  # 结束更新字段
+            synchronize_session=False,  # 批量更新无需同步会话中的对象
+        )  # 结束 update 调用
+    )  # 结束领取语句
+    db.commit()  # 提交领取结果，使其他执行者可见
+
+    return (  # 返回本批次实际领取到的任务
+        db.query(DigestJob)  # 从任务表中查询
+        .filter(DigestJob.locked_by == token, DigestJob.status == JOB_RUNNING)  # 按领取令牌筛选
+        .order_by(DigestJob.run_after, DigestJob.id)  # 保持执行顺序
+        .all()  # 执行查询并返回列表
+    )  # 结束查询表达式
+
+
+def transition_job(db: Session, job_id: int, token: str, from_status: str, values: dict) -> bool:  # 定义工具函数，按领取令牌条件更新任务状态
+    """
+    只有任务仍处于 from_status 且仍由 token 持有时才更新，任务已被回收给其他执行者时不做任何修改；由调用方负责提交
+    :return: 是否更新成功
+    """
+    updated = (  # 条件更新任务
+        db.query(DigestJob)  # 从任务表中查询
+        .filter(DigestJob.id == job_id, DigestJob.locked_by == token, DigestJob.status == from_status)  # 仍由本执行者持有且状态未变
+        .update(values, synchronize_session="evaluate")  # 更新指定字段，并同步会话中同一任务对象的状态
+    )  # 结束条件更新
+    return updated == 1  # 返回是否命中
+
+
+def renew_lease(db: Session, job: DigestJob, token: str, now: datetime) -> bool:  # 定义工具函数，执行者开始处理任务时续租
+    """
+    执行者真正开始处理任务时刷新领取时间并立即提交，租约从开始执行而不是从领取时计算；
+    返回 False 表示任务已被回收给其他执行者，不得继续处理
+    """
+    renewed = transition_job(db, job.id, token, JOB_RUNNING, {"locked_at": now})  # 条件刷新领取时间
+    db.commit()  # 立即提交，使回收逻辑看到新的领取时间
+    return renewed  # 返回是否仍持有任务
+
+
+def start_sending(db: Session, job: DigestJob, token: str, now: datetime) -> bool:  # 定义工具函数，发送前确认任务仍由本执行者持有
+    """
+    发送邮件前把任务从 running 改为 sending 并立即提交；返回 False 表示任务已被回收，不得发送。
+    sending 状态的任务不会被租约回收重新执行，执行者在发送中途退出时由 claim_jobs 标记为 failed
+    """
+    claimed = transition_job(db, job.id, token, JOB_RUNNING, {"status": JOB_SENDING, "locked_at": now})  # 条件更新为发送中，同时续租
+    db.commit()  # 立即提交，使其他执行者可见
+    return claimed  # 返回是否可以发送
+
+
+def mark_sent(db: Session, job: DigestJob, token: str) -> bool:  # 定义工具函数，邮件发送成功后立即标记为完成
+    """
+    邮件发送成功后、写入推送记录等后续簿记之前把任务标记为 done 并立即提交，
+    后续簿记失败不会让任务重新进入队列而再次发送；领取令牌保留到簿记完成后由 finish_job 释放
+    """
+    sent = transition_job(db, job.id, token, JOB_SENDING, {"status": JOB_DONE, "last_error": None})  # 条件更新为已完成
+    db.commit()  # 立即提交
+    return sent  # 返回是否更新成功
+
+
+def finish_job(db: Session, job: DigestJob, token: str, digest: DailyDigest | None = None) -> bool:  # 定义工具函数，标记任务执行完成
+    """
+    有每日摘要记录时关联记录（任务已由 mark_sent 标记为 done），否则把 running 任务标记为 skipped；
+    均按领取令牌条件更新，由调用方负责提交
+    """
+    if digest is not None:  # 如果已经发送并写入了推送记录
+        return transition_job(db, job.id, token, JOB_DONE, {"digest_id": digest.id, "locked_by": None})  # 关联推送记录并释放令牌
+    return transition_job(db, job.id, token, JOB_RUNNING, {"status": JOB_SKIPPED, "last_error": None, "locked_by": None})  # 标记为跳过并释放令牌  # 返回是否更新成功
+
+
+def fail_job(db: Session, job: DigestJob, token: str, error: str, now: datetime) -> bool:  # 定义工具函数，记录任务失败并安排重试
+    """
+    未超过最大尝试次数时退回 pending 并按尝试次数线性推迟可执行时间，否则标记为 failed；
+    只对仍由本执行者持有的 running 或 sending（发送明确失败）任务生效，由调用方负责提交
+    """
+    values = {"last_error": error[:2000], "locked_by": None}  # 记录截断后的错误信息并释放领取令牌
+    if job.attempts >= settings.DIGEST_JOB_MAX_ATTEMPTS:  # 如果已经达到最大尝试次数
+        values["status"] = JOB_FAILED  # 标记为最终失败
+    else:  # 否则安排重试
+        values["status"] = JOB_PENDING  # 退回等待状态
+        values["run_after"] = now + timedelta(seconds=settings.DIGEST_JOB_RETRY_DELAY * job.attempts)  # 推迟可执行时间，避免在同一轮内反复重试
+    return transition_job(db, job.id, token, job.status, values)  # 按当前状态条件更新
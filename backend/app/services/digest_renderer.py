@@ -0,0 +1,46 @@
+import os  # 导入 os 用于定位模板目录
+from jinja2 import Environment, FileSystemLoader, select_autoescape  # 导入 Jinja2 模板引擎
+from markupsafe import Markup  # 导入 Markup 标记已转义的 HTML 片段
+from app.core.cache import LRUCache  # 导入进程内 LRU 缓存
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")  # 模板目录 app/templates
+
+_env = Environment(  # 创建模板环境
+    loader=FileSystemLoader(TEMPLATE_DIR),  # 从模板目录加载
+    autoescape=select_autoescape(["html"]),  # HTML 模板自动转义标题、作者与摘要中的特殊字符
+    auto_reload=False,  # 模板只在进程启动时编译一次
+)  # 结束模板环境创建
+
+
+class DigestRenderer:  # 定义日报邮件渲染器
+    """
+    使用预编译模板渲染日报邮件：每篇论文的卡片片段按 (论文, 摘要) 缓存，
+    同一篇论文推送给多个用户时只渲染一次，每个用户的邮件只需拼接缓存的片段
+    """
+
+    def __init__(self, capacity: int = 4096):  # 初始化渲染器
+        self._paper_template = _env.get_template("email/paper_card.html")  # 论文卡片模板
+        self._digest_template = _env.get_template("email/digest.html")  # 邮件整体模板
+        self._fragments = LRUCache(capacity)  # 论文卡片片段缓存
+
+    def render_paper(self, paper: dict, summary: str) -> Markup:  # 渲染单篇论文的卡片片段
+        """
+        缓存键为论文主键（未入库时为链接）与摘要文本，摘要重新生成后自动得到新的片段
+        """
+        key = (paper.get("id") or paper["url"], summary)  # 摘要文本本身即为摘要版本
+        fragment = self._fragments.get(key)  # 查询片段缓存
+        if fragment is None:  # 如果缓存未命中
+            fragment = Markup(self._paper_template.render(paper=paper, summary=summary))  # 渲染并标记为安全 HTML
+            self._fragments.set(key, fragment)  # 写入片段缓存
+        return fragment  # 返回卡片片段
+
+    def render_digest(self, papers: list[dict], summaries: list[str]) -> str:  # 渲染一封日报邮件
+        body = Markup("\n").join(self.render_paper(paper, summary) for paper, summary in zip(papers, summaries))  # 拼接各论文的缓存片段
+        return self._digest_template.render(body=body)  # 套用邮件整体模板
+
+    def stats(self) -> dict:  # 返回片段缓存的命中统计
+        return self._fragments.stats()  # 复用 LRU 缓存统计
+
+
+digest_renderer = DigestRenderer()  # 创建进程内共享的渲染器实例
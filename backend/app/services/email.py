@@ -1,30 +1,57 @@
+import queue  # 导入 queue 模块，用于管理 SMTP 连接池
 import smtplib  # 导入 smtplib 库，用于连接 SMTP 服务器发送邮件
+import threading  # 导入 threading 模块，用于保护连接池计数
 from email.mime.text import MIMEText  # 导入 MIMEText，用于构造文本或 HTML 邮件内容
 from email.mime.multipart import MIMEMultipart  # 导入 MIMEMultipart，用于组合多部分邮件内容
 from sqlalchemy.orm import Session  # 导入 Session 类型，用于类型标注数据库会话
 from app.core.config import settings  # 导入全局配置对象，用于读取环境变量配置
+from app.core.cache import TTLCache  # 导入带过期时间的缓存，用于缓存当前生效的 SMTP 配置
 from app.models.email_config import EmailConfig  # 导入邮箱配置模型，以便从数据库获取 SMTP 设置
 
 
+# 缓存从数据库加载的 SMTP 配置，避免每封邮件都查询一次数据库；
+# 本进程内由 upsert_email_settings 主动失效，设置较短的过期时间兜底多进程部署下的配置变更
+_smtp_settings_cache = TTLCache(ttl=60, capacity=1)  # 创建只保存一份配置的缓存
+_SMTP_SETTINGS_KEY = "active"  # 缓存中当前生效配置的键
+
+
+def invalidate_smtp_settings_cache():  # 定义缓存失效函数，在邮箱配置被修改后调用
+    _smtp_settings_cache.clear()  # 清空缓存，下一次发送时重新从数据库加载
+
+
 def _load_smtp_settings(db: Session | None):  # 定义内部工具函数，用于加载当前生效的 SMTP 配置
     if db is not None:  # 如果提供了数据库会话
-        config = (  # 从数据库中查询当前启用的邮箱配置
-            db.query(EmailConfig)  # 在邮箱配置表中构建查询
-            .filter(EmailConfig.is_active == True)  # 仅筛选启用状态记录
-            .order_by(EmailConfig.created_at.desc())  # 按创建时间倒序，最新的优先
-            .first()  # 仅取一条记录
-        )  # 结束查询表达式
-        if config:  # 如果找到了启用配置
-            return {  # 返回从数据库中组装的 SMTP 配置字典
-                "host": config.smtp_host,  # 使用数据库中的服务器地址
-                "port": config.smtp_port,  # 使用数据库中的服务器端口
-                "tls": config.smtp_tls,  # 使用数据库中的 TLS 开关配置
-                "user": config.smtp_user,  # 使用数据库中的登录用户名
-                "password": config.smtp_password,  # 使用数据库中的登录密码
-                "from_email": config.from_email,  # 使用数据库中的发件人邮箱
-                "from_name": config.from_name or config.from_email,  # 优先使用发件人名称，缺失时退回邮箱
-            }  # 结束配置字典
-    # 如果数据库中没有配置或未提供会话，则回退到环境变量中的配置
+        cached = _smtp_settings_cache.get(_SMTP_SETTINGS_KEY)  # 先尝试读取缓存中的配置
+        if cached is not None:  # 如果缓存命中
+            return cached  # 直接返回缓存的配置
+        smtp_settings = _query_smtp_settings(db)  # 从数据库或环境变量加载配置
+        _smtp_settings_cache.set(_SMTP_SETTINGS_KEY, smtp_settings)  # 写入缓存
+        return smtp_settings  # 返回加载到的配置
+    return _env_smtp_settings()  # 未提供会话时直接使用环境变量中的配置
+
+
+def _query_smtp_settings(db: Session):  # 定义内部工具函数，从数据库查询当前启用的 SMTP 配置
+    config = (  # 从数据库中查询当前启用的邮箱配置
+        db.query(EmailConfig)  # 在邮箱配置表中构建查询
+        .filter(EmailConfig.is_active == True)  # 仅筛选启用状态记录
+        .order_by(EmailConfig.created_at.desc())  # 按创建时间倒序，最新的优先
+        .first()  # 仅取一条记录
+    )  # 结束查询表达式
+    if config:  # 如果找到了启用配置
+        return {  # 返回从数据库中组装的 SMTP 配置字典
+            "host": config.smtp_host,  # 使用数据库中的服务器地址
+            "port": config.smtp_port,  # 使用数据库中的服务器端口
+            "tls": config.smtp_tls,  # 使用数据库中的 TLS 开关配置
+            "user": config.smtp_user,  # 使用数据库中的登录用户名
+            "password": config.smtp_password,  # 使用数据库中的登录密码
+            "from_email": config.from_email,  # 使用数据库中的发件人邮箱
+            "from_name": config.from_name or config.from_email,  # 优先使用发件人名称，缺失时退回邮箱
+        }  # 结束配置字典
+    # 如果数据库中没有配置，则回退到环境变量中的配置
+    return _env_smtp_settings()  # 返回基于环境变量的 SMTP 配置
+
+
+def _env_smtp_settings():  # 定义内部工具函数，读取环境变量中的 SMTP 配置
     return {  # 返回基于环境变量的 SMTP 配置字典
         "host": settings.SMTP_HOST,  # 使用环境变量中的服务器地址
         "port": settings.SMTP_PORT,  # 使用环境变量中的服务器端口
@@ -36,6 +63,24 @@ def _load_smtp_settings(db: Session | None):  # 定义内部工具函数，用
     }  # 结束配置字典
 
 
+def _build_message(smtp_settings: dict, to_email: str, subject: str, html_content: str) -> MIMEMultipart:  # 定义内部工具函数，构造 HTML 邮件对象
+    message = MIMEMultipart("alternative")  # 创建多部分邮件对象，便于扩展附件或多种内容格式
+    message["Subject"] = subject  # 设置邮件主题为传入的 subject
+    message["From"] = smtp_settings["from_email"]  # 设置发件人邮箱地址
+    message["To"] = to_email  # 设置收件人邮箱地址
+    message.attach(MIMEText(html_content, "html"))  # 创建 HTML 格式的邮件内容部分并附加到邮件对象中
+    return message  # 返回构造好的邮件对象
+
+
+def _open_connection(smtp_settings: dict) -> smtplib.SMTP:  # 定义内部工具函数，建立并登录一条 SMTP 连接
+    server = smtplib.SMTP(smtp_settings["host"], smtp_settings["port"], timeout=30)  # 建立与 SMTP 服务器的连接并设置超时
+    if smtp_settings["tls"]:  # 如果配置要求启用 TLS 加密
+        server.starttls()  # 启动 TLS 加密通道
+    if smtp_settings["user"] and smtp_settings["password"]:  # 如果配置了账号密码
+        server.login(smtp_settings["user"], smtp_settings["password"])  # 使用账号密码登录 SMTP 服务器
+    return server  # 返回已就绪的连接
+
+
 def send_email(db: Session | None, to_email: str, subject: str, html_content: str):  # 定义通用发送邮件函数，优先使用数据库中的配置
     """
     发送邮件
@@ -46,19 +91,8 @@ def send_email(db: Session | None, to_email: str, subject: str, html_content: st
         return True  # 返回 True 表示逻辑上视为发送成功
 
     try:  # 使用 try 块捕获发送过程中可能出现的异常
-        message = MIMEMultipart("alternative")  # 创建多部分邮件对象，便于扩展附件或多种内容格式
-        message["Subject"] = subject  # 设置邮件主题为传入的 subject
-        message["From"] = smtp_settings["from_email"]  # 设置发件人邮箱地址
-        message["To"] = to_email  # 设置收件人邮箱地址
-
-        part = MIMEText(html_content, "html")  # 创建 HTML 格式的邮件内容部分
-        message.attach(part)  # 将 HTML 内容附加到邮件对象中
-
-        with smtplib.SMTP(smtp_settings["host"], smtp_settings["port"]) as server:  # 建立与 SMTP 服务器的连接
-            if smtp_settings["tls"]:  # 如果配置要求启用 TLS 加密
-                server.starttls()  # 启动 TLS 加密通道
-            if smtp_settings["user"] and smtp_settings["password"]:  # 如果配置了账号密码
-                server.login(smtp_settings["user"], smtp_settings["password"])  # 使用账号密码登录 SMTP 服务器
+        message = _build_message(smtp_settings, to_email, subject, html_content)  # 构造 HTML 邮件对象
+        with _open_connection(smtp_settings) as server:  # 建立并登录 SMTP 连接
             server.sendmail(  # 调用 sendmail 方法发送邮件
                 smtp_settings["from_email"],  # 指定发件人邮箱
                 to_email,  # 指定收件人邮箱
@@ -68,3 +102,106 @@ def send_email(db: Session | None, to_email: str, subject: str, html_content: st
     except Exception as e:  # 捕获所有异常
         print(f"Email Error: {e}")  # 打印错误信息便于诊断
         return False  # 返回 False 表示发送失败
+
+
+def _is_connection_error(exc: Exception) -> bool:  # 定义内部工具函数，判断异常是否意味着连接已不可用
+    # smtplib.SMTPException 继承自 OSError，必须先排除服务器的应答错误（收件人被拒、发件人被拒、数据被拒等），
+    # 只有连接断开、连接建立失败与套接字层面的错误才需要丢弃连接重连
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):  # 连接断开或建立失败
+        return True  # 需要重连
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)  # 套接字错误需要重连，其余 SMTP 应答错误不需要
+
+
+class SMTPMailer:  # 定义批量投递使用的邮件发送器，在一轮投递中复用已登录的 SMTP 连接
+    """
+    SMTP 连接池发送器：维护少量已完成 STARTTLS 与登录的长连接，
+    同一连接连续发送多封邮件，连接断开时自动重连重试
+    """
+
+    def __init__(self, smtp_settings: dict, pool_size: int = 2, max_messages_per_connection: int = 100):  # 初始化发送器
+        self.smtp_settings = smtp_settings  # 保存本轮使用的 SMTP 配置
+        self.pool_size = pool_size  # 最多同时保持的连接数量
+        self.max_messages_per_connection = max_messages_per_connection  # 单条连接最多发送的邮件数量，超过后重建连接
+        self._idle: queue.LifoQueue = queue.LifoQueue()  # 空闲连接队列，后进先出以优先复用最热的连接
+        self._slots = threading.BoundedSemaphore(pool_size)  # 限制同时在用的连接数量
+        self._lock = threading.Lock()  # 保护已打开连接列表
+        self._connections: list = []  # 记录所有打开过的连接，便于关闭
+        self.sent = 0  # 本轮成功发送的邮件数量
+        self.failed = 0  # 本轮发送失败的邮件数量
+
+    @classmethod
+    def from_db(cls, db: Session | None, **kwargs) -> "SMTPMailer":  # 定义工厂方法，使用当前生效的 SMTP 配置创建发送器
+        return cls(_load_smtp_settings(db), **kwargs)  # 加载（可能来自缓存的）配置并创建发送器
+
+    def _count(self, field: str):  # 线程安全地累加发送统计
+        with self._lock:  # 多个执行者线程共享同一发送器
+            setattr(self, field, getattr(self, field) + 1)  # 累加对应计数器
+
+    def _acquire(self) -> list:  # 从连接池中取出一条连接，没有空闲连接时新建
+        try:  # 尝试获取空闲连接
+            return self._idle.get_nowait()  # 返回 [连接, 已发送数量] 形式的连接条目
+        except queue.Empty:  # 没有空闲连接
+            entry = [_open_connection(self.smtp_settings), 0]  # 新建并登录一条连接
+            with self._lock:  # 加锁记录新连接
+                self._connections.append(entry)  # 加入已打开连接列表
+            return entry  # 返回新连接条目
+
+    def _discard(self, entry: list):  # 关闭并丢弃一条连接
+        with self._lock:  # 加锁更新连接列表
+            if entry in self._connections:  # 如果该连接仍在列表中
+                self._connections.remove(entry)  # 从列表中移除
+        try:  # 关闭过程中的异常无需处理
+            entry[0].quit()  # 礼貌地结束会话
+        except Exception:  # 连接可能已经断开
+            entry[0].close()  # 直接关闭底层套接字
+
+    def send(self, to_email: str, subject: str, html_content: str) -> bool:  # 发送一封邮件，返回是否成功
+        if not self.smtp_settings["host"]:  # 如果没有配置 SMTP 服务器地址
+            print(f"Mock Email Sent to {to_email}: {subject}")  # 打印模拟发送日志，便于开发环境调试
+            self._count("sent")  # 模拟发送同样计入成功数量
+            return True  # 返回 True 表示逻辑上视为发送成功
+
+        message = _build_message(self.smtp_settings, to_email, subject, html_content).as_string()  # 构造并序列化邮件
+        with self._slots:  # 占用一个连接名额
+            for attempt in range(2):  # 最多尝试两次：第一次使用已有连接，失败后重连重试一次
+                entry = None  # 初始化连接条目
+                try:  # 捕获连接与发送过程中的异常
+                    entry = self._acquire()  # 取出一条连接
+                    entry[0].sendmail(self.smtp_settings["from_email"], to_email, message)  # 在该连接上发送邮件
+                    entry[1] += 1  # 累加该连接已发送的邮件数量
+                    if entry[1] >= self.max_messages_per_connection:  # 如果该连接发送数量达到上限
+                        self._discard(entry)  # 关闭连接，下一封邮件会新建连接
+                    else:  # 否则
+                        self._idle.put(entry)  # 归还到空闲队列继续复用
+                    self._count("sent")  # 累加成功数量
+                    return True  # 返回发送成功
+                except Exception as e:  # 捕获发送过程中的异常
+                    if _is_connection_error(e):  # 连接层面的错误：丢弃连接并重连重试
+                        if entry is not None:  # 如果已经取到连接
+                            self._discard(entry)  # 丢弃已失效的连接
+                        if attempt == 1:  # 如果重连后仍然失败
+                            print(f"Email Error: {e}")  # 打印错误信息便于诊断
+                        continue  # 重连重试
+                    print(f"Email Error: {e}")  # 其他错误（例如收件人或发件人被拒绝），连接本身仍然可用
+                    if entry is not None:  # 如果已经取到连接
+                        try:  # 重置会话状态以便继续复用
+                            entry[0].rset()  # 发送 RSET 清理未完成的事务
+                            self._idle.put(entry)  # 归还连接
+                        except Exception:  # 重置失败说明连接已不可用
+                            self._discard(entry)  # 丢弃连接
+                    break  # 非连接错误无需重试
+        self._count("failed")  # 累加失败数量
+        return False  # 返回发送失败
+
+    def close(self):  # 关闭所有打开的连接
+        with self._lock:  # 加锁复制连接列表
+            entries = list(self._connections)  # 复制当前所有连接
+        for entry in entries:  # 遍历每一条连接
+            self._discard(entry)  # 关闭连接
+        self._idle = queue.LifoQueue()  # 清空空闲队列
+
+    def __enter__(self) -> "SMTPMailer":  # 支持 with 语句
+        return self  # 返回发送器本身
+
+    def __exit__(self, *exc):  # 退出 with 语句时关闭所有连接
+        self.close()  # 关闭连接
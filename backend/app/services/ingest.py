@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.services import pubmed  # noqa: F401  注册 PubMed 数据源
+from app.services.crawler import _upsert_batch
+from app.services.sources import get_source
+
+_DONE = object()
+
+
+class IngestJob:
+    """
+    一个入库任务：在指定数据源上执行一个查询
+    :param max_total: 最多抓取的论文数量，为 None 时抓取全部结果
+    :param since: (最新发布时间, 最新源站论文编号) 水位线，只抓取水位线之后的新论文
+    :param page_size: 每页抓取数量，默认使用数据源的分页大小
+    :param start: 起始结果偏移量，用于继续上一次因数量上限中断的抓取
+    :param track_ids: 是否按抓取顺序记录每篇论文入库后的主键（重复论文记录原始论文主键），供推进水位线使用
+    """
+
+    def __init__(
+        self,
+        source: str,
+        query: str,
+        max_total: int | None = None,
+        since: tuple | None = None,
+        page_size: int | None = None,
+        start: int = 0,
+        track_ids: bool = False,
+    ):
+        self.source = source
+        self.query = query
+        self.max_total = max_total
+        self.since = since
+        self.page_size = page_size
+        self.start = start
+        self.paper_ids = [] if track_ids else None
+        self.fetched = 0
+        self.new = 0
+        self.newest = None
+        # 抓取是否完整：到达水位线或结果末尾为 True，因 max_total 截断或出错为 False
+        self.complete = False
+        self.error = None
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return f"IngestJob({self.source}:{self.query!r}, fetched={self.fetched}, new={self.new})"
+
+
+class IngestEngine:
+    """
+    多数据源入库引擎：每个数据源拥有独立的有界线程池，池大小与限速由数据源适配器自己声明，
+    抓取线程把规范化后的论文按块放入有界队列，由调用方线程串行执行批量入库并提交。
+    不同数据源互不等待，慢的数据源只占用自己的线程池；队列满时抓取线程阻塞，入库速度决定整体背压
+    """
+
+    def __init__(self, chunk_size: int | None = None, queue_size: int | None = None):
+        self.chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+
+    def run(self, db: Session, jobs: list) -> list:
+        """
+        并发执行全部入库任务，返回填充了统计信息的任务列表；单个任务抓取失败只记录在该任务的 error 上
+        """
+        chunks = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        executors = {}
+        for job in jobs:
+            if job.source not in executors:
+                source = get_source(job.source)
+                executors[job.source] = ThreadPoolExecutor(
+                    max_workers=source.max_workers, thread_name_prefix=f"ingest-{job.source}"
+                )
+        try:
+            for job in jobs:
+                executors[job.source].submit(self._produce, job, chunks, stop)
+            remaining = len(jobs)
+            while remaining:
+                job, chunk = chunks.get()
+                if chunk is _DONE:
+                    remaining -= 1
+                    continue
+                url_to_id, new_ids = _upsert_batch(db, chunk)
+                db.commit()
+                job.new += len(new_ids)
+                if job.paper_ids is not None:
+                    job.paper_ids.extend(url_to_id[p['url']] for p in chunk if p.get('url') in url_to_id)
+        finally:
+            # 入库出错时通知抓取线程尽快退出，不再等待尚未开始的任务
+            stop.set()
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+        return jobs
+
+    def _put(self, chunks: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, job: IngestJob, chunks: queue.Queue, stop: threading.Event):
+        started = time.monotonic()
+        buffer = []
+        try:
+            source = get_source(job.source)
+            for paper in source.iter_query(
+                job.query, page_size=job.page_size, max_total=job.max_total, start=job.start, since=job.since
+            ):
+                job.fetched += 1
+                if job.newest is None or paper['published_date'] > job.newest['published_date']:
+                    job.newest = paper
+                buffer.append(paper)
+                if len(buffer) >= self.chunk_size:
+                    if not self._put(chunks, (job, buffer), stop):
+                        return
+                    buffer = []
+            if buffer:
+                self._put(chunks, (job, buffer), stop)
+            # 恰好抓满 max_total 时无法确定之后是否还有新论文，按未完成处理
+            job.complete = job.max_total is None or job.fetched < job.max_total
+        except Exception as e:
+            print(f"Error ingesting {job.source} query {job.query}: {e}")
+            job.error = e
+            if buffer:
+                # 已经抓取到的论文仍然入库
+                self._put(chunks, (job, buffer), stop)
+        finally:
+            job.elapsed = time.monotonic() - started
+            self._put(chunks, (job, _DONE), stop)
+
+
+def ingest(db: Session, jobs: list, chunk_size: int | None = None) -> list:
+    """
+    使用默认配置执行一组入库任务
+    """
+    return IngestEngine(chunk_size=chunk_size).run(db, jobs)
@@ -0,0 +1,10 @@
+from app.models.user import User  # 导入用户模型以便读取用户科研画像中的关键词
+
+
+DEFAULT_KEYWORDS = ["cat:cs.AI"]  # 默认关注的 arXiv 分类，用于用户未配置关键词时兜底
+
+
+def keywords_for_user(user: User) -> list[str]:  # 定义工具函数，读取用户关注的关键词列表
+    if user.profile and user.profile.keywords:  # 如果用户已经配置了科研偏好并且有关键词
+        return list(user.profile.keywords)  # 使用用户自定义的关键词列表
+    return list(DEFAULT_KEYWORDS)  # 否则使用默认关键词兜底
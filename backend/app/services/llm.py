@@ -1,7 +1,10 @@
 import os  # 导入 os 模块用于读取环境变量
-import time  # 导入 time 模块用于模拟延迟
+import random  # 导入 random 模块用于计算退避抖动
+import time  # 导入 time 模块用于模拟延迟与退避等待
+from concurrent.futures import ThreadPoolExecutor, wait  # 导入线程池与等待工具，用于并发生成摘要
 from typing import Optional  # 导入 Optional 类型用于类型标注
 import requests  # 导入 requests 库用于调用 DeepSeek HTTP 接口
+from requests.adapters import HTTPAdapter  # 导入 HTTPAdapter 用于配置连接池大小
 
 # 从环境变量中读取 DeepSeek API Key，如果未配置则为 None
 DEEPSEEK_API_KEY: Optional[str] = os.getenv("DEEPSEEK_API_KEY")  # 读取 DeepSeek 接口使用的 API 密钥
@@ -12,6 +15,27 @@ DEEPSEEK_API_BASE: str = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.co
 # 允许通过环境变量自定义使用的模型名称，默认为 deepseek-chat
 DEEPSEEK_MODEL: str = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")  # 读取 DeepSeek 使用的模型名称
 
+# 并发调用 LLM 的最大并发数、单轮摘要的整体截止时间（秒）、单次请求超时（秒）与限流重试次数
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # 读取摘要生成的并发上限
+LLM_DEADLINE_SECONDS: float = float(os.getenv("LLM_DEADLINE_SECONDS", 120))  # 读取一批摘要生成的整体截止时间
+LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", 15))  # 读取单次请求的超时时间
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 4))  # 读取遇到 429 或 5xx 时的最大重试次数
+
+# 复用 keep-alive 连接的 HTTP 会话，连接池大小与并发上限一致
+_session = requests.Session()  # 创建进程内共享的 HTTP 会话
+_session.mount("https://", HTTPAdapter(pool_maxsize=LLM_MAX_CONCURRENCY))  # 为 HTTPS 请求挂载连接池
+_session.mount("http://", HTTPAdapter(pool_maxsize=LLM_MAX_CONCURRENCY))  # 为 HTTP 请求（例如本地兼容接口）挂载连接池
+
+# 结构化摘要的系统提示词，同时参与摘要缓存键的计算，修改后旧缓存会自然失效
+SUMMARY_PROMPT: str = "你是一个科研助手，请将以下论文摘要总结为结构化的中文摘要，包含：研究背景、方法、结果、结论。"  # 设定总结风格与结构要求
+
+
+def summary_model_tag() -> str:  # 定义工具函数，返回当前实际用于生成摘要的模型标识
+    """
+    返回当前生效的摘要模型标识，未配置 API Key 时为 mock
+    """
+    return DEEPSEEK_MODEL if DEEPSEEK_API_KEY else "mock"  # 未配置密钥时使用 mock 标识，避免 Mock 摘要与真实摘要共用缓存
+
 
 def generate_summary(text: str) -> str:  # 定义生成论文摘要的主函数
     """
@@ -22,6 +46,17 @@ def generate_summary(text: str) -> str:  # 定义生成论文摘要的主函数
         print("Warning: 'DEEPSEEK_API_KEY' not set. Using mock summary.")  # 提示未配置 DeepSeek 密钥将使用 Mock 摘要
         return _mock_summary(text)  # 返回基于原文截断的 Mock 摘要
 
+    summary = request_summary(text)  # 请求 DeepSeek 生成摘要
+    if summary is None:  # 如果请求失败
+        return fallback_summary(text)  # 回退到基于原文截断的摘要，不再额外模拟延迟
+    return summary  # 返回 DeepSeek 模型生成的摘要文本
+
+
+def request_summary(text: str, deadline: Optional[float] = None) -> Optional[str]:  # 定义实际请求 DeepSeek 的函数，失败时返回 None 以便调用方区分真实摘要与回退结果
+    """
+    请求 DeepSeek 生成结构化中文摘要，任何失败都返回 None
+    :param deadline: 基于 time.monotonic() 的截止时间，超过后不再重试
+    """
     url = f"{DEEPSEEK_API_BASE.rstrip('/')}/chat/completions"  # 拼接 DeepSeek 聊天补全接口地址
     headers = {  # 构造 HTTP 请求头
         "Authorization": f"Bearer {DEEPSEEK_API_KEY}",  # 在 Authorization 头中携带 Bearer Token
@@ -33,7 +68,7 @@ def generate_summary(text: str) -> str:  # 定义生成论文摘要的主函数
         "messages": [  # 构造对话消息列表
             {
                 "role": "system",  # 指定消息角色为 system
-                "content": "你是一个科研助手，请将以下论文摘要总结为结构化的中文摘要，包含：研究背景、方法、结果、结论。",  # 设定总结风格与结构要求
+                "content": SUMMARY_PROMPT,  # 设定总结风格与结构要求
             },  # 结束 system 消息字典
             {
                 "role": "user",  # 指定消息角色为 user
@@ -43,32 +78,105 @@ def generate_summary(text: str) -> str:  # 定义生成论文摘要的主函数
     }  # 结束请求体字典
 
     try:  # 使用 try 捕获请求 DeepSeek 过程中的异常
-        response = requests.post(url, headers=headers, json=payload, timeout=15)  # 向 DeepSeek 接口发送 POST 请求
+        response = _post_with_backoff(url, headers, payload, deadline)  # 通过连接池发送请求，遇到限流时自动退避重试
+        if response is None:  # 如果在截止时间内没有拿到响应
+            print("DeepSeek Error: deadline exceeded")  # 打印超时提示
+            return None  # 返回 None 表示请求失败
         if response.status_code != 200:  # 如果返回的 HTTP 状态码不是 200
             print(f"DeepSeek HTTP Error: {response.status_code} - {response.text}")  # 打印 HTTP 错误信息
-            return _mock_summary(text)  # 回退到 Mock 摘要生成
+            return None  # 返回 None 表示请求失败
 
         data = response.json()  # 将返回结果解析为 JSON 数据
         choices = data.get("choices")  # 从 JSON 中读取 choices 字段
         if not choices:  # 如果返回中没有 choices 字段
             print(f"DeepSeek Response Missing 'choices': {data}")  # 打印返回结构异常信息
-            return _mock_summary(text)  # 回退到 Mock 摘要生成
+            return None  # 返回 None 表示返回结构异常
 
         message = choices[0].get("message")  # 读取第一条补全结果中的 message 字段
         if not message or "content" not in message:  # 如果 message 为空或不包含 content 字段
             print(f"DeepSeek Response Missing 'message.content': {data}")  # 打印返回结构异常信息
-            return _mock_summary(text)  # 回退到 Mock 摘要生成
+            return None  # 返回 None 表示返回结构异常
 
         return message["content"]  # 返回 DeepSeek 模型生成的摘要文本
     except Exception as e:  # 捕获所有网络或解析异常
         print(f"DeepSeek Error: {e}")  # 打印异常信息便于排查
-        return _mock_summary(text)  # 发生异常时回退到 Mock 摘要生成
+        return None  # 发生异常时返回 None
+
+
+def _post_with_backoff(url: str, headers: dict, payload: dict, deadline: Optional[float]) -> Optional[requests.Response]:  # 定义带退避重试的 POST 工具函数
+    """
+    发送 POST 请求；遇到 429 或 5xx 时按 Retry-After 或带抖动的指数退避重试，超过截止时间返回 None
+    """
+    attempt = 0  # 初始化重试计数
+    while True:  # 循环直到成功、重试次数耗尽或超过截止时间
+        timeout = LLM_REQUEST_TIMEOUT  # 默认使用单次请求超时
+        if deadline is not None:  # 如果设置了整体截止时间
+            remaining = deadline - time.monotonic()  # 计算剩余时间
+            if remaining <= 0:  # 如果已经超过截止时间
+                return None  # 放弃请求
+            timeout = min(timeout, remaining)  # 单次请求超时不超过剩余时间
+        response = _session.post(url, headers=headers, json=payload, timeout=timeout)  # 通过共享会话发送请求
+        if response.status_code != 429 and response.status_code < 500:  # 如果不是限流或服务端错误
+            return response  # 直接返回响应，由调用方处理
+        attempt += 1  # 累加重试次数
+        if attempt > LLM_MAX_RETRIES:  # 如果重试次数已经耗尽
+            return response  # 返回最后一次响应，由调用方记录错误
+        retry_after = response.headers.get("Retry-After")  # 读取服务端建议的重试等待时间
+        try:  # 尝试解析 Retry-After 秒数
+            delay = float(retry_after) if retry_after else 0.0  # 解析为浮点秒数
+        except ValueError:  # Retry-After 为 HTTP 日期格式时无法解析
+            delay = 0.0  # 回退为指数退避
+        if delay <= 0:  # 如果服务端没有给出可用的等待时间
+            base = 2 ** (attempt - 1)  # 计算指数退避基数
+            delay = base + random.uniform(0, base)  # 加入随机抖动，避免并发请求同时重试
+        if deadline is not None and time.monotonic() + delay >= deadline:  # 如果等待后会超过截止时间
+            return None  # 放弃重试
+        time.sleep(delay)  # 等待后重试
+
+
+def summarize_batch(  # 定义批量并发生成摘要的函数
+    texts: list[str],  # 待总结的摘要原文列表
+    max_concurrency: int = LLM_MAX_CONCURRENCY,  # 最大并发请求数
+    deadline_seconds: float = LLM_DEADLINE_SECONDS,  # 整批摘要生成的截止时间（秒）
+) -> list[Optional[str]]:  # 返回与输入顺序一致的摘要列表，失败或超时的位置为 None
+    """
+    在有界线程池中并发请求 LLM 生成一批摘要，超过整体截止时间仍未完成的请求返回 None；
+    未配置 API Key 时不发起请求，全部返回 None，由调用方使用 fallback_summary 且不缓存
+    """
+    if not texts:  # 如果没有待总结的文本
+        return []  # 直接返回空列表
+    if not DEEPSEEK_API_KEY:  # 如果没有配置 API Key
+        print("Warning: 'DEEPSEEK_API_KEY' not set. Using mock summary.")  # 提示将使用 Mock 摘要
+        return [None] * len(texts)  # 没有真实摘要，所有位置记为 None
+
+    deadline = time.monotonic() + deadline_seconds  # 计算整批请求的截止时间
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(texts))))  # 创建有界线程池
+    try:  # 使用 try 保证线程池最终被关闭
+        futures = [executor.submit(request_summary, text, deadline) for text in texts]  # 为每段文本提交一个摘要任务
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()))  # 等待所有任务完成或到达截止时间
+        results: list[Optional[str]] = []  # 初始化结果列表
+        for future in futures:  # 按输入顺序收集结果
+            if future.done() and not future.cancelled() and future.exception() is None:  # 如果任务已正常完成
+                results.append(future.result())  # 写入摘要结果（请求失败时为 None）
+            else:  # 任务超时或出现异常
+                future.cancel()  # 取消尚未开始的任务
+                results.append(None)  # 该位置记为 None
+        return results  # 返回结果列表
+    finally:  # 无论成功与否都关闭线程池
+        executor.shutdown(wait=False, cancel_futures=True)  # 不等待仍在运行的请求，它们会在各自超时后结束
+
+
+def fallback_summary(text: str) -> str:  # 定义回退摘要构造函数
+    """
+    无法获得真实摘要时的回退文本，仅截取前200字并加上前缀；不模拟延迟，结果不应写入缓存或数据库
+    """
+    return f"[AI生成摘要(Mock)] 本文探讨了... (由于未配置DeepSeek或环境限制，仅展示部分原文) \n\n{text[:200]}..."  # 返回带有固定前缀和截断原文的 Mock 摘要字符串
 
 
 def _mock_summary(text: str) -> str:  # 定义 Mock 摘要生成函数
     """
-    Mock 摘要生成，仅截取前200字并加上前缀
+    Mock 摘要生成，模拟调用大模型接口的延迟后返回回退文本
     """
     # 模拟一点延迟
     time.sleep(0.5)  # 通过 sleep 模拟调用大模型接口的延迟
-    return f"[AI生成摘要(Mock)] 本文探讨了... (由于未配置DeepSeek或环境限制，仅展示部分原文) \n\n{text[:200]}..."  # 返回带有固定前缀和截断原文的 Mock 摘要字符串
+    return fallback_summary(text)  # 返回回退摘要文本
@@ -0,0 +1,311 @@
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Iterable
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import settings
+from app.db.upsert import insert_ignore
+from app.models.paper import Paper
+from app.models.paper_match import PaperMatch
+from app.models.user import User
+from app.services.keywords import keywords_for_user
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """
+    小写并只保留词元，首尾补空格，使 " term " 形式的模式只在完整单词边界上命中
+    """
+    tokens = TOKEN_RE.findall((text or "").lower())
+    return f" {' '.join(tokens)} " if tokens else ""
+
+
+def compile_keyword(keyword: str):
+    """
+    将用户关键词编译为路由键：
+    cat:cs.AI / cat:cs.* 编译为分类过滤 ("cat", 分类)，au:Name 编译为作者短语 ("au", 短语)，
+    其余（ti:/abs:/all: 前缀或普通关键词）编译为标题与摘要中的短语 ("text", 短语)
+    """
+    collapsed = " ".join(str(keyword).split())
+    prefix, sep, rest = collapsed.partition(":")
+    if sep and prefix.isalpha():
+        field, value = prefix.lower(), rest.strip()
+    else:
+        field, value = "all", collapsed
+    if field == "cat":
+        return ("cat", value) if value else None
+    phrase = normalize_text(value)
+    if not phrase:
+        return None
+    return ("au" if field == "au" else "text", phrase)
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机：构建代价与模式总长度成正比，
+    扫描一段文本的代价只与文本长度成正比，与模式数量无关
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: list = [{}]
+        self._fail: list = [0]
+        self._out: list = [()]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (pattern,)
+
+    def _build(self):
+        # 按层次遍历计算失败指针，并把失败指针上的输出合并到当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set:
+        """
+        返回文本中出现过的全部模式
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class PaperRouter:
+    """
+    入库时的论文路由器：把所有订阅用户的关键词编译为一个多模式自动机，
+    每篇新论文只扫描一次标题、摘要与作者，产出 (用户, 论文) 匹配，代价与新论文数量成正比而不是用户数 × 关键词数。
+    用户修改画像时只增量更新关键词到用户的映射，只有关键词集合本身变化时才重新编译自动机
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._user_keys: dict = {}
+        self._key_users: dict = {}
+        self._automata: dict = {}
+        self._dirty = True
+        self._loaded_at = None
+        self.papers_scanned = 0
+        self.matches = 0
+
+    def load(self, db: Session):
+        """
+        从数据库全量构建：加载所有活跃且开启订阅的用户及其科研画像
+        """
+        users = (
+            db.query(User)
+            .options(joinedload(User.profile))
+            .filter(User.is_active == True, User.subscription_enabled == True)
+            .all()
+        )
+        with self._lock:
+            self._user_keys = {}
+            self._key_users = {}
+            for user in users:
+                self._set_user(user.id, keywords_for_user(user))
+            self._compile()
+            self._loaded_at = time.monotonic()
+
+    def update_user(self, user: User):
+        """
+        增量更新单个用户的路由键，在修改画像或订阅开关后调用；停用或关闭订阅的用户会被移除
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                # 尚未构建过，下一次路由时会从数据库全量构建
+                return
+            subscribed = user.is_active and user.subscription_enabled
+            self._set_user(user.id, keywords_for_user(user) if subscribed else [])
+
+    def _set_user(self, user_id: int, keywords: list):
+        old = self._user_keys.pop(user_id, frozenset())
+        new = frozenset(key for key in map(compile_keyword, keywords) if key is not None)
+        for key in old - new:
+            users = self._key_users[key]
+            users.discard(user_id)
+            if not users:
+                del self._key_users[key]
+                self._dirty = self._dirty or key[0] != "cat"
+        for key in new - old:
+            if key not in self._key_users:
+                self._key_users[key] = set()
+                self._dirty = self._dirty or key[0] != "cat"
+            self._key_users[key].add(user_id)
+        if new:
+            self._user_keys[user_id] = new
+
+    def _compile(self):
+        patterns: dict = {"text": [], "au": []}
+        for kind, value in self._key_users:
+            if kind in patterns:
+                patterns[kind].append(value)
+        self._automata = {kind: AhoCorasick(values) for kind, values in patterns.items()}
+        self._dirty = False
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > settings.PAPER_ROUTER_REFRESH_SECONDS
+
+    def match(self, paper: dict) -> set:
+        """
+        返回关键词命中该论文的用户主键集合
+        """
+        with self._lock:
+            if self._dirty:
+                self._compile()
+            keys = [("text", p) for p in self._automata["text"].find(
+                normalize_text(f"{paper.get('title') or ''} {paper.get('abstract') or ''}")
+            )]
+            keys += [("au", p) for p in self._automata["au"].find(normalize_text(" ; ".join(paper.get("authors") or [])))]
+            for category in paper.get("categories") or []:
+                keys.append(("cat", category))
+                keys.append(("cat", category.split(".")[0] + ".*"))
+            users = set()
+            for key in keys:
+                users.update(self._key_users.get(key, ()))
+            return users
+
+    def route(self, db: Session, papers: list) -> int:
+        """
+        为一批新入库的论文（需包含 id）写入 (用户, 论文) 匹配，由调用方负责提交，返回匹配数量
+        """
+        if not papers:
+            return 0
+        if self._stale():
+            self.load(db)
+        rows = [
+            {"user_id": user_id, "paper_id": paper["id"]}
+            for paper in papers
+            if paper.get("id") is not None
+            for user_id in self.match(paper)
+        ]
+        insert_ignore(db, PaperMatch, rows)
+        with self._lock:
+            self.papers_scanned += len(papers)
+            self.matches += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._user_keys),
+                "keys": len(self._key_users),
+                "papers_scanned": self.papers_scanned,
+                "matches": self.matches,
+            }
+
+
+def _match_cutoff(now: datetime | None = None) -> datetime:
+    return (now or datetime.utcnow()) - timedelta(days=settings.DIGEST_MATCH_WINDOW_DAYS)
+
+
+def pending_matches(db: Session, user_ids: list, limit: int | None = None, now: datetime | None = None) -> dict:
+    """
+    加载一批用户尚未推送、且在有效期内的匹配论文，每个用户最多 limit 篇，按发布时间倒序；
+    每用户的条数限制通过窗口函数在 SQL 中完成，积压的匹配再多也只读取 limit 篇
+    :return: 用户主键 -> 论文字典列表
+    """
+    if not user_ids:
+        return {}
+    limit = limit or settings.DIGEST_MAX_MATCHED_PAPERS
+    ranked = (
+        db.query(
+            PaperMatch.user_id,
+            PaperMatch.paper_id,
+            func.row_number().over(
+                partition_by=PaperMatch.user_id,
+                order_by=(Paper.published_date.desc(), Paper.id.desc()),
+            ).label("rank"),
+        )
+        .join(Paper, Paper.id == PaperMatch.paper_id)
+        .filter(
+            PaperMatch.user_id.in_(user_ids),
+            PaperMatch.digest_id.is_(None),
+            PaperMatch.matched_at >= _match_cutoff(now),
+        )
+        .subquery()
+    )
+    rows = (
+        db.query(ranked.c.user_id, Paper)
+        .join(Paper, Paper.id == ranked.c.paper_id)
+        .filter(ranked.c.rank <= limit)
+        .order_by(ranked.c.user_id, ranked.c.rank)
+        .all()
+    )
+    result: dict = {}
+    for user_id, paper in rows:
+        result.setdefault(user_id, []).append({
+            "id": paper.id,
+            "title": paper.title,
+            "abstract": paper.abstract or "",
+            "url": paper.url,
+            "published_date": paper.published_date,
+            "authors": paper.authors or [],
+            "source": paper.source or "",
+        })
+    return result
+
+
+def mark_matches_delivered(db: Session, user_id: int, paper_ids: list, digest_id: int):
+    """
+    把已经随日报推送的匹配关联到每日摘要记录，并清理该用户本次未入选的其余待推送匹配，由调用方负责提交
+    """
+    if paper_ids:
+        (
+            db.query(PaperMatch)
+            .filter(
+                PaperMatch.user_id == user_id,
+                PaperMatch.paper_id.in_(paper_ids),
+                PaperMatch.digest_id.is_(None),
+            )
+            .update({"digest_id": digest_id}, synchronize_session=False)
+        )
+    # 未入选的匹配已经参与过一次排序，保留下来只会在之后每一轮重复读取
+    (
+        db.query(PaperMatch)
+        .filter(PaperMatch.user_id == user_id, PaperMatch.digest_id.is_(None))
+        .delete(synchronize_session=False)
+    )
+
+
+def retire_stale_matches(db: Session, now: datetime | None = None) -> int:
+    """
+    删除超过有效期仍未推送的匹配（例如已关闭订阅的用户），由调用方负责提交
+    :return: 删除的匹配数量
+    """
+    return (
+        db.query(PaperMatch)
+        .filter(PaperMatch.digest_id.is_(None), PaperMatch.matched_at < _match_cutoff(now))
+        .delete(synchronize_session=False)
+    )
+
+
+paper_router = PaperRouter()
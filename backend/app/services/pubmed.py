@@ -0,0 +1,161 @@
+import xml.etree.ElementTree as ET
+from contextlib import closing
+from datetime import datetime
+from typing import Iterator
+from app.core.config import settings
+from app.services.sources import SourceAdapter, register_source
+
+PUBMED_URL = 'https://pubmed.ncbi.nlm.nih.gov/{}/'
+MONTHS = {m: i for i, m in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1
+)}
+
+
+def _text(elem) -> str:
+    # 标题与摘要中可能嵌套 <i>、<sup> 等标签，需要拼接全部文本
+    return ' '.join(''.join(elem.itertext()).split()) if elem is not None else ''
+
+
+def _date(elem) -> datetime | None:
+    if elem is None:
+        return None
+    year = elem.findtext('Year')
+    if not year or not year.isdigit():
+        return None
+    month = (elem.findtext('Month') or '1').strip()
+    month = int(month) if month.isdigit() else MONTHS.get(month[:3].lower(), 1)
+    day = elem.findtext('Day') or '1'
+    try:
+        return datetime(int(year), month, int(day) if day.isdigit() else 1)
+    except ValueError:
+        return datetime(int(year), 1, 1)
+
+
+def _parse_article(article) -> dict:
+    """
+    将单个 PubmedArticle 元素解析为论文字典
+    """
+    citation = article.find('MedlineCitation')
+    pmid = citation.findtext('PMID', '').strip()
+    info = citation.find('Article')
+
+    abstract = ' '.join(
+        f"{part.get('Label')}: {_text(part)}" if part.get('Label') else _text(part)
+        for part in info.findall('Abstract/AbstractText')
+    )
+
+    authors = []
+    for author in info.findall('AuthorList/Author'):
+        name = ' '.join(filter(None, (author.findtext('ForeName'), author.findtext('LastName'))))
+        name = name or author.findtext('CollectiveName')
+        if name:
+            authors.append(name.strip())
+
+    # 优先使用进入 PubMed 的日期，保证结果与 sort=pub_date 的顺序基本一致
+    published_date = (
+        _date(article.find("PubmedData/History/PubMedPubDate[@PubStatus='pubmed']"))
+        or _date(info.find('ArticleDate'))
+        or _date(info.find('Journal/JournalIssue/PubDate'))
+        or datetime.now()
+    )
+
+    # MeSH 主题词作为分类，供入库时按 cat: 关键词路由
+    categories = [
+        heading.findtext('DescriptorName')
+        for heading in citation.findall('MeshHeadingList/MeshHeading')
+        if heading.findtext('DescriptorName')
+    ]
+
+    return {
+        'title': _text(info.find('ArticleTitle')) or 'No Title',
+        'abstract': abstract or 'No Abstract',
+        'url': PUBMED_URL.format(pmid),
+        'published_date': published_date,
+        'authors': authors,
+        'categories': categories,
+        'source': 'PubMed',
+    }
+
+
+def iter_pubmed_articles(stream) -> Iterator[dict]:
+    """
+    增量解析 efetch 返回的 PubmedArticleSet 文档，逐条产出论文字典
+    """
+    root = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == 'PubmedArticle':
+            yield _parse_article(elem)
+            elem.clear()
+            root.clear()
+
+
+class PubMedSource(SourceAdapter):
+    """
+    PubMed 数据源适配器：通过 NCBI E-utilities 先用 esearch 按发布时间倒序分页取得 PMID，
+    再用 efetch 批量拉取这一页的文章详情
+    """
+
+    name = 'pubmed'
+    default_base_url = settings.PUBMED_API_BASE
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None, **kwargs):
+        kwargs.setdefault('request_interval', settings.PUBMED_REQUEST_INTERVAL)
+        kwargs.setdefault('max_workers', settings.PUBMED_MAX_WORKERS)
+        kwargs.setdefault('page_size', settings.PUBMED_PAGE_SIZE)
+        super().__init__(base_url=base_url, **kwargs)
+        self.api_key = settings.PUBMED_API_KEY if api_key is None else api_key
+
+    def _params(self, **params) -> dict:
+        params['db'] = 'pubmed'
+        if self.api_key:
+            params['api_key'] = self.api_key
+        return params
+
+    def _search(self, query: str, start: int, limit: int) -> list:
+        params = self._params(term=query, retstart=start, retmax=limit, sort='pub_date', retmode='json')
+        with closing(self._request(f'{self.base_url}/esearch.fcgi', params, stream=False)) as response:
+            return response.json().get('esearchresult', {}).get('idlist', [])
+
+    def _fetch(self, pmids: list) -> Iterator[dict]:
+        params = self._params(id=','.join(pmids), retmode='xml')
+        with closing(self._request(f'{self.base_url}/efetch.fcgi', params)) as response:
+            papers = {self.source_id(paper['url']): paper for paper in iter_pubmed_articles(response.raw)}
+        # efetch 不保证返回顺序，按 esearch 的顺序产出
+        for pmid in pmids:
+            if pmid in papers:
+                yield papers[pmid]
+
+    def iter_query(
+        self,
+        query: str,
+        page_size: int | None = None,
+        max_total: int | None = None,
+        start: int = 0,
+        since: tuple | None = None,
+    ) -> Iterator[dict]:
+        page_size = page_size or self.page_size
+        produced = 0
+        while max_total is None or produced < max_total:
+            limit = page_size if max_total is None else min(page_size, max_total - produced)
+            pmids = self._search(query, start, limit)
+            # 返回条数不足一页说明已经到达结果末尾
+            last_page = len(pmids) < limit
+            if since is not None and since[1] in pmids:
+                # 水位线及更早发布的 PMID 都已入库，不必再拉取详情
+                pmids = pmids[:pmids.index(since[1])]
+                last_page = True
+            for paper in self._fetch(pmids) if pmids else ():
+                if since is not None and self.reached_watermark(paper, since):
+                    return
+                produced += 1
+                yield paper
+            if last_page:
+                return
+            start += len(pmids)
+
+
+register_source(PubMedSource.name, PubMedSource)
@@ -0,0 +1,193 @@
+from datetime import datetime  # 导入 datetime，用于给缺少发布时间的论文排序
+from sqlalchemy.orm import Session  # 导入 Session 类型用于类型标注
+from app.core.config import settings  # 导入全局配置对象，读取每个查询的候选论文数量
+from app.db.upsert import insert_ignore  # 导入插入忽略冲突的工具函数，用于并发安全地创建水位线记录
+from app.models.crawl_state import CrawlState  # 导入抓取水位线模型
+from app.models.paper import Paper  # 导入论文模型以便加载查询最近的论文
+from app.models.user import User  # 导入用户模型以便读取用户科研画像中的关键词
+from app.services.crawler import ArxivCrawler, arxiv_id_from_url  # 导入 arXiv 数据源适配器与 arXiv ID 解析函数
+from app.services.ingest import IngestEngine, IngestJob  # 导入多数据源入库引擎与入库任务
+from app.services.keywords import DEFAULT_KEYWORDS, keywords_for_user  # 导入用户关键词读取函数与默认关键词
+
+
+def normalize_query(query: str) -> str:  # 定义查询规范化函数，保证语义相同的查询只抓取一次
+    """
+    规范化 arXiv 查询字符串：去除首尾空白、压缩连续空白，并将字段前缀（如 Cat:）统一为小写
+    """
+    collapsed = " ".join(str(query).split())  # 去除首尾空白并将连续空白压缩为单个空格
+    prefix, sep, rest = collapsed.partition(":")  # 尝试拆分出 arXiv 字段前缀，例如 cat、ti、all
+    if sep and prefix.isalpha():  # 仅当冒号前是纯字母时才视为字段前缀
+        return f"{prefix.lower()}:{rest.strip()}"  # 字段前缀统一小写，分类取值保持原样（arXiv 分类区分大小写）
+    return collapsed  # 普通关键词原样返回规范化后的字符串
+
+
+class QueryPlanner:  # 定义单轮调度内的查询计划器，同一查询在一轮中只请求 arXiv 一次
+    """
+    单轮摘要投递的查询计划器：汇总本轮所有待推送用户的关键词，
+    每个规范化后的查询只抓取一次，并把结果集缓存给所有订阅该查询的用户复用
+    """
+
+    def __init__(self, db: Session, max_results: int | None = None, local: bool | None = None):  # 初始化计划器，绑定数据库会话、单查询候选数量与是否只读本地数据
+        self.db = db  # 保存数据库会话，用于把抓取到的论文写入数据库
+        self.max_results = max_results or settings.DIGEST_CANDIDATES_PER_QUERY  # 每个查询的最大候选论文数量，最终由相关性排序截断
+        self.local = settings.DIGEST_LOCAL_ONLY if local is None else local  # 本地模式只读取后台入库任务维护的最近论文，不访问 arXiv
+        self._results: dict[str, list[dict]] = {}  # 规范化查询到论文结果集的缓存
+        self._requested: set[str] = set()  # 已经被至少一个用户请求过的规范化查询集合
+        self.hits = 0  # 命中缓存的查询次数
+        self.misses = 0  # 未命中缓存、需要真正抓取的查询次数
+
+    def plan(self, users: list[User]) -> list[str]:  # 计算一批用户关键词的并集
+        """
+        返回本轮需要抓取的去重后规范化查询列表，保持首次出现的顺序
+        """
+        queries: dict[str, None] = {}  # 使用字典保持插入顺序并去重
+        for user in users:  # 遍历每一位待推送用户
+            for keyword in keywords_for_user(user):  # 遍历该用户的每个关键词
+                queries.setdefault(normalize_query(keyword), None)  # 规范化后加入查询集合
+        return list(queries)  # 返回去重后的查询列表
+
+    def prefetch(self, queries: list[str]):  # 批量准备本轮所有查询的结果集，避免逐个用户串行等待
+        """
+        本地模式下一次性从数据库加载各查询最近的论文；否则并发抓取尚未缓存的查询水位线之后的新论文，写入数据库与本轮缓存
+        """
+        pending = [q for q in dict.fromkeys(normalize_query(q) for q in queries) if q not in self._results]  # 过滤出尚未准备的规范化查询
+        if not pending:  # 如果所有查询都已经缓存
+            return  # 直接返回
+        if self.local:  # 本地模式下不访问网络
+            self._results.update(self._load_local(pending))  # 直接读取后台入库任务维护的最近论文
+            return  # 本地结果已缓存，直接返回
+        print(f"Prefetching {len(pending)} queries from arXiv")  # 打印本轮预抓取的查询数量
+        self._results.update(self.ingest(pending))  # 并发抓取所有待抓取查询的新论文并缓存结果集
+
+    def ingest(self, queries: list[str], max_total: int | None = None) -> dict[str, list[dict]]:  # 抓取一组查询的新论文并推进水位线
+        """
+        通过多数据源入库引擎并发抓取各查询水位线之后的新论文，按块入库后推进水位线，返回 查询 -> 本次抓取到的新论文。
+        新论文超过 max_total 时本次抓取不完整，水位线保持不变并记录继续抓取的偏移量，下一次从该偏移量继续，直到追上旧水位线；
+        首次抓取没有旧水位线，只取最新的 max_total 篇并直接设置水位线，不回溯历史论文
+        :param max_total: 每个查询最多抓取的新论文数量，默认与候选论文数量一致
+        """
+        states = self._load_states(queries)  # 批量加载各查询的抓取水位线
+        jobs = [  # 为每个查询构造一个 arXiv 入库任务
+            IngestJob(  # 构造入库任务
+                ArxivCrawler.name,  # arXiv 数据源
+                query,  # 规范化后的查询
+                max_total=max_total or self.max_results,  # 单次最多抓取的新论文数量
+                since=self._watermark(states[query]),  # 只抓取水位线之后的新论文
+                start=states[query].resume_offset or 0,  # 上一次抓取未完成时从中断的位置继续
+                track_ids=True,  # 记录入库后的主键
+            )  # 结束入库任务构造
+            for query in queries  # 遍历每个查询
+        ]  # 结束任务列表构造
+        IngestEngine().run(self.db, jobs)  # 并发抓取并按块入库，单个查询失败只记录在该任务上
+        return {  # 推进水位线并返回每个查询本次抓取到的新论文
+            job.query: self._advance(states[job.query], job)  # 只有抓取完整时才推进水位线
+            for job in jobs  # 遍历每个入库任务
+        }  # 结束结果映射构造
+
+    def papers_for(self, query: str) -> list[dict]:  # 获取某个查询对应的论文结果集
+        key = normalize_query(query)  # 先对查询做规范化
+        if key in self._requested:  # 如果该查询在本轮已经被请求过
+            self.hits += 1  # 记录一次缓存命中
+        else:  # 否则这是本轮首次请求该查询
+            self._requested.add(key)  # 标记该查询已被请求
+            self.misses += 1  # 记录一次缓存未命中
+        if key not in self._results:  # 如果结果集尚未抓取
+            self._results[key] = self._fetch(key)  # 抓取并缓存结果集
+        return self._results[key]  # 返回缓存中的论文结果集
+
+    def papers_for_user(self, user: User) -> list[dict]:  # 获取某个用户所有关键词对应的论文集合
+        papers: list[dict] = []  # 初始化用于收集论文的列表
+        for query in dict.fromkeys(normalize_query(k) for k in keywords_for_user(user)):  # 遍历用户去重后的规范化关键词
+            papers.extend(self.papers_for(query))  # 从缓存中取出结果集并合并
+        return papers  # 返回合并后的论文列表（可能包含重复论文，由调用方去重）
+
+    def all_papers(self) -> list[dict]:  # 返回本轮已缓存的全部论文，按 URL 去重
+        papers: dict[str, dict] = {}  # 使用 URL 作为键去重
+        for results in self._results.values():  # 遍历每个查询的结果集
+            for paper in results:  # 遍历结果集中的每篇论文
+                papers.setdefault(paper["url"], paper)  # 同一篇论文只保留一次
+        return list(papers.values())  # 返回去重后的论文列表
+
+    def _fetch(self, query: str) -> list[dict]:  # 准备单个查询结果集的内部方法
+        if self.local:  # 本地模式下只读取数据库
+            return self._load_local([query])[query]  # 返回后台入库任务维护的最近论文
+        print(f"Fetching papers with query: {query}")  # 打印当前抓取任务的说明
+        try:  # 捕获抓取过程中的异常，避免单个查询失败影响整体
+            return self.ingest([query])[query]  # 只抓取水位线之后的新论文，推进水位线并返回这些新论文
+        except Exception as e:  # 捕获所有异常
+            print(f"Error fetching papers for query {query}: {e}")  # 打印错误信息方便排查
+            return []  # 失败时缓存空结果，避免本轮重复请求同一个失败查询
+
+    def _load_states(self, queries: list[str]) -> dict[str, CrawlState]:  # 批量加载查询的抓取水位线，不存在时创建空记录
+        insert_ignore(self.db, CrawlState, [{"query": query} for query in queries])  # 为首次出现的查询创建水位线记录，已存在的记录保持不变
+        states = self.db.query(CrawlState).filter(CrawlState.query.in_(queries)).all()  # 一次 IN 查询加载全部水位线
+        return {state.query: state for state in states}  # 返回查询到水位线记录的映射
+
+    @staticmethod
+    def _watermark(state: CrawlState) -> tuple | None:  # 将水位线记录转换为抓取引擎使用的元组
+        if state.last_published_date is None and not state.last_arxiv_id:  # 如果该查询从未抓取过
+            return None  # 不设置水位线，抓取最新一页
+        return (state.last_published_date, state.last_arxiv_id)  # 返回 (最新发布时间, 最新 arXiv ID)
+
+    def _advance(self, state: CrawlState, job: IngestJob) -> list[dict]:  # 推进水位线或记录继续抓取的位置，并返回本次抓取到的新论文
+        if job.error is None and (job.complete or job.since is None):  # 抓取到达了旧水位线或结果末尾；首次抓取只取最新一批，同样视为完整
+            if state.resume_offset is not None:  # 如果这是对未完成抓取的继续
+                state.last_published_date = state.pending_published_date  # 推进到最初那次抓取见过的最新发布时间
+                state.last_arxiv_id = state.pending_arxiv_id  # 推进到最初那次抓取见过的最新 arXiv ID
+            elif job.newest is not None:  # 一次抓取完整，且抓取到了新论文
+                state.last_published_date = job.newest["published_date"]  # 推进发布时间水位线
+                state.last_arxiv_id = arxiv_id_from_url(job.newest["url"])  # 推进 arXiv ID 水位线
+            state.resume_offset = state.pending_published_date = state.pending_arxiv_id = None  # 清除继续抓取的位置
+        elif job.error is None:  # 因数量上限中断：更早的新论文尚未抓取，不推进水位线，避免跳过
+            if state.resume_offset is None:  # 首次中断时记录本次见过的最新论文，追上旧水位线后再推进到这里
+                state.pending_published_date = job.newest["published_date"]  # 记录待推进的发布时间
+                state.pending_arxiv_id = arxiv_id_from_url(job.newest["url"])  # 记录待推进的 arXiv ID
+            state.resume_offset = job.start + job.fetched  # 下一次从本次结束的位置继续；期间新发布的论文只会让部分论文被重复读取，不会被跳过
+        new_ids = list(dict.fromkeys(job.paper_ids or []))  # 本次抓取到的论文主键，近似重复论文可能指向同一主键，按顺序去重；抓取中途失败时已入库的论文仍然可用
+        recent = self._newest_first(list(dict.fromkeys(new_ids + list(state.recent_paper_ids or []))))  # 与历史最近论文合并后按发布时间倒序排列
+        state.recent_paper_ids = recent[: self.max_results]  # 更新该查询最近的论文列表，供本地模式读取；继续抓取得到的较早论文不会挤掉更新的论文
+        self.db.commit()  # 提交水位线更新
+        return self._load_papers(new_ids)  # 只返回本次抓取到的论文，已经推送过的历史论文不再作为候选
+
+    def _load_local(self, queries: list[str]) -> dict[str, list[dict]]:  # 从数据库读取一组查询最近的论文，不访问网络
+        states = self.db.query(CrawlState).filter(CrawlState.query.in_(queries)).all()  # 一次 IN 查询加载全部水位线，尚未抓取过的查询没有记录
+        recent = {state.query: list(state.recent_paper_ids or [])[: self.max_results] for state in states}  # 每个查询最近的论文主键
+        papers = {paper["id"]: paper for paper in self._load_papers(sorted({pid for ids in recent.values() for pid in ids}))}  # 一次 IN 查询加载所有查询涉及的论文
+        return {query: [papers[pid] for pid in recent.get(query, []) if pid in papers] for query in queries}  # 按各查询自己的顺序组装结果集
+
+    def _newest_first(self, paper_ids: list[int]) -> list[int]:  # 按发布时间倒序排列论文主键，已删除的论文被丢弃
+        if not paper_ids:  # 如果没有论文
+            return []  # 直接返回空列表
+        rows = self.db.query(Paper.id, Paper.published_date).filter(Paper.id.in_(paper_ids)).all()  # 一次 IN 查询加载发布时间
+        rows.sort(key=lambda row: (row.published_date is not None, row.published_date or datetime.min, row.id), reverse=True)  # 发布时间相同按主键倒序，缺少发布时间的排在最后
+        return [row.id for row in rows]  # 返回排序后的主键列表
+
+    def _load_papers(self, paper_ids: list[int]) -> list[dict]:  # 按主键批量加载论文并转换为字典
+        if not paper_ids:  # 如果没有论文
+            return []  # 直接返回空列表
+        rows = self.db.query(Paper).filter(Paper.id.in_(paper_ids)).all()  # 一次 IN 查询加载全部论文
+        by_id = {  # 构造主键到论文字典的映射
+            row.id: {  # 转换为与抓取结果一致的论文字典
+                "id": row.id,  # 论文主键
+                "title": row.title,  # 论文标题
+                "abstract": row.abstract or "",  # 原始摘要
+                "url": row.url,  # 论文链接
+                "published_date": row.published_date,  # 发布时间
+                "authors": row.authors or [],  # 作者列表
+                "source": row.source or "",  # 论文来源
+            }  # 结束论文字典
+            for row in rows  # 遍历查询结果
+        }  # 结束映射构造
+        return [by_id[pid] for pid in paper_ids if pid in by_id]  # 按传入顺序返回仍然存在的论文
+
+    @property
+    def hit_ratio(self) -> float:  # 计算本轮查询缓存命中率
+        total = self.hits + self.misses  # 统计总请求次数
+        return self.hits / total if total else 0.0  # 没有请求时命中率记为 0
+
+    def report(self) -> str:  # 生成本轮查询计划器的统计摘要文本
+        return (  # 返回格式化后的统计字符串
+            f"{len(self._results)} distinct queries, "  # 实际抓取的去重查询数量
+            f"{self.hits + self.misses} lookups, "  # 用户维度的查询请求总次数
+            f"hit ratio {self.hit_ratio:.1%}"  # 缓存命中率
+        )  # 结束字符串拼接
@@ -0,0 +1,261 @@
+import os
+import re
+import shutil
+import threading
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.paper import Paper
+from app.models.user import User
+
+TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+# 只去掉最常见的英文虚词，其余常见词由 IDF 自动降权
+STOPWORDS = frozenset(
+    "the of and to in for on with by from an is are we this that be as at or our it its can which these "
+    "using based via into than has have been their not also such both show paper study results approach".split()
+)
+CURRENT_FILE = "CURRENT"
+
+
+def _tokens(text: str) -> list:
+    words = [w for w in TOKEN_RE.findall((text or "").lower()) if w not in STOPWORDS]
+    # 一元词加相邻二元词，保留 "language model" 这类短语的区分度
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _hash_row(text: str, dim: int) -> tuple:
+    """
+    将文本哈希为稀疏的对数词频向量，返回 (列下标, 取值)
+    使用 crc32 而不是内置 hash，保证不同进程得到相同的列下标
+    """
+    counts: dict = {}
+    for token in _tokens(text):
+        column = zlib.crc32(token.encode("utf-8")) % dim
+        counts[column] = counts.get(column, 0) + 1
+    columns = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    order = np.argsort(columns)
+    return columns[order], values[order].astype(np.float32)
+
+
+def _tf_matrix(texts: list, dim: int) -> sp.csr_matrix:
+    indptr = [0]
+    indices, data = [], []
+    for text in texts:
+        columns, values = _hash_row(text, dim)
+        indices.append(columns)
+        data.append(values)
+        indptr.append(indptr[-1] + len(columns))
+    return sp.csr_matrix(
+        (
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            np.asarray(indptr, dtype=np.int64),
+        ),
+        shape=(len(texts), dim),
+    )
+
+
+def _normalize_rows(matrix: sp.csr_matrix) -> sp.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+def profile_text(user: User) -> str:
+    """
+    用户画像文本：关键词与学科标签，去掉 cat:/ti: 等 arXiv 字段前缀
+    """
+    profile = user.profile
+    terms = list(profile.keywords or []) + list(profile.disciplines or []) if profile else []
+    return " ".join(term.split(":", 1)[-1] for term in map(str, terms))
+
+
+class PaperIndex:
+    """
+    离线论文向量索引：所有已入库论文的哈希对数词频矩阵（CSR）与文档频率向量，
+    以 .npy 文件持久化并以内存映射方式加载，多个进程可以共享同一份文件而无需重建。
+    索引由若干只读分段组成，CURRENT 文件按顺序列出分段目录：刷新时只把新论文写成一个新分段并原子替换 CURRENT，
+    已有分段不会被改写；分段数量超过 MAX_SEGMENTS 时才把全部分段合并为一个
+    """
+
+    MAX_SEGMENTS = 16
+
+    def __init__(self, directory: str | None = None, dim: int | None = None):
+        self.directory = directory or settings.RANKING_INDEX_DIR
+        self.dim = dim or settings.RANKING_HASH_DIM
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._segments: list = []
+        self._parts: list = []
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.df = np.zeros(self.dim, dtype=np.int32)
+
+    def _manifest(self) -> list:
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                return f.read().split()
+        except FileNotFoundError:
+            return []
+
+    def _load_segment(self, name: str) -> tuple:
+        path = os.path.join(self.directory, name)
+        arrays = {
+            key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r")
+            for key in ("ids", "df", "data", "indices", "indptr")
+        }
+        if arrays["df"].shape[0] != self.dim:
+            raise ValueError(f"Ranking index segment {name} was built with dim={arrays['df'].shape[0]}")
+        tf = sp.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(len(arrays["ids"]), self.dim),
+            copy=False,
+        )
+        return arrays["ids"], arrays["df"], tf
+
+    def _load(self, segments: list):
+        loaded = [self._load_segment(name) for name in segments]
+        self._parts = [(ids, tf) for ids, _, tf in loaded]
+        self.ids = np.concatenate([np.asarray(ids) for ids, _, _ in loaded]) if loaded else np.zeros(0, dtype=np.int64)
+        self.df = np.zeros(self.dim, dtype=np.int32)
+        for _, df, _ in loaded:
+            self.df += df
+        self._segments = list(segments)
+
+    def _write_segment(self, prefix: str, ids, df, tf: sp.csr_matrix) -> str:
+        name = f"{prefix}{int(ids[0])}-{int(ids[-1])}"
+        path = os.path.join(self.directory, name)
+        if os.path.isdir(path):
+            # 其他进程已经为同一段主键写好了相同内容的分段
+            return name
+        tmp = f"{path}.tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for key, array in (("ids", ids), ("df", df), ("data", tf.data), ("indices", tf.indices), ("indptr", tf.indptr)):
+            np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(array))
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+        return name
+
+    def _publish(self, segments: list):
+        pointer = os.path.join(self.directory, f"{CURRENT_FILE}.tmp{os.getpid()}")
+        with open(pointer, "w") as f:
+            f.write("\n".join(segments))
+        os.replace(pointer, os.path.join(self.directory, CURRENT_FILE))
+
+    def refresh(self, db: Session):
+        """
+        加载磁盘上的最新版本，并把尚未建索引的新论文作为一个新分段追加进索引
+        """
+        with self._lock:
+            segments = self._manifest()
+            if segments != self._segments:
+                try:
+                    self._load(segments)
+                except (OSError, ValueError) as e:
+                    print(f"Ranking index {segments} unusable, rebuilding: {e}")
+                    self._reset()
+
+            last_id = int(self.ids[-1]) if len(self.ids) else 0
+            rows = (
+                db.query(Paper.id, Paper.title, Paper.abstract)
+                .filter(Paper.id > last_id)
+                .order_by(Paper.id)
+                .all()
+            )
+            if not rows:
+                return
+            new_tf = _tf_matrix([f"{title} {title} {abstract or ''}" for _, title, abstract in rows], self.dim)
+            new_ids = np.asarray([paper_id for paper_id, _, _ in rows], dtype=np.int64)
+            new_df = np.bincount(new_tf.indices, minlength=self.dim).astype(np.int32)
+            os.makedirs(self.directory, exist_ok=True)
+
+            previous = list(self._segments)
+            if len(previous) + 1 > self.MAX_SEGMENTS:
+                # 分段过多时合并为一个分段，合并的代价分摊到多次追加上
+                tf = sp.vstack([tf for _, tf in self._parts] + [new_tf], format="csr", dtype=np.float32)
+                ids = np.concatenate([self.ids, new_ids])
+                segments = [self._write_segment("c", ids, self.df + new_df, tf)]
+            else:
+                segments = previous + [self._write_segment("s", new_ids, new_df, new_tf)]
+            self._publish(segments)
+            self._load(segments)
+            for name in set(previous) - set(segments):
+                # 已经映射旧文件的进程在 POSIX 上仍可继续读取
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            print(f"Ranking index: added {len(rows)} papers, {len(self.ids)} total in {len(segments)} segments")
+
+    def idf(self) -> np.ndarray:
+        n = len(self.ids)
+        return (np.log((1.0 + n) / (1.0 + np.asarray(self.df, dtype=np.float32))) + 1.0).astype(np.float32)
+
+    def rows_for(self, paper_ids: list) -> tuple:
+        """
+        按论文主键取出索引中的行，返回 (行矩阵, 命中的论文主键列表)
+        """
+        wanted = np.asarray(paper_ids, dtype=np.int64)
+        blocks, found_ids = [], []
+        for ids, tf in self._parts:
+            if not len(ids) or not len(wanted):
+                continue
+            positions = np.minimum(np.searchsorted(ids, wanted), len(ids) - 1)
+            found = np.asarray(ids)[positions] == wanted
+            if found.any():
+                blocks.append(tf[positions[found]])
+                found_ids.extend(int(pid) for pid in wanted[found])
+        if not blocks:
+            return sp.csr_matrix((0, self.dim), dtype=np.float32), []
+        return sp.vstack(blocks, format="csr", dtype=np.float32), found_ids
+
+
+def rank_candidates(index: PaperIndex, users: list, candidates: dict, top_k: int | None = None) -> dict:
+    """
+    对一批用户的候选论文做批量相关性排序：
+    论文与用户画像都表示为 L2 归一化的 TF-IDF 向量，一次稀疏矩阵乘法得到 用户 × 论文 的余弦相似度，
+    再只在每个用户自己的候选集合内取前 top_k 篇。没有画像或不在索引中的论文保持原有顺序排在后面
+    :param candidates: 用户主键 -> 候选论文字典列表（需包含 id）
+    :return: 用户主键 -> 排序并截断后的论文字典列表
+    """
+    top_k = top_k or settings.DIGEST_TOP_K
+    by_id: dict = {}
+    for papers in candidates.values():
+        for paper in papers:
+            if paper.get("id") is not None:
+                by_id.setdefault(paper["id"], paper)
+    if not by_id or not users:
+        return {user_id: papers[:top_k] for user_id, papers in candidates.items()}
+
+    idf = index.idf()
+    paper_rows, paper_ids = index.rows_for(sorted(by_id))
+    column = {paper_id: i for i, paper_id in enumerate(paper_ids)}
+    paper_matrix = _normalize_rows(paper_rows.multiply(idf).tocsr())
+    user_matrix = _normalize_rows(_tf_matrix([profile_text(user) for user in users], index.dim).multiply(idf).tocsr())
+    scores = user_matrix.dot(paper_matrix.T).toarray()
+
+    ranked: dict = {}
+    for row, user in enumerate(users):
+        papers = list({p["url"]: p for p in candidates.get(user.id, [])}.values())
+        if not papers:
+            ranked[user.id] = []
+            continue
+        cols = np.asarray([column.get(p.get("id"), -1) for p in papers], dtype=np.intp)
+        if scores.shape[1]:
+            user_scores = np.where(cols >= 0, scores[row, np.maximum(cols, 0)], -1.0)
+        else:
+            # 候选论文都不在索引中：全部同分，保持原有顺序
+            user_scores = np.full(len(papers), -1.0)
+        # 稳定排序：同分（例如用户没有画像时全为 0）保持候选原有顺序
+        order = np.argsort(-user_scores, kind="stable")[:top_k]
+        ranked[user.id] = [papers[i] for i in order]
+    return ranked
+
+
+paper_index = PaperIndex()
@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta, timezone, tzinfo  # 导入日期、时间与时区工具
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError  # 导入 IANA 时区支持
+from app.core.config import settings  # 导入全局配置对象，读取默认推送时间与时区
+
+
+def parse_digest_time(value: str | None) -> tuple[int, int]:  # 定义推送时间解析函数
+    """
+    将 HH:MM 格式的推送时间解析为 (小时, 分钟)，为空时使用默认推送时间，格式非法时抛出 ValueError
+    """
+    time_str = (value or settings.DEFAULT_DIGEST_TIME).strip()  # 为空时回退为默认推送时间，并去除首尾空白
+    hour_part, sep, minute_part = time_str.partition(":")  # 按冒号分割时间字符串为小时和分钟部分
+    if not sep or not hour_part.isdigit() or not minute_part.isdigit():  # 如果缺少冒号或包含非数字字符
+        raise ValueError(f"Invalid digest_time: {value!r}")  # 抛出格式错误
+    hour, minute = int(hour_part), int(minute_part)  # 将小时与分钟转换为整数
+    if not (0 <= hour < 24 and 0 <= minute < 60):  # 如果超出合法范围
+        raise ValueError(f"Invalid digest_time: {value!r}")  # 抛出范围错误
+    return hour, minute  # 返回解析结果
+
+
+def resolve_timezone(name: str | None) -> tzinfo:  # 定义时区解析函数
+    """
+    解析 IANA 时区名称（如 Asia/Shanghai），为空时使用全局配置的时区，再为空时使用服务器本地时区
+    """
+    name = name or settings.DIGEST_TIMEZONE  # 用户未设置时区时回退为全局配置
+    if name:  # 如果存在时区名称
+        try:  # 尝试加载 IANA 时区
+            return ZoneInfo(name)  # 返回对应的时区对象
+        except (ZoneInfoNotFoundError, ValueError) as exc:  # 时区名称不存在或格式非法
+            raise ValueError(f"Invalid timezone: {name!r}") from exc  # 统一抛出 ValueError
+    return datetime.now().astimezone().tzinfo  # 返回服务器本地时区
+
+
+def compute_next_digest_at(digest_time: str | None, tz_name: str | None, after: datetime) -> datetime:  # 定义下一次推送时间计算函数
+    """
+    计算严格晚于 after 的下一次推送时间
+    :param after: 参照时间，UTC 朴素时间
+    :return: UTC 朴素时间，便于直接写入数据库并做范围查询
+    """
+    hour, minute = parse_digest_time(digest_time)  # 解析推送时间
+    tz = resolve_timezone(tz_name)  # 解析用户时区
+    local_after = after.replace(tzinfo=timezone.utc).astimezone(tz)  # 将参照时间转换为用户本地时间
+    candidate = local_after.replace(hour=hour, minute=minute, second=0, microsecond=0)  # 取同一天的推送时刻
+    if candidate <= local_after:  # 如果当天的推送时刻已经过去
+        candidate = (candidate.replace(tzinfo=None) + timedelta(days=1)).replace(tzinfo=tz)  # 按本地挂钟时间顺延一天，正确处理夏令时切换
+    return candidate.astimezone(timezone.utc).replace(tzinfo=None)  # 转回 UTC 朴素时间
+
+
+def local_date(when: datetime, tz_name: str | None) -> date:  # 定义逻辑日期计算函数
+    """
+    返回 UTC 朴素时间 when 在用户时区下对应的日期，时区非法时回退为全局配置时区
+    """
+    try:  # 尝试解析用户时区
+        tz = resolve_timezone(tz_name)  # 解析用户时区
+    except ValueError:  # 历史数据中的时区名称非法
+        tz = resolve_timezone(None)  # 回退为全局配置时区
+    return when.replace(tzinfo=timezone.utc).astimezone(tz).date()  # 转换为用户本地日期
+
+
+def schedule_next(user, now: datetime):  # 定义工具函数，推进用户的下一次推送时间
+    """
+    将 user.next_digest_at 推进到严格晚于 now 的下一次推送时间，配置非法时回退为默认推送时间
+    """
+    try:  # 使用 try 块处理历史数据中格式异常的推送时间或时区
+        user.next_digest_at = compute_next_digest_at(user.digest_time, user.digest_timezone, now)  # 计算严格晚于当前时间的下一次推送时间
+    except ValueError:  # 捕获解析异常
+        print(  # 打印错误配置提醒，便于在终端中观察到具体异常配置
+            f"Invalid digest schedule for user {user.email}: {user.digest_time} {user.digest_timezone}"  # 提示用户的推送时间或时区配置不合法
+        )  # 结束错误日志打印
+        user.next_digest_at = compute_next_digest_at(None, None, now)  # 回退为默认推送时间，避免该用户永远不被调度
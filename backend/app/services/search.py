@@ -0,0 +1,147 @@
+import re
+import threading
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "papers_fts"
+MYSQL_FULLTEXT_INDEX = "ft_papers_title_abstract"
+# 标题命中比摘要命中更能说明相关性，BM25 计算时给标题列更高的权重
+TITLE_WEIGHT = 2.0
+ABSTRACT_WEIGHT = 1.0
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# 近似重复论文不进入检索结果；全量重建、增量写入与检索使用同一过滤条件，结果与索引的构建方式无关
+SEARCHABLE = "duplicate_of IS NULL"
+
+_ready: set = set()
+_ready_lock = threading.Lock()
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _tokens(query: str) -> list:
+    """
+    从用户输入中提取检索词，丢弃 FTS 语法字符，避免引号、括号等导致语法错误
+    """
+    return TOKEN_RE.findall(query or "")
+
+
+def ensure_search_index(db: Session) -> bool:
+    """
+    确保全文索引存在：SQLite 使用外部内容 FTS5 虚拟表（首次创建时从 papers 全量构建），
+    MySQL 在 papers(title, abstract) 上创建 FULLTEXT 索引。
+    在调用方事务内执行，由调用方负责提交；确认索引已经存在后每个进程每种数据库不再检查。
+    MySQL 的 ALTER TABLE 会隐式提交当前事务，应用启动时已创建索引，之后不会再执行
+    :return: 本次是否新建（并全量构建）了索引
+    """
+    dialect = _dialect(db)
+    if dialect in _ready:
+        return False
+    with _ready_lock:
+        if dialect in _ready:
+            return False
+        if dialect == "sqlite":
+            exists = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first()
+            if not exists:
+                db.execute(text(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    "title, abstract, content='papers', content_rowid='id', tokenize='unicode61')"
+                ))
+                rebuild_search_index(db)
+                return True
+        elif dialect == "mysql":
+            exists = db.execute(
+                text(
+                    "SELECT 1 FROM information_schema.statistics "
+                    "WHERE table_schema = DATABASE() AND table_name = 'papers' AND index_name = :name"
+                ),
+                {"name": MYSQL_FULLTEXT_INDEX},
+            ).first()
+            if not exists:
+                db.execute(text(f"ALTER TABLE papers ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} (title, abstract)"))
+                return True
+        # 只有确认索引已经存在（而不是刚在尚未提交的事务中创建）时才记为就绪，调用方回滚后下一次仍会重新检查
+        _ready.add(dialect)
+        return False
+
+
+def rebuild_search_index(db: Session):
+    """
+    从 papers 表全量重建 SQLite 全文索引，与增量写入一样跳过近似重复论文（FTS5 的 'rebuild' 命令无法过滤，改为清空后重新写入）；
+    MySQL 的 FULLTEXT 索引由 InnoDB 自动维护，无需重建，重复论文在检索时过滤
+    """
+    if _dialect(db) == "sqlite":
+        db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+        db.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, abstract) "
+            f"SELECT id, title, COALESCE(abstract, '') FROM papers WHERE {SEARCHABLE}"
+        ))
+
+
+def index_papers(db: Session, paper_ids: list):
+    """
+    把新入库的论文加入全文索引，由调用方负责提交。
+    SQLite 的外部内容 FTS5 表不会自动同步，需要显式写入；MySQL 的 FULLTEXT 索引随插入自动更新
+    """
+    if not paper_ids or _dialect(db) != "sqlite":
+        return
+    if ensure_search_index(db):
+        # 刚在当前事务内从 papers 全量构建，已经包含本批论文
+        return
+    db.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, abstract) "
+            f"SELECT id, title, COALESCE(abstract, '') FROM papers WHERE id IN :ids AND {SEARCHABLE}"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(paper_ids)},
+    )
+
+
+def search_papers(db: Session, query: str, limit: int = 20, offset: int = 0) -> tuple:
+    """
+    在本地论文库中按标题与摘要全文检索，所有检索词都需命中，按相关性从高到低排序；近似重复论文不返回。
+    SQLite 使用 FTS5 的 BM25 评分（标题加权，分值越小越相关，返回时取反）；
+    MySQL 使用 InnoDB FULLTEXT 布尔模式的相关性评分，不是 BM25，也不区分标题与摘要的权重，两种数据库的分值与排序不可直接比较
+    :return: (命中总数, [(Paper 主键, 相关性分值), ...])
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return 0, []
+    ensure_search_index(db)
+
+    if _dialect(db) == "sqlite":
+        match = " ".join('"{}"'.format(token) for token in tokens)
+        # 在检索时再次过滤，覆盖入库后才被回填标记为重复的论文
+        matched = f"FROM {FTS_TABLE} JOIN papers ON papers.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH :match AND {SEARCHABLE}"
+        total = db.execute(text(f"SELECT count(*) {matched}"), {"match": match}).scalar()
+        rows = db.execute(
+            text(
+                f"SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, :title_weight, :abstract_weight) AS score "
+                f"{matched} ORDER BY score LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "match": match,
+                "title_weight": TITLE_WEIGHT,
+                "abstract_weight": ABSTRACT_WEIGHT,
+                "limit": limit,
+                "offset": offset,
+            },
+        ).all()
+        return total, [(paper_id, -score) for paper_id, score in rows]
+
+    match = " ".join(f"+{token}" for token in tokens)
+    matched = f"FROM papers WHERE MATCH(title, abstract) AGAINST (:match IN BOOLEAN MODE) AND {SEARCHABLE}"
+    total = db.execute(text(f"SELECT count(*) {matched}"), {"match": match}).scalar()
+    rows = db.execute(
+        text(
+            "SELECT id, MATCH(title, abstract) AGAINST (:match IN BOOLEAN MODE) AS score "
+            f"{matched} ORDER BY score DESC LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "limit": limit, "offset": offset},
+    ).all()
+    return total, [(paper_id, float(score)) for paper_id, score in rows]
@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from typing import Iterator
+import requests
+from requests.adapters import HTTPAdapter
+from app.core.config import settings
+from app.services.rate_limiter import TokenBucket
+
+# 需要重试的 HTTP 状态码：限流与服务端临时错误
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class SourceAdapter:
+    """
+    论文数据源适配器基类：每个数据源声明自己的名称、接口地址、限速、分页大小与并发上限，
+    并把源站返回的记录规范化为统一的论文字典（title、abstract、url、published_date、authors、categories、source）。
+    基类提供带连接池的 HTTP 会话以及超时、限速和带抖动的指数退避重试；
+    接口地址通过构造参数传入，测试时可以直接指向本地的固定响应服务器
+    """
+
+    name = ""
+    default_base_url = ""
+    default_page_size = 100
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        request_interval: float = 1.0,
+        max_workers: int = 1,
+        page_size: int | None = None,
+        timeout: float = settings.CRAWLER_TIMEOUT,
+        max_retries: int = settings.CRAWLER_MAX_RETRIES,
+        limiter: TokenBucket | None = None,
+    ):
+        self.base_url = base_url or self.default_base_url
+        self.request_interval = request_interval
+        self.max_workers = max_workers
+        self.page_size = page_size or self.default_page_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # 同一数据源的所有请求共享一个令牌桶，保证整体遵守该源站的请求频率要求
+        self.limiter = limiter or TokenBucket(rate=1 / request_interval)
+        self.session = requests.Session()
+        # 连接池大小与并发数一致，保证每个工作线程都能复用一条长连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, url: str, params: dict, stream: bool = True) -> requests.Response:
+        """
+        发送一次 GET 请求，失败时按带抖动的指数退避重试
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    # 让底层流自动处理 gzip 等内容编码，供增量解析直接读取
+                    response.raw.decode_content = True
+                    return response
+                response.close()
+                error = requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            # 指数退避并加入随机抖动，避免多个线程在同一时刻集中重试
+            delay = self.request_interval * (2 ** (attempt - 1))
+            time.sleep(delay + random.uniform(0, delay))
+
+    def source_id(self, url: str) -> str:
+        """
+        从论文链接中提取源站内的论文编号，用于抓取水位线
+        """
+        return url.rstrip('/').rsplit('/', 1)[-1]
+
+    def iter_query(
+        self,
+        query: str,
+        page_size: int | None = None,
+        max_total: int | None = None,
+        start: int = 0,
+        since: tuple | None = None,
+    ) -> Iterator[dict]:
+        """
+        逐页抓取查询结果并逐条产出规范化的论文字典，结果按发布时间倒序
+        :param since: (最新发布时间, 最新源站论文编号) 水位线，遇到已见过的论文时停止
+        """
+        raise NotImplementedError
+
+    def reached_watermark(self, paper: dict, since: tuple) -> bool:
+        """
+        判断论文是否已经在上一次抓取中见过；结果按发布时间倒序排列，遇到第一篇见过的论文即可停止
+        """
+        last_published, last_id = since
+        if last_id and self.source_id(paper['url']) == last_id:
+            return True
+        return last_published is not None and paper['published_date'] < last_published
+
+    def close(self):
+        self.session.close()
+
+
+_registry: dict = {}
+_factories: dict = {}
+_registry_lock = threading.Lock()
+
+
+def register_source(name: str, factory):
+    """
+    注册数据源：factory 为无参可调用对象，首次使用时才创建适配器实例
+    """
+    with _registry_lock:
+        _factories[name] = factory
+        _registry.pop(name, None)
+
+
+def get_source(name: str) -> SourceAdapter:
+    """
+    获取进程内共享的数据源适配器实例
+    """
+    with _registry_lock:
+        if name not in _registry:
+            if name not in _factories:
+                raise KeyError(f"Unknown paper source: {name}")
+            _registry[name] = _factories[name]()
+        return _registry[name]
+
+
+def available_sources() -> list:
+    with _registry_lock:
+        return sorted(_factories)
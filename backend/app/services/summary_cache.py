@@ -0,0 +1,105 @@
+import hashlib  # 导入 hashlib 用于计算内容哈希
+import threading  # 导入 threading 用于保护统计计数器
+from sqlalchemy.orm import Session  # 导入 Session 类型用于类型标注
+from app.core.cache import LRUCache  # 导入进程内 LRU 缓存
+from app.models.paper import Paper  # 导入论文模型以便读写结构化摘要
+from app.services import llm  # 导入 LLM 服务模块，读取提示词、模型配置并生成摘要
+
+
+def summary_key(abstract: str, prompt: str | None = None, model: str | None = None) -> str:  # 定义摘要缓存键计算函数
+    """
+    计算 hash(摘要原文, 提示词, 模型)，三者任一变化都会得到新的缓存键
+    """
+    prompt = llm.SUMMARY_PROMPT if prompt is None else prompt  # 未指定提示词时使用当前提示词
+    model = llm.summary_model_tag() if model is None else model  # 未指定模型时使用当前生效的模型标识
+    digest = hashlib.sha256()  # 创建 SHA-256 哈希对象
+    for part in (model, prompt, abstract or ""):  # 依次写入模型、提示词与摘要原文
+        digest.update(part.encode("utf-8"))  # 写入当前部分的 UTF-8 编码
+        digest.update(b"\0")  # 写入分隔符，避免不同拼接方式产生相同哈希
+    return digest.hexdigest()  # 返回十六进制哈希字符串
+
+
+class SummaryStore:  # 定义内容寻址的摘要存储，进程内 LRU 在前，数据库 Paper.structured_abstract 在后
+    """
+    结构化摘要缓存：先查进程内 LRU，再按内容哈希查数据库，两者都未命中时才并发调用 LLM，
+    生成结果写回 Paper.structured_abstract 与 Paper.summary_key，保证同一篇论文只总结一次
+    """
+
+    def __init__(self, capacity: int = 2048):  # 初始化摘要存储
+        self._lru = LRUCache(capacity)  # 进程内 LRU 缓存，键为摘要缓存键，值为摘要文本
+        self._lock = threading.Lock()  # 保护数据库命中与未命中计数器
+        self.db_hits = 0  # 在数据库中命中的次数
+        self.misses = 0  # 需要真正调用 LLM 的次数
+
+    def summarize_many(self, db: Session, papers: list[dict]) -> list[str]:  # 批量获取一组论文的摘要，未命中的部分并发调用 LLM
+        """
+        返回与输入顺序一致的摘要列表：先批量查 LRU 与数据库，再把所有未命中的摘要作为一批并发生成
+        :param papers: 包含 abstract 字段（以及可选 id 字段）的论文字典列表
+        """
+        keys = [summary_key(paper["abstract"]) for paper in papers]  # 计算每篇论文的内容缓存键
+        abstracts: dict[str, str] = {}  # 缓存键到摘要原文的映射
+        paper_ids: dict[str, list[int]] = {}  # 缓存键到论文主键列表的映射，用于写回数据库
+        for key, paper in zip(keys, papers):  # 遍历每篇论文
+            abstracts.setdefault(key, paper["abstract"])  # 记录该缓存键对应的摘要原文
+            if paper.get("id") is not None:  # 如果论文已经入库
+                paper_ids.setdefault(key, []).append(paper["id"])  # 记录需要写回摘要的论文主键
+
+        found: dict[str, str] = {}  # 已命中的缓存键到摘要的映射
+        for key in abstracts:  # 遍历去重后的缓存键
+            summary = self._lru.get(key)  # 先查进程内 LRU
+            if summary is not None:  # 如果 LRU 命中
+                found[key] = summary  # 记录命中结果
+
+        pending = [key for key in abstracts if key not in found]  # LRU 未命中的缓存键
+        if pending:  # 如果存在 LRU 未命中的缓存键
+            rows = (  # 一次 IN 查询在数据库中查找已有摘要
+                db.query(Paper.summary_key, Paper.structured_abstract)  # 只读取缓存键与摘要列
+                .filter(Paper.summary_key.in_(pending), Paper.structured_abstract.isnot(None))  # 匹配缓存键且摘要非空
+                .all()  # 执行查询
+            )  # 结束查询表达式
+            for key, summary in rows:  # 遍历数据库命中结果
+                if key not in found:  # 同一缓存键可能对应多篇论文，只取第一条
+                    found[key] = summary  # 记录命中结果
+                    self._lru.set(key, summary)  # 回填进程内 LRU
+                    with self._lock:  # 加锁更新计数器
+                        self.db_hits += 1  # 记录一次数据库命中
+
+        missing = [key for key in abstracts if key not in found]  # LRU 与数据库都未命中的缓存键
+        if missing:  # 如果存在需要调用 LLM 的摘要
+            with self._lock:  # 加锁更新计数器
+                self.misses += len(missing)  # 记录未命中次数
+            generated = llm.summarize_batch([abstracts[key] for key in missing])  # 并发生成这一批摘要
+            for key, summary in zip(missing, generated):  # 遍历生成结果
+                if summary is None:  # 如果生成失败、超时或未配置 API Key
+                    found[key] = llm.fallback_summary(abstracts[key])  # 回退到截断原文，不写入缓存与数据库，下一次仍会重试
+                    continue  # 处理下一条
+                found[key] = summary  # 记录生成结果
+                self._lru.set(key, summary)  # 写入进程内 LRU
+                for paper_id in paper_ids.get(key, []):  # 遍历需要写回的论文
+                    db.query(Paper).filter(Paper.id == paper_id).update(  # 将摘要写回论文记录
+                        {"structured_abstract": summary, "summary_key": key},  # 同时写入摘要文本与缓存键
+                        synchronize_session=False,  # 批量更新无需同步会话中的对象
+                    )  # 结束 update 调用
+            db.commit()  # 统一提交，使其他会话与后续轮次都能复用这批摘要
+
+        return [found[key] for key in keys]  # 按输入顺序返回摘要列表
+
+    def get_or_generate(self, db: Session, abstract: str, paper_id: int | None = None) -> str:  # 获取单篇论文摘要，未命中时调用 LLM 生成
+        """
+        返回论文的结构化摘要，同一内容只会调用一次 LLM
+        """
+        return self.summarize_many(db, [{"abstract": abstract, "id": paper_id}])[0]  # 复用批量接口处理单篇论文
+
+    def stats(self) -> dict:  # 返回摘要缓存的命中统计
+        lru = self._lru.stats()  # 读取 LRU 统计
+        lookups = lru["hits"] + self.db_hits + self.misses  # 统计总查找次数（LRU 未命中后会继续查数据库）
+        return {  # 返回统计字典
+            "lru_hits": lru["hits"],  # 进程内 LRU 命中次数
+            "db_hits": self.db_hits,  # 数据库命中次数
+            "misses": self.misses,  # 调用 LLM 的次数
+            "hit_ratio": (lookups - self.misses) / lookups if lookups else 0.0,  # 总命中率
+            "lru_size": lru["size"],  # 当前 LRU 条目数量
+        }  # 结束统计字典
+
+
+summary_store = SummaryStore()  # 创建进程内共享的摘要存储实例
@@ -0,0 +1,72 @@
+import threading
+import time
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+
+class UserCache:
+    """
+    登录用户解析缓存：按用户主键缓存已脱离会话的用户对象，条目在 ttl 秒后失效，
+    修改用户的接口需显式调用 invalidate。命中时通过 merge(load=False) 把缓存对象的副本挂到当前请求的会话上，
+    不访问数据库，且请求内的修改只作用于副本，不会污染缓存
+    """
+
+    def __init__(self, ttl: float | None = None, capacity: int | None = None):
+        self._cache = TTLCache(
+            ttl=settings.USER_CACHE_TTL if ttl is None else ttl,
+            capacity=capacity or settings.USER_CACHE_SIZE,
+        )
+        self._lock = threading.Lock()
+        self._hit_seconds = 0.0
+        self._miss_seconds = 0.0
+
+    def get(self, db: Session, user_id: int) -> User | None:
+        started = time.perf_counter()
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            user = db.merge(cached, load=False)
+            self._record(hit=True, seconds=time.perf_counter() - started)
+            return user
+
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            # 先从当前会话中移出再放入缓存，随后合并出一个新的副本供本次请求使用
+            db.expunge(user)
+            self._cache.set(user_id, user)
+            user = db.merge(user, load=False)
+        self._record(hit=False, seconds=time.perf_counter() - started)
+        return user
+
+    def _record(self, hit: bool, seconds: float):
+        with self._lock:
+            if hit:
+                self._hit_seconds += seconds
+            else:
+                self._miss_seconds += seconds
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        """
+        返回命中统计以及命中与未命中的平均耗时，二者之差即每次命中节省的时间
+        """
+        stats = self._cache.stats()
+        with self._lock:
+            hit_ms = self._hit_seconds * 1000 / stats["hits"] if stats["hits"] else 0.0
+            miss_ms = self._miss_seconds * 1000 / stats["misses"] if stats["misses"] else 0.0
+        stats.update({
+            "ttl": self._cache.ttl,
+            "avg_hit_ms": round(hit_ms, 3),
+            "avg_miss_ms": round(miss_ms, 3),
+            "saved_ms": round((miss_ms - hit_ms) * stats["hits"], 1) if stats["misses"] else 0.0,
+        })
+        return stats
+
+
+user_cache = UserCache()
@@ -16,12 +16,16 @@ CREATE TABLE `users` (
   `is_verified` TINYINT(1) NOT NULL DEFAULT 0 COMMENT '邮箱是否已验证',
   `subscription_enabled` TINYINT(1) NOT NULL DEFAULT 1 COMMENT '是否开启订阅',
   `digest_time` CHAR(5) NULL COMMENT '每日推送时间，格式 HH:MM',
+  `digest_timezone` VARCHAR(64) NULL COMMENT '推送时间所在的 IANA 时区',
+  `next_digest_at` DATETIME NULL COMMENT '下一次推送的 UTC 时间',
   `created_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) COMMENT '创建时间',
   `updated_at` DATETIME(6) NULL ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
   PRIMARY KEY (`id`),
   UNIQUE KEY `uq_users_email` (`email`),
   KEY `ix_users_email` (`email`),
-  KEY `ix_users_id` (`id`)
+  KEY `ix_users_id` (`id`),
+  KEY `ix_users_next_digest_at` (`next_digest_at`),
+  KEY `ix_users_created_at` (`created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- ----------------------------
@@ -51,14 +55,37 @@ CREATE TABLE `papers` (
   `authors` JSON NULL COMMENT '作者列表',
   `abstract` TEXT NULL COMMENT '原始摘要',
   `structured_abstract` TEXT NULL COMMENT '结构化摘要（LLM 生成）',
+  `summary_key` CHAR(64) NULL COMMENT '结构化摘要缓存键：原始摘要、提示词与模型的 SHA-256',
   `url` VARCHAR(512) NULL COMMENT '论文链接，唯一',
   `source` VARCHAR(50) NULL COMMENT '数据来源，如 arXiv、PubMed 等',
   `published_date` DATETIME NULL COMMENT '论文发布日期',
+  `minhash` BLOB NULL COMMENT '标题与摘要词组的 MinHash 签名',
+  `duplicate_of` INT NULL COMMENT '近似重复论文指向的原始论文 ID',
   `created_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) COMMENT '入库时间',
   PRIMARY KEY (`id`),
   UNIQUE KEY `uq_papers_url` (`url`),
   KEY `ix_papers_id` (`id`),
-  KEY `ix_papers_url` (`url`)
+  KEY `ix_papers_url` (`url`),
+  KEY `ix_papers_summary_key` (`summary_key`),
+  KEY `ix_papers_duplicate_of` (`duplicate_of`),
+  FULLTEXT KEY `ft_papers_title_abstract` (`title`, `abstract`),
+  CONSTRAINT `fk_papers_duplicate_of` FOREIGN KEY (`duplicate_of`) REFERENCES `papers`(`id`) ON DELETE SET NULL ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ----------------------------
+-- Table structure for paper_lsh_bands
+-- ----------------------------
+DROP TABLE IF EXISTS `paper_lsh_bands`;
+CREATE TABLE `paper_lsh_bands` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT 'MinHash 分段索引主键 ID',
+  `paper_id` INT NOT NULL COMMENT '论文 ID',
+  `band` SMALLINT NOT NULL COMMENT 'MinHash 签名的分段序号',
+  `bucket` BIGINT NOT NULL COMMENT '该分段签名的 64 位哈希',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_paper_lsh_bands_paper_band_bucket` (`paper_id`, `band`, `bucket`),
+  KEY `ix_paper_lsh_bands_id` (`id`),
+  KEY `ix_paper_lsh_bands_bucket_band` (`bucket`, `band`),
+  CONSTRAINT `fk_paper_lsh_bands_paper_id` FOREIGN KEY (`paper_id`) REFERENCES `papers`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- ----------------------------
@@ -74,9 +101,76 @@ CREATE TABLE `daily_digests` (
   PRIMARY KEY (`id`),
   KEY `ix_daily_digests_id` (`id`),
   KEY `ix_daily_digests_user_id` (`user_id`),
+  KEY `ix_daily_digests_sent_at` (`sent_at`),
+  KEY `ix_daily_digests_user_sent_at` (`user_id`, `sent_at`),
   CONSTRAINT `fk_daily_digests_user_id` FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ----------------------------
+-- Table structure for digest_papers
+-- ----------------------------
+DROP TABLE IF EXISTS `digest_papers`;
+CREATE TABLE `digest_papers` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT '日报论文关联主键 ID',
+  `digest_id` INT NOT NULL COMMENT '每日摘要记录 ID',
+  `user_id` INT NOT NULL COMMENT '接收用户 ID',
+  `paper_id` INT NOT NULL COMMENT '论文 ID',
+  `position` INT NOT NULL COMMENT '论文在日报中的顺序，从 0 开始',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_digest_papers_digest_position` (`digest_id`, `position`),
+  KEY `ix_digest_papers_id` (`id`),
+  KEY `ix_digest_papers_user_paper` (`user_id`, `paper_id`),
+  CONSTRAINT `fk_digest_papers_digest_id` FOREIGN KEY (`digest_id`) REFERENCES `daily_digests`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_digest_papers_user_id` FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_digest_papers_paper_id` FOREIGN KEY (`paper_id`) REFERENCES `papers`(`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ----------------------------
+-- Table structure for digest_jobs
+-- ----------------------------
+DROP TABLE IF EXISTS `digest_jobs`;
+CREATE TABLE `digest_jobs` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT '推送任务主键 ID',
+  `user_id` INT NOT NULL COMMENT '所属用户 ID',
+  `logical_date` DATE NOT NULL COMMENT '用户本地时区下的推送日期',
+  `scheduled_for` DATETIME NOT NULL COMMENT '计划推送的 UTC 时间',
+  `run_after` DATETIME NOT NULL COMMENT '最早可执行的 UTC 时间',
+  `status` VARCHAR(16) NOT NULL DEFAULT 'pending' COMMENT '任务状态：pending/running/done/skipped/failed',
+  `attempts` INT NOT NULL DEFAULT 0 COMMENT '已尝试执行次数',
+  `locked_at` DATETIME NULL COMMENT '被执行者领取的 UTC 时间',
+  `locked_by` VARCHAR(32) NULL COMMENT '领取该任务的批次令牌',
+  `last_error` TEXT NULL COMMENT '最近一次失败的错误信息',
+  `digest_id` INT NULL COMMENT '对应的每日摘要记录 ID',
+  `created_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) COMMENT '入队时间',
+  `updated_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_digest_jobs_user_date` (`user_id`, `logical_date`),
+  KEY `ix_digest_jobs_id` (`id`),
+  KEY `ix_digest_jobs_status_run_after` (`status`, `run_after`),
+  CONSTRAINT `fk_digest_jobs_user_id` FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_digest_jobs_digest_id` FOREIGN KEY (`digest_id`) REFERENCES `daily_digests`(`id`) ON DELETE SET NULL ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ----------------------------
+-- Table structure for paper_matches
+-- ----------------------------
+DROP TABLE IF EXISTS `paper_matches`;
+CREATE TABLE `paper_matches` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT '论文匹配主键 ID',
+  `user_id` INT NOT NULL COMMENT '匹配到的用户 ID',
+  `paper_id` INT NOT NULL COMMENT '匹配到的论文 ID',
+  `digest_id` INT NULL COMMENT '推送该匹配的每日摘要记录 ID，为空表示尚未推送',
+  `matched_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) COMMENT '匹配时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_paper_matches_user_paper` (`user_id`, `paper_id`),
+  KEY `ix_paper_matches_id` (`id`),
+  KEY `ix_paper_matches_user_digest` (`user_id`, `digest_id`),
+  KEY `ix_paper_matches_digest_matched` (`digest_id`, `matched_at`),
+  CONSTRAINT `fk_paper_matches_user_id` FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_paper_matches_paper_id` FOREIGN KEY (`paper_id`) REFERENCES `papers`(`id`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `fk_paper_matches_digest_id` FOREIGN KEY (`digest_id`) REFERENCES `daily_digests`(`id`) ON DELETE SET NULL ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ----------------------------
 -- Table structure for email_configs
 -- ----------------------------
@@ -114,5 +208,55 @@ CREATE TABLE `verification_codes` (
   KEY `ix_verification_codes_email` (`email`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ----------------------------
+-- Table structure for crawl_states
+-- ----------------------------
+DROP TABLE IF EXISTS `crawl_states`;
+CREATE TABLE `crawl_states` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT '抓取水位线主键 ID',
+  `query` VARCHAR(512) NOT NULL COMMENT '规范化后的查询字符串',
+  `last_published_date` DATETIME NULL COMMENT '已见过的最新论文发布时间',
+  `last_arxiv_id` VARCHAR(64) NULL COMMENT '已见过的最新论文 arXiv ID（不含版本号）',
+  `resume_offset` INT NULL COMMENT '未完成抓取下一次继续的结果偏移量，为空表示没有未完成的抓取',
+  `pending_published_date` DATETIME NULL COMMENT '未完成抓取中见过的最新论文发布时间',
+  `pending_arxiv_id` VARCHAR(64) NULL COMMENT '未完成抓取中见过的最新论文 arXiv ID',
+  `recent_paper_ids` JSON NULL COMMENT '该查询最近的论文 ID 列表',
+  `updated_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_crawl_states_query` (`query`),
+  KEY `ix_crawl_states_id` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ----------------------------
+-- Table structure for delivery_rollups
+-- ----------------------------
+DROP TABLE IF EXISTS `delivery_rollups`;
+CREATE TABLE `delivery_rollups` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT '推送量汇总主键 ID',
+  `granularity` VARCHAR(8) NOT NULL COMMENT '时间桶粒度：hour / day',
+  `bucket_start` DATETIME NOT NULL COMMENT '时间桶起点（UTC，按粒度取整）',
+  `delivered` INT NOT NULL DEFAULT 0 COMMENT '成功推送的日报数量',
+  `failed` INT NOT NULL DEFAULT 0 COMMENT '推送失败的尝试次数',
+  `papers` INT NOT NULL DEFAULT 0 COMMENT '推送的论文总数',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_delivery_rollups_granularity_bucket` (`granularity`, `bucket_start`),
+  KEY `ix_delivery_rollups_id` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ----------------------------
+-- Table structure for admin_stats
+-- ----------------------------
+DROP TABLE IF EXISTS `admin_stats`;
+CREATE TABLE `admin_stats` (
+  `id` INT NOT NULL COMMENT '固定为 1，整张表只有一行',
+  `total_users` INT NOT NULL DEFAULT 0 COMMENT '平台用户总数',
+  `active_users` INT NOT NULL DEFAULT 0 COMMENT '激活用户数量',
+  `subscribed_users` INT NOT NULL DEFAULT 0 COMMENT '开启订阅开关的用户数量',
+  `total_profiles` INT NOT NULL DEFAULT 0 COMMENT '已配置科研画像的数量',
+  `rebuilt_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) COMMENT '最近一次全量重算的时间',
+  `updated_at` DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 SET FOREIGN_KEY_CHECKS = 1;
 
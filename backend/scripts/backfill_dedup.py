@@ -0,0 +1,28 @@
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+import argparse  # 导入 argparse 用于解析命令行参数
+from app.db.session import SessionLocal  # 导入 SessionLocal 工厂用于创建会话
+from app.db import base  # noqa: F401  导入全部模型以便正确注册关系映射
+from app.services.dedup import backfill_signatures  # 导入历史论文签名补算函数
+
+
+def main():  # 定义回填脚本入口函数
+    parser = argparse.ArgumentParser(description="为历史论文补算 MinHash 签名并标记近似重复论文")  # 创建命令行参数解析器
+    parser.add_argument("--chunk-size", type=int, default=500, help="每次提交处理的论文数量")  # 可选参数：处理分块大小
+    args = parser.parse_args()  # 解析命令行参数
+
+    db = SessionLocal()  # 创建数据库会话
+    try:  # 使用 try 块保证会话最终被关闭
+        processed, flagged = backfill_signatures(db, chunk_size=args.chunk_size)  # 按主键顺序分块补算签名
+        print(f"Backfilled signatures for {processed} papers, flagged {flagged} near-duplicates")  # 打印回填结果
+    finally:  # 无论成功与否都执行清理
+        db.close()  # 关闭数据库会话
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    main()  # 调用回填入口函数
@@ -0,0 +1,32 @@
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+import argparse  # 导入 argparse 用于解析命令行参数
+import time  # 导入 time 用于统计执行耗时
+from app.db.session import Base, SessionLocal, engine  # 导入模型基类、会话工厂与数据库引擎
+from app.db import base  # noqa: F401  导入全部模型以便正确注册关系映射
+from app.services.delivery_rollups import rebuild_rollups  # 导入推送量时间桶全量重算函数
+
+
+def main():  # 定义回填脚本入口函数
+    parser = argparse.ArgumentParser(description="从推送历史全量重算每小时与每天的推送量汇总")  # 创建命令行参数解析器
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每次从数据库读取与写入的行数")  # 可选参数：分块大小
+    args = parser.parse_args()  # 解析命令行参数
+
+    Base.metadata.create_all(bind=engine)  # 确保汇总表已创建
+    db = SessionLocal()  # 创建数据库会话
+    try:  # 使用 try 块保证会话最终被关闭
+        started = time.monotonic()  # 记录开始时间
+        buckets = rebuild_rollups(db, chunk_size=args.chunk_size)  # 清空并重算全部时间桶
+        db.commit()  # 在同一事务中提交清空与重算结果
+        print(f"Rebuilt {buckets} delivery rollup buckets in {time.monotonic() - started:.1f}s")  # 打印重算结果
+    finally:  # 无论成功与否都执行清理
+        db.close()  # 关闭数据库会话
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    main()  # 调用回填入口函数
@@ -0,0 +1,43 @@
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+import argparse  # 导入 argparse 用于解析命令行参数
+from app.db.session import SessionLocal  # 导入 SessionLocal 工厂用于创建会话
+from app.db import base  # noqa: F401  导入全部模型以便正确注册关系映射
+from app.services.ingest import IngestEngine, IngestJob  # 导入多数据源入库引擎与入库任务
+from app.services.sources import available_sources  # 导入已注册数据源列表，用于校验命令行参数
+
+
+def parse_job(spec: str, default_source: str, max_total: int | None, page_size: int | None) -> IngestJob:  # 将命令行中的查询参数解析为入库任务
+    source, sep, query = spec.partition("=")  # 尝试拆分出 "数据源=查询" 形式中的数据源名称
+    if not sep or source not in available_sources():  # 没有数据源前缀，或前缀不是已注册的数据源（arXiv 查询本身不含等号）
+        source, query = default_source, spec  # 使用默认数据源，整个参数作为查询
+    return IngestJob(source, query, max_total=max_total, page_size=page_size)  # 构造入库任务
+
+
+def main():  # 定义回填脚本入口函数
+    parser = argparse.ArgumentParser(description="分页回填论文到本地数据库，多个数据源并发抓取")  # 创建命令行参数解析器
+    parser.add_argument("queries", nargs="+", help="查询，例如 cat:cs.AI；可加数据源前缀，例如 pubmed=crispr")  # 必填参数：一个或多个查询
+    parser.add_argument("--source", default="arxiv", choices=available_sources(), help="未加前缀的查询使用的数据源")  # 可选参数：默认数据源
+    parser.add_argument("--max-total", type=int, default=None, help="每个查询最多回填的论文数量，默认抓取全部结果")  # 可选参数：回填数量上限
+    parser.add_argument("--page-size", type=int, default=None, help="每页抓取数量，默认使用数据源的分页大小")  # 可选参数：分页大小
+    parser.add_argument("--chunk-size", type=int, default=500, help="每次提交入库的论文数量")  # 可选参数：入库分块大小
+    args = parser.parse_args()  # 解析命令行参数
+
+    jobs = [parse_job(spec, args.source, args.max_total, args.page_size) for spec in args.queries]  # 为每个查询构造入库任务
+    db = SessionLocal()  # 创建数据库会话
+    try:  # 使用 try 块保证会话最终被关闭
+        IngestEngine(chunk_size=args.chunk_size).run(db, jobs)  # 各数据源在独立线程池中并发抓取，按块写入数据库
+        for job in jobs:  # 遍历每个入库任务
+            status = f"failed: {job.error}" if job.error else "ok"  # 任务状态，失败时附带错误信息
+            print(f"[{job.source}] {job.query}: fetched {job.fetched}, backfilled {job.new} new papers in {job.elapsed:.1f}s ({status})")  # 打印回填结果
+    finally:  # 无论成功与否都执行清理
+        db.close()  # 关闭数据库会话
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    main()  # 调用回填入口函数
@@ -0,0 +1,92 @@
+import argparse  # 导入 argparse 用于解析命令行参数
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+import statistics  # 导入 statistics 用于计算延迟分位数
+import threading  # 导入 threading 用于在登录突发期间并行探测其他接口
+import time  # 导入 time 用于计时
+import uuid  # 导入 uuid 用于生成不重复的测试账号
+from concurrent.futures import ThreadPoolExecutor  # 导入线程池用于并发发起登录请求
+import requests  # 导入 requests 作为 HTTP 客户端
+
+
+def _start_server(port: int):  # 在后台线程中启动一个本地 uvicorn 服务，便于脚本独立运行
+    import uvicorn  # 延迟导入 uvicorn，仅在未指定 --url 时需要
+    from app.main import app  # 导入 FastAPI 应用实例
+
+    app.router.on_startup.clear()  # 压测时不启动日报调度与预抓取后台任务，避免干扰测量
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))  # 创建 uvicorn 服务实例
+    threading.Thread(target=server.run, daemon=True).start()  # 在守护线程中运行服务
+    while not server.started:  # 等待服务完成启动
+        time.sleep(0.05)  # 短暂休眠后重试
+    return f"http://127.0.0.1:{port}"  # 返回服务地址
+
+
+def _percentile(values: list[float], q: float) -> float:  # 计算分位数，单位与输入一致
+    if not values:  # 没有样本时
+        return 0.0  # 返回 0
+    if len(values) == 1:  # 只有一个样本时
+        return values[0]  # 直接返回该样本
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]  # 按百分位切分后取对应分位点
+
+
+def main():  # 定义压测脚本入口函数
+    parser = argparse.ArgumentParser(description="登录突发压测：统计登录吞吐量以及同时段其他接口的延迟分位数")  # 创建命令行参数解析器
+    parser.add_argument("--url", default=None, help="已运行服务的地址，例如 http://127.0.0.1:8000；不指定时在本进程内启动服务")  # 可选参数：目标服务地址
+    parser.add_argument("--port", type=int, default=8765, help="本进程内启动服务时使用的端口")  # 可选参数：本地服务端口
+    parser.add_argument("--logins", type=int, default=200, help="突发登录请求总数")  # 可选参数：登录请求数量
+    parser.add_argument("--concurrency", type=int, default=32, help="并发登录的客户端数量")  # 可选参数：登录并发数
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="探测其他接口的请求间隔（秒）")  # 可选参数：探测间隔
+    args = parser.parse_args()  # 解析命令行参数
+
+    base = args.url or _start_server(args.port)  # 确定目标服务地址
+    api = f"{base}/api/v1"  # 拼接版本化 API 前缀
+    email, password = f"bench-{uuid.uuid4().hex[:8]}@example.com", "bench-password"  # 生成一次性的压测账号
+    requests.post(f"{api}/users/", json={"email": email, "password": password}).raise_for_status()  # 注册压测账号
+    login = {"username": email, "password": password}  # 登录表单
+    token = requests.post(f"{api}/login/access-token", data=login).json()["access_token"]  # 预先取得访问令牌供探测接口使用
+    headers = {"Authorization": f"Bearer {token}"}  # 探测请求使用的认证头
+
+    def probe_once(session: requests.Session) -> float:  # 请求一次轻量接口并返回耗时（毫秒）
+        started = time.perf_counter()  # 记录开始时间
+        session.get(f"{api}/users/me/digest-time", headers=headers).raise_for_status()  # 请求一个只读的轻量接口
+        return (time.perf_counter() - started) * 1000  # 返回耗时毫秒数
+
+    with requests.Session() as session:  # 使用长连接测量空闲时的基线延迟
+        baseline = [probe_once(session) for _ in range(50)]  # 采集 50 个基线样本
+
+    probes: list[float] = []  # 登录突发期间的探测延迟样本
+    stop = threading.Event()  # 通知探测线程停止的事件
+
+    def probe_loop():  # 探测线程：登录突发期间持续请求轻量接口
+        with requests.Session() as session:  # 使用长连接
+            while not stop.is_set():  # 直到突发结束
+                probes.append(probe_once(session))  # 记录一次探测延迟
+                time.sleep(args.probe_interval)  # 间隔一段时间后再次探测
+
+    def login_once(_):  # 执行一次登录并返回是否成功
+        return requests.post(f"{api}/login/access-token", data=login).status_code == 200  # 登录成功返回 True
+
+    prober = threading.Thread(target=probe_loop, daemon=True)  # 创建探测线程
+    prober.start()  # 启动探测线程
+    started = time.perf_counter()  # 记录突发开始时间
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:  # 创建登录客户端线程池
+        results = list(executor.map(login_once, range(args.logins)))  # 并发发起全部登录请求
+    elapsed = time.perf_counter() - started  # 计算突发持续时间
+    stop.set()  # 通知探测线程停止
+    prober.join()  # 等待探测线程退出
+
+    print(f"Logins: {sum(results)}/{args.logins} ok in {elapsed:.2f}s ({args.logins / elapsed:.1f} logins/s, concurrency {args.concurrency})")  # 打印登录吞吐量
+    for name, samples in (("idle", baseline), ("during burst", probes)):  # 分别打印空闲与突发期间的探测延迟
+        print(  # 打印延迟分位数
+            f"GET /users/me/digest-time {name}: n={len(samples)} "  # 样本数量
+            f"p50={_percentile(samples, 50):.1f}ms p99={_percentile(samples, 99):.1f}ms max={max(samples, default=0):.1f}ms"  # p50、p99 与最大值
+        )  # 结束打印
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    main()  # 调用压测入口函数
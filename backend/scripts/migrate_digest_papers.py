@@ -0,0 +1,31 @@
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+import argparse  # 导入 argparse 用于解析命令行参数
+import time  # 导入 time 用于统计执行耗时
+from app.db.session import Base, SessionLocal, engine  # 导入模型基类、会话工厂与数据库引擎
+from app.db import base  # noqa: F401  导入全部模型以便正确注册关系映射
+from app.services.digest_papers import migrate_digest_papers  # 导入日报论文关联迁移函数
+
+
+def main():  # 定义迁移脚本入口函数
+    parser = argparse.ArgumentParser(description="把历史每日摘要的 paper_ids JSON 展开写入 digest_papers 关联表，可重复执行")  # 创建命令行参数解析器
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每次处理并提交的每日摘要数量")  # 可选参数：分块大小
+    args = parser.parse_args()  # 解析命令行参数
+
+    Base.metadata.create_all(bind=engine)  # 确保关联表已创建
+    db = SessionLocal()  # 创建数据库会话
+    try:  # 使用 try 块保证会话最终被关闭
+        started = time.monotonic()  # 记录开始时间
+        migrated = migrate_digest_papers(db, chunk_size=args.chunk_size)  # 分块展开并写入关联表
+        print(f"Migrated {migrated} digests into digest_papers in {time.monotonic() - started:.1f}s")  # 打印迁移结果
+    finally:  # 无论成功与否都执行清理
+        db.close()  # 关闭数据库会话
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    main()  # 调用迁移入口函数
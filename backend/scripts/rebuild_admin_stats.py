@@ -0,0 +1,26 @@
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+from app.db.session import SessionLocal, engine  # 导入会话工厂与数据库引擎
+from app.db import base  # noqa: F401  导入全部模型以便正确注册关系映射
+from app.db.session import Base  # 导入模型基类，用于确保统计表存在
+from app.services.admin_stats import COUNTERS, admin_stats  # 导入统计字段列表与物化统计服务
+
+
+def main():  # 定义重算脚本入口函数
+    Base.metadata.create_all(bind=engine)  # 确保统计表已创建
+    db = SessionLocal()  # 创建数据库会话
+    try:  # 使用 try 块保证会话最终被关闭
+        row = admin_stats.rebuild(db)  # 从用户表与画像表全量重算计数
+        db.commit()  # 提交统计行
+        print(", ".join(f"{name}={getattr(row, name)}" for name in COUNTERS))  # 打印重算后的计数
+    finally:  # 无论成功与否都执行清理
+        db.close()  # 关闭数据库会话
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    main()  # 调用重算入口函数
@@ -1,3 +1,4 @@
+import argparse  # 导入 argparse 用于解析命令行参数
 import sys  # 导入 sys 模块以便修改模块搜索路径
 import os  # 导入 os 模块以便处理文件系统路径
 
@@ -5,115 +6,336 @@ import os  # 导入 os 模块以便处理文件系统路径
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
 sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
 
+import multiprocessing.util  # 导入 multiprocessing.util 用于注册子进程退出时的清理函数
+import threading  # 导入 threading 用于在后台关闭仍有执行者运行的执行器
+import time  # 导入 time 用于统计执行耗时与单用户超时
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait  # 导入线程池与进程池执行器
 from datetime import datetime  # 导入 datetime 用于获取当前时间
-from sqlalchemy.orm import Session  # 导入 Session 类型用于类型标注
-from app.db.session import SessionLocal  # 导入 SessionLocal 工厂用于创建会话
+from sqlalchemy.orm import Session, joinedload  # 导入 Session 类型用于类型标注，导入 joinedload 用于预加载科研画像
+from app.core.config import settings  # 导入全局配置对象，读取执行器类型、并发数量与单用户超时
+from app.db.session import SessionLocal, engine  # 导入 SessionLocal 工厂用于创建会话，导入 engine 以便在子进程中重建连接池
 from app.models.user import User  # 导入用户模型以查询订阅用户
 from app.models.subscription import ResearchProfile  # 导入科研订阅配置模型以便在独立脚本中正确注册关系映射
 from app.models.digest import DailyDigest  # 导入每日摘要模型以记录推送历史
-from app.models.paper import Paper  # 导入论文模型以便根据 URL 查询论文 ID
-from app.services.crawler import fetch_arxiv_papers, save_papers_to_db  # 导入论文抓取与保存函数
-from app.services.llm import generate_summary  # 导入摘要生成函数
-from app.services.email import send_email  # 导入发送邮件函数，使用数据库或环境中的 SMTP 配置
-
-
-def _run_digest_for_user(db: Session, user: User) -> bool:  # 定义内部工具函数，用于对单个用户执行一次摘要推送
-    keywords = ["cat:cs.AI"]  # 默认关注的 arXiv 分类，用于兜底
-    if user.profile and user.profile.keywords:  # 如果用户已经配置了科研偏好并且有关键词
-        keywords = user.profile.keywords  # 使用用户自定义的关键词列表替换默认值
-
-    all_papers = []  # 初始化用于收集所有论文的列表
-    for query in keywords:  # 遍历每一个关键词请求 arXiv
-        print(f"Fetching papers for user {user.email} with query: {query}")  # 打印当前抓取任务的说明
-        try:  # 捕获抓取过程中的异常，避免单个关键词失败影响整体
-            papers = fetch_arxiv_papers(query, max_results=5)  # 调用抓取函数从 arXiv 获取论文
-            if papers:  # 如果抓取到论文
-                save_papers_to_db(papers, db)  # 将新论文保存到数据库
-                all_papers.extend(papers)  # 将论文加入当前用户的论文集合
-        except Exception as e:  # 捕获所有异常
-            print(f"Error fetching papers for query {query}: {e}")  # 打印错误信息方便排查
+from app.models.digest_job import DigestJob  # 导入推送任务模型，执行者在独立会话中加载并更新任务
+from app.services.paper_router import mark_matches_delivered, pending_matches, retire_stale_matches  # 导入入库路由匹配的读取、标记与过期清理函数
+from app.services.ranking import paper_index, rank_candidates  # 导入论文向量索引与批量相关性排序
+from app.services.digest_renderer import digest_renderer  # 导入日报邮件渲染器，论文卡片片段按论文与摘要缓存
+from app.services.digest_papers import exclude_delivered, record_digest_papers  # 导入日报论文关联的写入与已推送过滤函数
+from app.services.delivery_rollups import record_delivery  # 导入推送量时间桶累加函数，推送成功或失败时增量更新汇总
+from app.services.digest_queue import JOB_DONE, claim_jobs, enqueue_due_jobs, fail_job, finish_job, mark_sent, renew_lease, start_sending, transition_job  # 导入推送任务队列的入队、领取、续租、按令牌的状态变更与结束函数
+from app.services.query_planner import QueryPlanner  # 导入查询计划器，保证同一查询每轮只抓取一次
+from app.services.summary_cache import summary_store  # 导入摘要缓存，同一篇论文只调用一次 LLM
+from app.services.email import SMTPMailer, send_email  # 导入发送邮件函数与复用连接的批量发送器，使用数据库或环境中的 SMTP 配置
+
+
+class DigestDeliveryError(RuntimeError):  # 定义邮件发送失败异常
+    """
+    邮件发送失败时抛出，推送任务据此安排重试
+    """
+
+
+def _prepare_digest(  # 定义内部工具函数，为单个用户准备日报内容（不发送、不写库）
+    db: Session,  # 数据库会话
+    user: User,  # 当前推送的用户
+    planner: QueryPlanner | None = None,  # 本轮共享的查询计划器
+    papers: list[dict] | None = None,  # 调用方已经取出的候选论文，为空时通过查询计划器获取
+    deadline: float | None = None,  # 单用户执行截止时间（time.monotonic() 时间戳），超过后不再发送
+) -> tuple[str, str, list[int]] | None:  # 返回 (邮件主题, 邮件正文, 论文主键列表)，没有论文可推送时返回 None
+    if papers is not None:  # 如果调用方已经取出了候选论文（执行者线程或进程）
+        all_papers = papers  # 直接使用传入的论文
+    else:  # 否则通过查询计划器获取
+        if planner is None:  # 如果调用方没有传入本轮共享的查询计划器（例如单用户测试推送）
+            planner = QueryPlanner(db)  # 为本次调用创建一个独立的查询计划器
+        all_papers = planner.papers_for_user(user)  # 从查询计划器中取出该用户所有关键词对应的论文，同一查询本轮只抓取一次
+        all_papers += pending_matches(db, [user.id]).get(user.id, [])  # 追加入库时路由给该用户、尚未推送的论文
+        paper_index.refresh(db)  # 把新入库的论文追加进论文向量索引
+        all_papers = rank_candidates(paper_index, [user], {user.id: all_papers})[user.id]  # 按与科研画像的相关性排序并截取前 K 篇
 
     if not all_papers:  # 如果所有关键词都没有抓取到论文
         print(f"No papers found for {user.email}")  # 打印提示信息
-        return False  # 返回 False 表示没有发送邮件
-
-    unique_papers = {p["url"]: p for p in all_papers}.values()  # 通过论文链接进行去重，保留唯一论文
-
-    email_content = "<h1>今日科研日报</h1>"  # 初始化邮件 HTML 内容头部
-    paper_ids = []  # 初始化用于保存论文 ID 列表的容器
-    for paper in unique_papers:  # 遍历每一篇唯一论文
-        summary = generate_summary(paper["abstract"])  # 使用 LLM 或 Mock 生成摘要
-        email_content += f"""
-        <div style="margin-bottom: 20px; border-bottom: 1px solid #ccc; padding-bottom: 10px;">
-            <h3><a href="{paper['url']}">{paper['title']}</a></h3>
-            <p><strong>作者:</strong> {', '.join(paper['authors'])}</p>
-            <p><strong>摘要:</strong> {summary}</p>
-            <p><strong>来源:</strong> {paper['source']} - {paper['published_date']}</p>
-        </div>
-        """  # 将论文卡片追加到邮件内容中
-        db_paper = (  # 构造查询以根据论文 URL 从数据库中查找对应记录
-            db.query(Paper)  # 从论文表中构造查询
-            .filter(Paper.url == paper["url"])  # 使用论文唯一 URL 作为匹配条件
-            .first()  # 只取第一条匹配记录
-        )  # 结束论文查询表达式
-        if db_paper is not None:  # 如果在数据库中找到了对应的论文记录
-            paper_ids.append(db_paper.id)  # 将论文主键 ID 写入列表以便记录到每日摘要中
-
-    if not send_email(  # 调用发送邮件函数，优先使用数据库中的 SMTP 配置
-        db,  # 传入数据库会话以便读取 SMTP 配置
-        user.email,  # 传入当前用户邮箱作为收件人
-        f"科研日报 - {len(list(unique_papers))} 篇新论文",  # 构造邮件主题，包含论文数量信息
-        email_content,  # 传入构造好的 HTML 邮件内容
-    ):  # 结束 send_email 参数列表
-        print(f"Failed to send email to {user.email}")  # 邮件发送失败时打印错误提示
-        return False  # 返回 False 表示发送失败
+        return None  # 返回 None 表示没有需要发送的邮件
+
+    unique_papers = list({p["url"]: p for p in all_papers}.values())  # 通过论文链接进行去重，保留唯一论文
+    summaries = summary_store.summarize_many(db, unique_papers)  # 批量获取摘要：优先复用缓存，未命中的部分并发调用 LLM
+    if deadline is not None and time.monotonic() > deadline:  # 如果在发送前已经超过单用户截止时间
+        raise TimeoutError(f"Digest for {user.email} exceeded {settings.DIGEST_USER_TIMEOUT}s")  # 放弃本次发送，由推送任务安排重试
+
+    email_content = digest_renderer.render_digest(unique_papers, summaries)  # 使用预编译模板渲染邮件，论文卡片片段跨用户复用
+    paper_ids = list(dict.fromkeys(paper["id"] for paper in unique_papers if paper.get("id") is not None))  # 收集查询计划器在入库时补充的论文主键（近似重复论文可能指向同一主键，按顺序去重），以便记录到每日摘要中
+    subject = f"科研日报 - {len(unique_papers)} 篇新论文"  # 构造邮件主题，包含论文数量信息
+    return subject, email_content, paper_ids  # 返回准备好的日报内容
 
+
+def _send_digest(db: Session, user: User, subject: str, email_content: str, mailer: SMTPMailer | None = None):  # 定义内部工具函数，发送一封日报邮件
+    if mailer is not None:  # 如果本轮提供了共享的邮件发送器
+        sent = mailer.send(user.email, subject, email_content)  # 复用已登录的 SMTP 连接发送
+    else:  # 否则（例如单用户测试推送）
+        sent = send_email(db, user.email, subject, email_content)  # 调用发送邮件函数，优先使用数据库中的 SMTP 配置
+    if not sent:  # 如果邮件发送失败
+        raise DigestDeliveryError(f"Failed to send email to {user.email}")  # 抛出发送失败异常，由调用方决定重试或提示
     print(f"Sent email to {user.email}")  # 邮件发送成功时打印提示
 
+
+def _record_digest(db: Session, user: User, paper_ids: list[int]) -> DailyDigest:  # 定义内部工具函数，写入已发送日报的推送记录
     digest = DailyDigest(  # 创建每日摘要记录对象
         user_id=user.id,  # 关联当前推送的用户 ID
         paper_ids=paper_ids or None,  # 将论文 ID 列表写入记录，若为空则存储为 None
     )  # 结束 DailyDigest 构造
     db.add(digest)  # 将每日摘要记录加入当前会话
+    db.flush()  # 刷新会话以获取记录主键，便于推送任务关联
+    record_digest_papers(db, digest, paper_ids)  # 按推送顺序写入日报论文关联
+    mark_matches_delivered(db, user.id, paper_ids, digest.id)  # 把本次推送包含的路由匹配标记为已推送，清理未入选的匹配
+    record_delivery(db, delivered=1, papers=len(paper_ids))  # 在同一事务内累加所在小时与所在天的推送量
+    return digest  # 返回新写入的每日摘要记录
+
+
+def _run_digest_for_user(  # 定义内部工具函数，用于对单个用户执行一次摘要推送（单用户测试推送使用，不经过推送任务）
+    db: Session,  # 数据库会话
+    user: User,  # 当前推送的用户
+    planner: QueryPlanner | None = None,  # 本轮共享的查询计划器
+    mailer: SMTPMailer | None = None,  # 本轮共享的邮件发送器，为空时单独建立连接发送
+    papers: list[dict] | None = None,  # 调用方已经取出的候选论文，为空时通过查询计划器获取
+    deadline: float | None = None,  # 单用户执行截止时间（time.monotonic() 时间戳），超过后不再发送
+) -> DailyDigest | None:  # 返回新写入的每日摘要记录，没有论文可推送时返回 None
+    prepared = _prepare_digest(db, user, planner=planner, papers=papers, deadline=deadline)  # 准备日报内容
+    if prepared is None:  # 如果没有论文可推送
+        return None  # 返回 None 表示没有发送邮件
+    subject, email_content, paper_ids = prepared  # 解包日报内容
+    _send_digest(db, user, subject, email_content, mailer=mailer)  # 发送邮件，失败时抛出 DigestDeliveryError
+    return _record_digest(db, user, paper_ids)  # 写入推送记录并返回
+
+
+_process_mailer: SMTPMailer | None = None  # 进程池执行者在各自进程内复用的邮件发送器
+
+
+def _init_worker_process():  # 定义进程池执行者的初始化函数
+    """
+    子进程不能复用父进程的数据库连接与 SMTP 连接：丢弃继承的连接池，并为本进程创建独立的邮件发送器，进程退出时关闭
+    """
+    global _process_mailer  # 声明修改模块级发送器
+    engine.dispose(close=False)  # 丢弃从父进程继承的连接（不关闭，避免影响父进程）
+    db = SessionLocal()  # 创建会话以读取 SMTP 配置
+    try:  # 保证会话被关闭
+        _process_mailer = SMTPMailer.from_db(db, pool_size=1)  # 每个进程同一时刻只发送一封邮件
+        multiprocessing.util.Finalize(None, _process_mailer.close, exitpriority=10)  # 子进程退出时关闭本进程的 SMTP 连接（进程池子进程不会执行 atexit 注册的函数）
+    finally:  # 无论成功与否
+        db.close()  # 关闭会话
+
+
+def _deliver_job(job_id: int, token: str, papers: list[dict] | None, mailer: SMTPMailer | None = None) -> str:  # 定义执行者函数，在独立会话中执行单个推送任务
+    """
+    执行者线程或进程的工作单元：使用独立会话加载任务与用户，执行推送并逐个用户提交。
+    调度者等待超时后执行者可能仍在运行，而任务可能已被其他执行者接管，因此每次状态变化都按领取令牌条件更新：
+    发送前确认仍持有任务（running -> sending），发送成功后立即标记为 done，再写入推送记录等簿记，
+    簿记失败只记录错误，不会让同一封邮件再次发送
+    :param token: 领取该任务时的批次令牌，任务已被回收给其他执行者时直接放弃
+    :param papers: 调度者为该用户取出的候选论文，为 None 表示该用户无需推送
+    :return: 任务结束状态
+    """
+    deadline = time.monotonic() + settings.DIGEST_USER_TIMEOUT  # 计算单用户截止时间
+    db = SessionLocal(expire_on_commit=False)  # 每个执行者使用独立的数据库会话
+    try:  # 保证会话被关闭
+        job = db.get(DigestJob, job_id)  # 加载推送任务
+        if job is None or not renew_lease(db, job, token, datetime.utcnow()):  # 任务已被删除或已被回收给其他执行者；仍持有时从现在起续租
+            return "lost"  # 放弃执行
+        user = (  # 加载任务对应的用户并预加载科研画像
+            db.query(User)  # 从用户表中查询
+            .options(joinedload(User.profile))  # 预加载科研画像
+            .filter(User.id == job.user_id)  # 按主键过滤
+            .first()  # 获取单个用户
+        )  # 结束查询表达式
+        prepared = None  # 准备好的日报内容
+        if user is not None and papers is not None:  # 用户仍需推送
+            try:  # 准备阶段失败（例如总结超时）可以安全重试
+                prepared = _prepare_digest(db, user, papers=papers, deadline=deadline)  # 排序、总结并渲染日报
+            except Exception as exc:  # 捕获超时等异常
+                return _fail(db, job, token, exc)  # 记录失败并安排重试
+        if prepared is None:  # 用户已被删除、停用、关闭订阅，或没有论文可推送
+            finish_job(db, job, token)  # 按领取令牌标记为跳过
+            db.commit()  # 提交任务状态
+            return job.status  # 返回任务结束状态
+
+        if not start_sending(db, job, token, datetime.utcnow()):  # 发送前确认任务仍由本执行者持有
+            print(f"Digest job {job_id} was reclaimed by another worker; not sending")  # 打印放弃提示
+            return "lost"  # 任务已被接管，不得发送
+        subject, email_content, paper_ids = prepared  # 解包日报内容
+        try:  # 发送失败时可以安全重试
+            _send_digest(db, user, subject, email_content, mailer=mailer or _process_mailer)  # 发送邮件
+        except Exception as exc:  # 发送明确失败
+            return _fail(db, job, token, exc)  # 记录失败并安排重试
+        mark_sent(db, job, token)  # 邮件已发出：先标记为 done 并提交，之后的任何失败都不会导致重复发送
+
+        try:  # 发送后的簿记
+            digest = _record_digest(db, user, paper_ids)  # 写入推送记录、日报论文关联、路由匹配与推送量
+            finish_job(db, job, token, digest)  # 按领取令牌关联推送记录并释放令牌
+            db.commit()  # 提交簿记
+        except Exception as exc:  # 簿记失败：邮件已发出，只记录错误
+            db.rollback()  # 回滚未完成的簿记
+            print(f"Digest job {job_id} for {user.email} sent but bookkeeping failed: {exc}")  # 打印失败信息
+            transition_job(db, job.id, token, JOB_DONE, {"last_error": f"Sent, bookkeeping failed: {type(exc).__name__}: {exc}"[:2000], "locked_by": None})  # 记录错误并释放令牌
+            db.commit()  # 提交错误信息
+        return job.status  # 返回任务结束状态
+    finally:  # 无论成功与否
+        db.close()  # 关闭执行者的数据库会话
+
+
+def _fail(db: Session, job: DigestJob, token: str, exc: Exception) -> str:  # 定义内部工具函数，记录一次尚未发出邮件的失败
+    db.rollback()  # 回滚该用户未提交的改动
+    print(f"Digest job {job.id} failed: {exc}")  # 打印失败信息
+    if fail_job(db, job, token, f"{type(exc).__name__}: {exc}", datetime.utcnow()):  # 按领取令牌记录失败并安排重试
+        record_delivery(db, failed=1)  # 累加所在小时与所在天的失败次数
+    db.commit()  # 提交任务状态
+    return job.status  # 返回任务结束状态
+
+
+def _create_executor(mode: str, workers: int):  # 定义执行器工厂函数
+    if mode == "process":  # 进程池：LLM 与模板渲染等 CPU 密集部分不受 GIL 限制
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_process)  # 每个子进程使用独立的连接池与发送器
+    if mode == "thread":  # 线程池：适合以网络等待为主的默认场景
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="digest-worker")  # 创建线程池
+    raise ValueError(f"Unknown DIGEST_EXECUTOR: {mode!r}")  # 不支持的执行器类型
+
+
+def _shutdown_executor(executor, mailer: SMTPMailer | None, wait: bool):  # 定义工具函数，先关闭执行器再关闭与其绑定的邮件发送器
+    """
+    取消尚未开始的任务，等待仍在运行的执行者结束后再关闭发送器，避免关闭超时执行者仍在使用的 SMTP 连接；
+    不等待时由后台线程完成关闭，调度者不会被超时的执行者阻塞
+    """
+    def close():  # 定义关闭流程
+        executor.shutdown(wait=True, cancel_futures=True)  # 取消排队中的任务并等待执行者结束
+        if mailer is not None:  # 线程模式下的共享发送器
+            mailer.close()  # 执行者都已结束，关闭所有 SMTP 连接
 
-    return True  # 返回 True 表示发送成功并写入了记录
+    if wait:  # 没有超时的执行者时
+        close()  # 直接在当前线程关闭
+    else:  # 存在超时的执行者时
+        threading.Thread(target=close, name="digest-executor-shutdown", daemon=True).start()  # 在后台线程中等待并关闭
 
 
-def run_digest():  # 定义运行每日科研摘要投递的主函数
-    db = SessionLocal()  # 创建数据库会话对象，用于查询用户与保存论文
-    now = datetime.now()  # 获取当前服务器本地时间，用于与用户配置的本地推送时间进行比对
-    current_hour = now.hour  # 读取当前小时数，用于匹配用户配置的推送时间
-    current_minute = now.minute  # 读取当前分钟数，用于精确到分钟匹配用户配置的推送时间
+def drain_jobs(db: Session, workers: int | None = None, mode: str | None = None) -> dict:  # 定义执行阶段函数，持续领取并执行推送任务直到队列中没有可执行任务
+    """
+    分批领取推送任务：调度者在主会话中汇总抓取与总结，再把每个用户的渲染、发送与记录分发给执行者线程或进程，
+    执行者各自使用独立会话并逐个用户提交，单个用户变慢不会阻塞其他用户。
+    每批最多领取 workers 个任务，领取的任务都能立即开始执行，不会在排队等待期间租约过期而白白消耗尝试次数
+    :param workers: 执行者数量，默认读取 DIGEST_WORKERS
+    :param mode: 执行器类型 thread 或 process，默认读取 DIGEST_EXECUTOR
+    :return: 各结束状态的任务数量
+    """
+    workers = workers or settings.DIGEST_WORKERS  # 确定执行者数量
+    mode = mode or settings.DIGEST_EXECUTOR  # 确定执行器类型
+    planner = QueryPlanner(db)  # 创建本轮共享的查询计划器，跨批次复用已抓取的查询
+    counts: dict[str, int] = {}  # 各结束状态的任务计数
+    started = time.monotonic()  # 记录执行阶段开始时间
+    retired = retire_stale_matches(db, datetime.utcnow())  # 清理超过有效期仍未推送的路由匹配
+    db.commit()  # 提交清理结果
+    if retired:  # 如果清理了任意匹配
+        print(f"Retired {retired} stale paper matches.")  # 打印清理数量
 
-    users = (  # 构造查询以获取所有需要推送的订阅用户
-        db.query(User)  # 从用户表中查询
-        .filter(User.is_active == True, User.subscription_enabled == True)  # 仅选择活跃且开启订阅的用户
-        .all()  # 执行查询并返回列表
-    )  # 结束查询表达式
+    executor = _create_executor(mode, workers)  # 创建执行器
+    mailer = SMTPMailer.from_db(db, pool_size=workers) if mode == "thread" else None  # 线程模式下所有执行者共享一个发送器；进程模式下由各子进程使用自己的发送器，父进程不建立连接
+    try:  # 保证异常时也能关闭执行器与发送器
+        while True:  # 循环领取直到没有可执行任务
+            jobs = claim_jobs(db, datetime.utcnow(), limit=min(workers, settings.DIGEST_JOB_BATCH_SIZE))  # 每批最多领取执行者数量的任务，领取的任务都能立即开始执行，不会在排队期间租约过期
+            if not jobs:  # 如果没有可执行任务
+                break  # 结束执行阶段
 
-    print(f"Found {len(users)} active subscribers.")  # 打印当前订阅用户数量，便于运行时观察
+            users = {  # 一次查询加载本批任务对应的用户，并预加载科研画像
+                user.id: user  # 用户主键到用户对象的映射
+                for user in db.query(User)  # 从用户表中查询
+                .options(joinedload(User.profile))  # 预加载科研画像，避免逐个用户懒加载产生额外查询
+                .filter(User.id.in_([job.user_id for job in jobs]))  # 只加载本批任务的用户
+            }  # 结束用户映射
+            active = {  # 本批仍需推送的用户（入队后可能已关闭订阅）
+                user.id: user  # 用户主键到用户对象的映射
+                for user in users.values()  # 遍历本批用户
+                if user.is_active and user.subscription_enabled  # 用户活跃且仍开启订阅
+            }  # 结束用户映射
+            ranked: dict = {}  # 用户主键到排序后论文列表的映射
+            if active:  # 如果本批存在需要推送的用户
+                queries = planner.plan(list(active.values()))  # 汇总本批用户关键词的并集
+                print(f"Planned {len(queries)} distinct queries for {len(active)} due users.")  # 打印本批查询计划概况
+                planner.prefetch(queries)  # 准备本批查询的结果集：本地模式只读取后台入库任务维护的最近论文，否则并发抓取（新论文在入库时同步路由）
+                matched = pending_matches(db, list(active))  # 一次查询加载本批用户尚未推送的路由匹配
+                candidates = {  # 每个用户的候选论文：查询结果与路由匹配
+                    user_id: planner.papers_for_user(user) + matched.get(user_id, [])  # 合并两类候选
+                    for user_id, user in active.items()  # 遍历本批需要推送的用户
+                }  # 结束候选映射
+                candidates = exclude_delivered(db, candidates)  # 一次批量查询去掉各用户已经收到过的论文，避免跨天重复推送
+                paper_index.refresh(db)  # 把新入库的论文追加进论文向量索引
+                ranked = rank_candidates(paper_index, list(active.values()), candidates)  # 一次矩阵乘法为本批所有用户排序并截取前 K 篇
+                summary_store.summarize_many(  # 只把最终入选的论文作为一批并发总结，执行者渲染时直接命中缓存
+                    db, list({paper["url"]: paper for papers in ranked.values() for paper in papers}.values())  # 按链接去重后的入选论文
+                )  # 结束批量总结
 
-    for user in users:  # 遍历每一个订阅用户
-        if user.digest_time:  # 如果用户已经配置了具体推送时间
-            try:  # 使用 try 块解析用户配置的时间字符串
-                time_str = user.digest_time.strip()  # 去除时间字符串两端可能存在的空白字符
-                hour_part, minute_part = time_str.split(":", 1)  # 按冒号分割时间字符串为小时和分钟部分
-                hour_value = int(hour_part)  # 将小时部分转换为整数
-                minute_value = int(minute_part)  # 将分钟部分转换为整数
-            except Exception:  # 捕获解析过程中的所有异常
-                print(  # 打印错误配置提醒，便于在终端中观察到具体异常配置
-                    f"Invalid digest_time format for user {user.email}: {user.digest_time}"  # 提示用户的 digest_time 配置不符合预期格式 HH:MM
-                )  # 结束错误日志打印
-                continue  # 跳过配置异常的用户以避免错误中断脚本
+            futures = {  # 把本批任务分发给执行者
+                executor.submit(  # 提交单个任务
+                    _deliver_job,  # 执行者函数
+                    job.id,  # 任务主键
+                    job.locked_by,  # 领取令牌
+                    ranked.get(job.user_id) if job.user_id in active else None,  # 调度者排序后的论文，执行者无需访问查询计划器；无需推送的用户传入 None
+                    mailer,  # 线程模式下共享的邮件发送器，进程模式下为 None
+                ): job  # 记录 future 对应的任务
+                for job in jobs  # 遍历本批任务
+            }  # 结束任务分发
+            timeout = settings.DIGEST_USER_TIMEOUT + 30  # 本批最长等待时间：每个执行者只处理一个任务，另留 30 秒余量
+            done, not_done = wait(futures, timeout=timeout)  # 等待本批任务结束
+            for future in done:  # 遍历已结束的任务
+                try:  # 执行者进程异常退出等情况
+                    status = future.result()  # 读取任务结束状态
+                except Exception as exc:  # 执行者本身失败，任务保持 running，由租约超时回收
+                    print(f"Digest job {futures[future].id} worker crashed: {exc}")  # 打印失败信息
+                    status = "crashed"  # 记为执行者失败
+                counts[status] = counts.get(status, 0) + 1  # 累计结束状态
+            for future in not_done:  # 遍历超时未结束的任务，保持 running，由租约超时回收
+                print(f"Digest job {futures[future].id} timed out after {timeout}s")  # 打印超时信息
+                counts["timeout"] = counts.get("timeout", 0) + 1  # 累计超时数量
+            db.expire_all()  # 任务状态由执行者在各自会话中更新，丢弃主会话中的旧状态
+    finally:  # 无论成功与否
+        _shutdown_executor(executor, mailer, wait=not counts.get("timeout"))  # 先关闭执行器再关闭发送器；存在超时的执行者时不再等待，避免阻塞下一轮调度
 
-            if hour_value != current_hour or minute_value != current_minute:  # 如果用户配置的小时或分钟与当前时间不一致
-                continue  # 跳过暂未到达精确推送时间的用户
+    elapsed = time.monotonic() - started  # 计算执行阶段耗时
+    total = sum(counts.values())  # 统计本轮处理的任务数量
+    if total:  # 如果本轮执行了任意任务
+        print(f"Query planner: {planner.report()}")  # 打印本轮查询缓存命中率等统计信息
+        print(f"Summary cache: {summary_store.stats()}")  # 打印摘要缓存的命中统计
+        if mailer is not None:  # 进程模式下各子进程的渲染与发送统计不在父进程中
+            print(f"Renderer: {digest_renderer.stats()}")  # 打印论文卡片片段缓存的命中统计
+            print(f"Mailer: {mailer.sent} sent, {mailer.failed} failed")  # 打印本轮邮件发送统计
+        print(  # 打印本轮吞吐量
+            f"Executor: {total} users in {elapsed:.1f}s ({total / elapsed:.2f} users/s) "  # 处理用户数量、耗时与每秒用户数
+            f"with {workers} {mode} workers"  # 执行器类型与数量
+        )  # 结束吞吐量打印
+    return counts  # 返回各结束状态的任务数量
 
-        _run_digest_for_user(db, user)  # 为当前用户执行一次摘要推送与记录写入
 
-    db.commit()  # 提交所有新增的每日摘要记录
-    db.close()  # 关闭数据库会话，释放连接资源
+def run_digest(enqueue: bool = True, drain: bool = True, workers: int | None = None, mode: str | None = None):  # 定义运行每日科研摘要投递的主函数
+    """
+    先把到期用户幂等地写入推送任务队列，再执行队列中所有可执行任务
+    :param enqueue: 是否执行入队阶段
+    :param drain: 是否执行执行阶段
+    :param workers: 执行者数量，默认读取 DIGEST_WORKERS
+    :param mode: 执行器类型 thread 或 process，默认读取 DIGEST_EXECUTOR
+    """
+    db = SessionLocal(expire_on_commit=False)  # 创建数据库会话对象；本轮中途会多次提交，关闭提交后过期以免逐个用户重新加载
+    try:  # 保证异常时也能关闭会话
+        if enqueue:  # 如果需要执行入队阶段
+            due = enqueue_due_jobs(db, datetime.utcnow())  # 为到期用户记录推送任务并推进下一次推送时间
+            print(f"Enqueued digest jobs for {due} due subscribers.")  # 打印本轮到期的订阅用户数量，便于运行时观察
+        if drain:  # 如果需要执行执行阶段
+            counts = drain_jobs(db, workers=workers, mode=mode)  # 执行队列中所有可执行任务
+            if counts:  # 如果执行了任意任务
+                print(f"Digest jobs: {counts}")  # 打印各结束状态的任务数量
+    finally:  # 无论成功与否
+        db.close()  # 关闭数据库会话，释放连接资源
 
 
 if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
-    run_digest()  # 调用 run_digest 函数执行每日摘要推送
+    parser = argparse.ArgumentParser(description="Enqueue due digest jobs and drain the digest job queue")  # 创建命令行参数解析器
+    group = parser.add_mutually_exclusive_group()  # 入队与执行阶段可以单独运行
+    group.add_argument("--enqueue-only", action="store_true", help="only record due jobs, do not send")  # 只执行入队阶段
+    group.add_argument("--drain-only", action="store_true", help="only execute queued jobs")  # 只执行执行阶段
+    parser.add_argument("--workers", type=int, default=None, help="number of delivery workers (default: DIGEST_WORKERS)")  # 执行者数量
+    parser.add_argument("--executor", choices=["thread", "process"], default=None, help="worker type (default: DIGEST_EXECUTOR)")  # 执行器类型
+    args = parser.parse_args()  # 解析命令行参数
+    run_digest(enqueue=not args.drain_only, drain=not args.enqueue_only, workers=args.workers, mode=args.executor)  # 调用 run_digest 函数执行每日摘要推送
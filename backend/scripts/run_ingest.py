@@ -0,0 +1,49 @@
+import argparse  # 导入 argparse 用于解析命令行参数
+import sys  # 导入 sys 模块以便修改模块搜索路径
+import os  # 导入 os 模块以便处理文件系统路径
+
+# 获取当前脚本所在目录的上一级目录（backend 目录）
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 计算 backend 目录的绝对路径
+sys.path.append(BASE_DIR)  # 将 backend 目录添加到模块搜索路径，便于脚本独立运行
+
+import time  # 导入 time 用于统计执行耗时
+from sqlalchemy.orm import joinedload  # 导入 joinedload 用于预加载科研画像
+from app.core.config import settings  # 导入全局配置对象，读取每个查询每轮最多抓取的论文数量
+from app.db.session import SessionLocal  # 导入 SessionLocal 工厂用于创建会话
+from app.db import base  # noqa: F401  导入全部模型以便正确注册关系映射
+from app.models.user import User  # 导入用户模型以查询订阅用户
+from app.services.query_planner import QueryPlanner  # 导入查询计划器，汇总订阅查询并推进抓取水位线
+
+
+def run_ingest(max_per_query: int | None = None) -> int:  # 定义后台预抓取的主函数
+    """
+    预抓取阶段：汇总所有开启订阅的活跃用户的关键词，并发抓取每个查询水位线之后的新论文写入论文库，
+    新论文在入库时完成去重、全文索引与订阅路由。日报投递阶段只读取本地数据，不再等待网络
+    :param max_per_query: 每个查询本轮最多抓取的新论文数量，默认读取 INGEST_MAX_PER_QUERY
+    :return: 本轮抓取的查询数量
+    """
+    db = SessionLocal(expire_on_commit=False)  # 创建数据库会话对象；入库过程中会多次提交
+    try:  # 保证异常时也能关闭会话
+        users = (  # 查询所有需要推送的用户
+            db.query(User)  # 构建用户查询
+            .options(joinedload(User.profile))  # 预加载科研画像，避免逐个用户查询关键词
+            .filter(User.is_active == True, User.subscription_enabled == True)  # 只保留活跃且开启订阅的用户
+            .all()  # 执行查询
+        )  # 结束用户查询
+        planner = QueryPlanner(db, local=False)  # 创建访问网络的查询计划器
+        queries = planner.plan(users)  # 汇总所有订阅用户关键词的并集
+        if not queries:  # 如果没有任何订阅查询
+            return 0  # 直接返回
+        started = time.monotonic()  # 记录抓取开始时间
+        planner.ingest(queries, max_total=max_per_query or settings.INGEST_MAX_PER_QUERY)  # 并发抓取全部查询的新论文并推进水位线
+        print(f"Ingested {len(queries)} queries for {len(users)} subscribers in {time.monotonic() - started:.1f}s")  # 打印本轮预抓取统计
+        return len(queries)  # 返回本轮抓取的查询数量
+    finally:  # 无论成功与否
+        db.close()  # 关闭数据库会话，释放连接资源
+
+
+if __name__ == "__main__":  # 当脚本被直接执行时进入入口逻辑
+    parser = argparse.ArgumentParser(description="Crawl new papers for all subscribed queries ahead of digest delivery")  # 创建命令行参数解析器
+    parser.add_argument("--max-per-query", type=int, default=None, help="new papers per query per run (default: INGEST_MAX_PER_QUERY)")  # 每个查询每轮最多抓取的论文数量
+    args = parser.parse_args()  # 解析命令行参数
+    run_ingest(max_per_query=args.max_per_query)  # 执行一轮预抓取
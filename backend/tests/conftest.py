@@ -0,0 +1,302 @@
+"""
+测试公共配置：在导入应用之前把数据库、论文向量索引指向临时目录，关闭外部服务并降低 bcrypt 成本；
+同时提供本地的 arXiv Atom 固定响应服务器、兼容 DeepSeek 接口的假 LLM 服务与 SMTP 收件服务
+"""
+import json
+import os
+import socketserver
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+_workdir = tempfile.mkdtemp(prefix="scipulse-tests-")
+os.environ.update({
+    "USE_SQLITE": "true",
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "1",
+    "RANKING_INDEX_DIR": os.path.join(_workdir, "ranking"),
+    "ARXIV_REQUEST_INTERVAL": "0.01",
+    # 显式置空，避免 .env 中的配置让测试访问真实服务
+    "DEEPSEEK_API_KEY": "",
+    "SMTP_HOST": "",
+})
+# SQLite 数据库使用相对路径 ./sql_app.db，必须在导入应用之前切换工作目录
+os.chdir(_workdir)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.verification_code import VerificationCode  # noqa: E402
+from app.services import search  # noqa: E402
+from app.services.digest_detail_cache import digest_detail_cache  # noqa: E402
+from app.services.user_cache import user_cache  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """
+    每个测试使用重新建表的空数据库，并清空按主键缓存的进程内缓存（主键在新表中会被复用）
+    """
+    digest_detail_cache.clear()
+    user_cache.clear()
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {search.FTS_TABLE}"))
+    search._ready.clear()
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    # 不进入 with 语句，不触发启动事件中的后台任务
+    return TestClient(app)
+
+
+@pytest.fixture
+def signup(client, db):
+    """
+    通过验证码注册并登录一个用户，返回带访问令牌的请求头
+    """
+
+    def register(email: str, password: str = "s3cret") -> dict:
+        client.post("/api/v1/send-register-code", json={"email": email})
+        code = db.query(VerificationCode.code).filter(VerificationCode.email == email).scalar()
+        response = client.post("/api/v1/register-with-code", json={"email": email, "password": password, "code": code})
+        assert response.status_code == 200, response.text
+        token = client.post("/api/v1/login/access-token", data={"username": email, "password": password})
+        return {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+    return register
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_paper(number: int, published: datetime | None = None) -> dict:
+    """
+    构造一条 arXiv 论文记录，编号越大发布时间越新
+    """
+    return {
+        "id": f"http://arxiv.org/abs/2601.{number:05d}v1",
+        "title": f"Paper {number} on topic{number} and method{number * 7}",
+        "summary": f"We study problem{number} with approach{number * 13} and dataset{number * 31}.",
+        "published": published or datetime(2026, 1, 1) + timedelta(hours=number),
+        "authors": [f"Author {number}"],
+        "categories": ["cs.AI"],
+    }
+
+
+def atom_feed(entries: list) -> bytes:
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>', '<feed xmlns="http://www.w3.org/2005/Atom">']
+    for entry in entries:
+        parts.append("<entry>")
+        parts.append(f"<id>{escape(entry['id'])}</id>")
+        parts.append(f"<title>{escape(entry['title'])}</title>")
+        parts.append(f"<summary>{escape(entry['summary'])}</summary>")
+        parts.append(f"<published>{entry['published'].strftime('%Y-%m-%dT%H:%M:%SZ')}</published>")
+        parts.extend(f"<author><name>{escape(name)}</name></author>" for name in entry["authors"])
+        parts.extend(f'<category term="{escape(term)}"/>' for term in entry["categories"])
+        parts.append("</entry>")
+    parts.append("</feed>")
+    return "".join(parts).encode("utf-8")
+
+
+class AtomServer:
+    """
+    arXiv 查询接口的固定响应服务器：按发布时间倒序返回 feed 中 [start, start + max_results) 的记录
+    """
+
+    def __init__(self):
+        self.feed: list = []
+        self.requests: list = []
+        self.fail_next = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                server.requests.append(params)
+                if server.fail_next:
+                    server.fail_next -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                start, limit = int(params.get("start", 0)), int(params.get("max_results", 10))
+                ordered = sorted(server.feed, key=lambda entry: entry["published"], reverse=True)
+                body = atom_feed(ordered[start:start + limit])
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _serve(ThreadingHTTPServer(("127.0.0.1", 0), Handler))
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/api/query"
+
+    def publish(self, *numbers: int):
+        self.feed.extend(make_paper(number) for number in numbers)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeLLMServer:
+    """
+    兼容 DeepSeek /chat/completions 的假 LLM 服务；statuses 中的状态码依次用于前几次请求
+    """
+
+    def __init__(self):
+        self.requests: list = []
+        self.statuses: list = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(payload)
+                status = server.statuses.pop(0) if server.statuses else 200
+                if status != 200:
+                    body = b"{}"
+                    self.send_response(status)
+                    self.send_header("Retry-After", "0.01")
+                else:
+                    text_in = payload["messages"][-1]["content"]
+                    body = json.dumps({"choices": [{"message": {"content": f"SUMMARY: {text_in}"}}]}).encode("utf-8")
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _serve(ThreadingHTTPServer(("127.0.0.1", 0), Handler))
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SMTPSink:
+    """
+    最小的 SMTP 收件服务：收件人以 reject 开头时返回 550，drop_after 封邮件后服务端直接断开连接
+    """
+
+    def __init__(self):
+        self.messages: list = []
+        self.connections = 0
+        self.commands: list = []
+        self.drop_after = None
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+            def handle(self):
+                sink.connections += 1
+                sent_here = 0
+                self.reply("220 sink ready")
+                envelope: dict = {}
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("utf-8", "replace").strip()
+                    verb = command.split(" ", 1)[0].upper().rstrip(":")
+                    sink.commands.append(verb)
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250 sink")
+                    elif verb == "MAIL":
+                        envelope = {"from": command, "to": []}
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        if "<reject" in command.lower():
+                            self.reply("550 mailbox unavailable")
+                        else:
+                            envelope.setdefault("to", []).append(command)
+                            self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 end with .")
+                        data = []
+                        while True:
+                            chunk = self.rfile.readline()
+                            if not chunk or chunk in (b".\r\n", b".\n"):
+                                break
+                            data.append(chunk)
+                        sink.messages.append(dict(envelope, data=b"".join(data)))
+                        sent_here += 1
+                        self.reply("250 queued")
+                        if sink.drop_after is not None and sent_here >= sink.drop_after:
+                            return
+                    elif verb in ("RSET", "NOOP"):
+                        envelope = {}
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:
+                        self.reply("502 not implemented")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = _serve(Server(("127.0.0.1", 0), Handler))
+        self.port = self._server.server_address[1]
+
+    def settings(self) -> dict:
+        return {
+            "host": "127.0.0.1",
+            "port": self.port,
+            "tls": False,
+            "user": "",
+            "password": "",
+            "from_email": "digest@example.com",
+            "from_name": "digest",
+        }
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def atom_server():
+    server = AtomServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def llm_server():
+    server = FakeLLMServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink()
+    yield sink
+    sink.close()
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from app.models.admin_stats import AdminStats
+from app.models.user import User
+from app.services.admin_stats import STATS_ID, admin_stats
+from app.services.delivery_rollups import record_delivery
+from scripts.run_daily_digest import _record_digest
+
+
+def overview(client) -> dict:
+    admin_stats.clear()
+    return client.get("/api/v1/admin/overview").json()
+
+
+def test_counters_follow_register_toggle_and_profile(client, db, signup):
+    headers = signup("a@example.com")
+    # 统计行在首次注册的事务内创建，而不是等到首次读取
+    assert db.get(AdminStats, STATS_ID).total_users == 1
+    signup("b@example.com")
+    assert overview(client) == {
+        "total_users": 2, "active_users": 2, "subscribed_users": 2, "total_profiles": 0, "daily_emails": 0,
+    }
+    client.post("/api/v1/users/me/subscription-toggle", headers=headers)
+    client.post("/api/v1/users/me/profile", headers=headers, json={"disciplines": [], "keywords": ["graphs"], "journal_preferences": []})
+    stats = overview(client)
+    assert stats["subscribed_users"] == 1
+    assert stats["total_profiles"] == 1
+
+
+def test_daily_emails_come_from_rollups(client, db):
+    user = User(email="a@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    _record_digest(db, user, [])
+    _record_digest(db, user, [])
+    record_delivery(db, at=datetime.utcnow() - timedelta(days=2), delivered=5)
+    db.commit()
+    assert overview(client)["daily_emails"] == 2
+
+
+def test_rebuild_repairs_drifted_counters(client, db, signup):
+    signup("a@example.com")
+    admin_stats.increment(db, total_users=10, subscribed_users=-1)
+    db.commit()
+    assert overview(client)["total_users"] == 11
+    admin_stats.rebuild(db)
+    db.commit()
+    stats = overview(client)
+    assert (stats["total_users"], stats["subscribed_users"]) == (1, 1)
@@ -0,0 +1,45 @@
+from passlib.context import CryptContext
+from app.models.user import User
+from app.models.verification_code import VerificationCode
+
+
+def register(client, db, email: str, password: str):
+    assert client.post("/api/v1/send-register-code", json={"email": email}).status_code == 200
+    code = db.query(VerificationCode.code).filter(VerificationCode.email == email).scalar()
+    return client.post("/api/v1/register-with-code", json={"email": email, "password": password, "code": code})
+
+
+def login(client, email: str, password: str):
+    return client.post("/api/v1/login/access-token", data={"username": email, "password": password})
+
+
+def test_register_and_login(client, db):
+    assert register(client, db, "a@example.com", "s3cret").status_code == 200
+    response = login(client, "a@example.com", "s3cret")
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    me = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.json()["email"] == "a@example.com"
+
+
+def test_login_rejects_wrong_password(client, db):
+    register(client, db, "a@example.com", "s3cret")
+    assert login(client, "a@example.com", "wrong").status_code == 400
+    assert login(client, "nobody@example.com", "s3cret").status_code == 400
+
+
+def test_register_rejects_wrong_code(client, db):
+    client.post("/api/v1/send-register-code", json={"email": "a@example.com"})
+    response = client.post("/api/v1/register-with-code", json={"email": "a@example.com", "password": "p", "code": "x"})
+    assert response.status_code == 400
+
+
+def test_login_rehashes_password_with_outdated_cost(client, db):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("s3cret")
+    db.add(User(email="old@example.com", hashed_password=old_hash))
+    db.commit()
+    assert login(client, "old@example.com", "s3cret").status_code == 200
+    db.expire_all()
+    new_hash = db.query(User.hashed_password).filter(User.email == "old@example.com").scalar()
+    assert new_hash != old_hash
+    assert new_hash.startswith("$2b$04$")
@@ -0,0 +1,125 @@
+from datetime import datetime
+import pytest
+from app.models.crawl_state import CrawlState
+from app.models.paper import Paper
+from app.services import sources
+from app.services.crawler import ArxivCrawler, get_default_crawler, save_papers_to_db, upsert_papers
+from app.services.query_planner import QueryPlanner
+from app.services.rate_limiter import TokenBucket
+
+
+def crawler_for(server, **kwargs) -> ArxivCrawler:
+    return ArxivCrawler(base_url=server.url, limiter=TokenBucket(rate=1000), **kwargs)
+
+
+@pytest.fixture
+def arxiv_source(atom_server):
+    """
+    让入库引擎使用指向固定响应服务器的 arXiv 适配器
+    """
+    sources.register_source(ArxivCrawler.name, lambda: crawler_for(atom_server, page_size=3))
+    yield atom_server
+    sources.register_source(ArxivCrawler.name, get_default_crawler)
+
+
+def ingest(db, query: str = "cat:cs.AI") -> list:
+    papers = QueryPlanner(db, max_results=3, local=False).ingest([query])[query]
+    return [int(p["title"].split()[1]) for p in papers]
+
+
+def local_numbers(db, query: str = "cat:cs.AI") -> list:
+    papers = QueryPlanner(db, max_results=3, local=True)._load_local([query])[query]
+    return [int(p["title"].split()[1]) for p in papers]
+
+
+def test_iter_query_pages_through_results(atom_server):
+    atom_server.publish(*range(1, 8))
+    papers = list(crawler_for(atom_server).iter_query("cat:cs.AI", page_size=3))
+    assert [p["url"].rsplit(".", 1)[-1] for p in papers] == [f"{n:05d}v1" for n in range(7, 0, -1)]
+    assert [int(r["start"]) for r in atom_server.requests] == [0, 3, 6]
+    assert papers[0]["categories"] == ["cs.AI"]
+    assert papers[0]["authors"] == ["Author 7"]
+
+
+def test_iter_query_stops_at_watermark(atom_server):
+    atom_server.publish(*range(1, 10))
+    crawler = crawler_for(atom_server)
+    seen = list(crawler.iter_query("cat:cs.AI", page_size=3, max_total=4))
+    newest = seen[0]
+    atom_server.publish(10, 11)
+    since = (newest["published_date"], crawler.source_id(newest["url"]))
+    fresh = list(crawler.iter_query("cat:cs.AI", page_size=3, since=since))
+    assert [crawler.source_id(p["url"]) for p in fresh] == ["2601.00011", "2601.00010"]
+
+
+def test_request_retries_after_server_error(atom_server):
+    atom_server.publish(1, 2)
+    atom_server.fail_next = 1
+    papers = crawler_for(atom_server, max_retries=2).fetch("cat:cs.AI", max_results=5)
+    assert len(papers) == 2
+    assert len(atom_server.requests) == 2
+
+
+def test_ingest_resumes_instead_of_skipping_past_max_total(db, arxiv_source):
+    arxiv_source.publish(*range(1, 6))
+    assert ingest(db) == [5, 4, 3]
+    state = db.query(CrawlState).one()
+    assert state.last_arxiv_id == "2601.00005"
+    assert state.resume_offset is None
+
+    # 水位线之后发布的新论文超过上限：不推进水位线，而是记录继续抓取的位置
+    arxiv_source.publish(*range(6, 11))
+    assert ingest(db) == [10, 9, 8]
+    db.refresh(state)
+    assert state.last_arxiv_id == "2601.00005"
+    assert state.resume_offset == 3
+
+    assert ingest(db) == [7, 6]
+    db.refresh(state)
+    assert state.resume_offset is None
+    assert state.last_arxiv_id == "2601.00010"
+    assert db.query(Paper).count() == 8
+    # 继续抓取得到的较早论文不会挤掉本地模式读取的最新论文
+    assert local_numbers(db) == [10, 9, 8]
+
+
+def test_first_crawl_of_long_feed_sets_watermark_and_returns_only_new_papers(db, arxiv_source):
+    arxiv_source.publish(*range(1, 31))
+    assert ingest(db) == [30, 29, 28]
+    assert db.query(CrawlState.last_arxiv_id).scalar() == "2601.00030"
+    assert ingest(db) == []
+    arxiv_source.publish(31, 32)
+    assert ingest(db) == [32, 31]
+    # 历史论文不会被回溯抓取
+    assert db.query(Paper).count() == 5
+    assert local_numbers(db) == [32, 31, 30]
+
+
+def stored_paper(number: int, **overrides) -> dict:
+    return {
+        "title": f"Paper {number} on topic{number} and method{number * 7}",
+        "abstract": f"We study problem{number} with approach{number * 13} and dataset{number * 31}.",
+        "url": f"http://arxiv.org/abs/2601.{number:05d}v1",
+        "published_date": datetime(2026, 1, 1, number),
+        "authors": [f"Author {number}"],
+        "source": "arxiv",
+        **overrides,
+    }
+
+
+def test_upsert_papers_maps_every_url_across_chunks(db):
+    assert save_papers_to_db((stored_paper(n) for n in (1, 2)), db) == 2
+    existing = dict(db.query(Paper.url, Paper.id).all())
+
+    new_ids = []
+    papers = [stored_paper(n) for n in (1, 3, 4, 2, 5)] + [stored_paper(3), stored_paper(6, url=None)]
+    url_to_id = upsert_papers(iter(papers), db, chunk_size=2, new_ids=new_ids)
+
+    stored = dict(db.query(Paper.url, Paper.id).all())
+    # 已存在的论文保留原主键，跨批次重复出现的论文只插入一次，缺失 URL 的记录被跳过
+    assert url_to_id == stored
+    assert len(stored) == 5
+    assert all(url_to_id[url] == paper_id for url, paper_id in existing.items())
+    assert sorted(new_ids) == sorted(stored[stored_paper(n)["url"]] for n in (3, 4, 5))
+    assert save_papers_to_db([stored_paper(n) for n in range(1, 6)], db) == 0
+
@@ -0,0 +1,84 @@
+from datetime import datetime
+from app.core.config import settings
+from app.models.paper import Paper
+from app.models.paper_lsh_band import PaperLSHBand
+from app.services.crawler import _upsert_batch
+from app.services.dedup import BANDS, backfill_signatures, minhash_signature, similarity
+
+TITLE = "Sparse attention for long documents"
+ABSTRACT = (
+    "We propose a sparse attention mechanism for long document transformers that scales linearly with "
+    "sequence length. The mechanism combines local windows with a small set of global tokens and can be "
+    "added to pretrained models without retraining from scratch. We evaluate it on summarization, "
+    "question answering and retrieval benchmarks and report consistent gains over dense attention."
+)
+# 第二版：只修正了一处措辞
+REVISED = ABSTRACT.replace("consistent gains", "consistent improvements")
+OTHER = ("Graph neural networks for molecules", "Message passing networks predict molecular properties from atom graphs.")
+
+
+def paper(number: int, title: str, abstract: str) -> dict:
+    return {
+        "title": title,
+        "abstract": abstract,
+        "url": f"http://arxiv.org/abs/2601.{number:05d}v1",
+        "published_date": datetime(2026, 1, number),
+        "authors": [],
+        "source": "arxiv",
+    }
+
+
+def test_revised_version_is_similar_and_unrelated_paper_is_not():
+    original = minhash_signature(TITLE, ABSTRACT)
+    assert similarity(original, minhash_signature(TITLE, REVISED)) >= settings.DEDUP_THRESHOLD
+    assert similarity(original, minhash_signature(*OTHER)) < 0.2
+
+
+def test_revised_version_is_flagged_and_mapped_to_the_original(db):
+    first = paper(1, TITLE, ABSTRACT)
+    url_to_id, new_ids = _upsert_batch(db, [first, paper(2, *OTHER)])
+    db.commit()
+    assert len(new_ids) == 2
+    original_id = url_to_id[first["url"]]
+
+    revised = paper(3, TITLE, REVISED)
+    url_to_id, new_ids = _upsert_batch(db, [revised])
+    db.commit()
+    assert new_ids == []
+    assert url_to_id == {revised["url"]: original_id}
+    stored = db.query(Paper).filter(Paper.url == revised["url"]).one()
+    assert stored.duplicate_of == original_id
+    # 重复论文不写入分段索引，之后的论文只会与原始论文比对
+    assert db.query(PaperLSHBand).filter(PaperLSHBand.paper_id == stored.id).count() == 0
+    # 再次入库同一批论文时，重复论文仍映射到原始论文
+    assert _upsert_batch(db, [revised])[0] == {revised["url"]: original_id}
+
+
+def test_duplicates_within_one_batch_point_to_the_first_paper(db):
+    first, second = paper(1, TITLE, ABSTRACT), paper(2, TITLE, REVISED)
+    url_to_id, new_ids = _upsert_batch(db, [first, second])
+    db.commit()
+    assert new_ids == [url_to_id[first["url"]]]
+    assert url_to_id[second["url"]] == url_to_id[first["url"]]
+
+
+def test_backfill_signatures_is_idempotent(db):
+    db.add_all([
+        Paper(title=TITLE, abstract=ABSTRACT, url="u1"),
+        Paper(title=TITLE, abstract=REVISED, url="u2"),
+        Paper(title=OTHER[0], abstract=OTHER[1], url="u3"),
+    ])
+    db.commit()
+    assert backfill_signatures(db, chunk_size=2) == (3, 1)
+    flags = dict(db.query(Paper.url, Paper.duplicate_of))
+    original_id = db.query(Paper.id).filter(Paper.url == "u1").scalar()
+    assert flags == {"u1": None, "u2": original_id, "u3": None}
+    assert db.query(PaperLSHBand).count() == 2 * BANDS
+
+    assert backfill_signatures(db) == (0, 0)
+    # 清空签名后重新回填：结果不变，分段索引不会重复写入
+    db.query(Paper).update({"minhash": None}, synchronize_session=False)
+    db.commit()
+    assert backfill_signatures(db) == (3, 1)
+    assert dict(db.query(Paper.url, Paper.duplicate_of)) == flags
+    assert db.query(PaperLSHBand).count() == 2 * BANDS
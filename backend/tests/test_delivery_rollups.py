@@ -0,0 +1,101 @@
+from datetime import date, datetime
+from app.models.delivery_rollup import DeliveryRollup
+from app.models.digest import DailyDigest
+from app.models.digest_job import DigestJob
+from app.models.user import User
+from app.services.delivery_rollups import delivered_since, delivery_series, rebuild_rollups, record_delivery
+
+
+def buckets(db) -> dict:
+    return {
+        (row.granularity, row.bucket_start): (row.delivered, row.failed, row.papers)
+        for row in db.query(DeliveryRollup)
+    }
+
+
+def make_user(db, email: str = "a@example.com") -> User:
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_record_delivery_increments_hour_and_day_buckets(db):
+    record_delivery(db, at=datetime(2026, 3, 1, 8, 5), delivered=1, papers=4)
+    record_delivery(db, at=datetime(2026, 3, 1, 8, 55), delivered=1, papers=2)
+    record_delivery(db, at=datetime(2026, 3, 1, 9, 10), failed=1)
+    db.commit()
+
+    assert buckets(db) == {
+        ("hour", datetime(2026, 3, 1, 8)): (2, 0, 6),
+        ("hour", datetime(2026, 3, 1, 9)): (0, 1, 0),
+        ("day", datetime(2026, 3, 1)): (2, 1, 6),
+    }
+    assert delivered_since(db, datetime(2026, 3, 1, 8, 30)) == 2
+    assert delivered_since(db, datetime(2026, 3, 1, 9)) == 0
+
+
+def test_rebuild_counts_digests_and_job_failures(db):
+    user = make_user(db)
+    db.add_all([
+        DailyDigest(user_id=user.id, paper_ids=[1, 2, 3], sent_at=datetime(2026, 3, 1, 8, 5)),
+        DailyDigest(user_id=user.id, paper_ids=None, sent_at=datetime(2026, 3, 2, 23, 59)),
+        # 成功任务的前两次尝试失败，失败任务的三次尝试全部失败，等待中的任务没有尝试过
+        DigestJob(user_id=user.id, logical_date=date(2026, 3, 1), scheduled_for=datetime(2026, 3, 1, 8),
+                  run_after=datetime(2026, 3, 1, 8), status="done", attempts=3, updated_at=datetime(2026, 3, 1, 8, 5)),
+        DigestJob(user_id=user.id, logical_date=date(2026, 3, 2), scheduled_for=datetime(2026, 3, 2, 8),
+                  run_after=datetime(2026, 3, 2, 8), status="failed", attempts=3, updated_at=datetime(2026, 3, 2, 9, 30)),
+        DigestJob(user_id=user.id, logical_date=date(2026, 3, 3), scheduled_for=datetime(2026, 3, 3, 8),
+                  run_after=datetime(2026, 3, 3, 8), status="pending", attempts=0, updated_at=datetime(2026, 3, 3, 8)),
+    ])
+    db.commit()
+    # 重建前残留的时间桶会被清空
+    record_delivery(db, at=datetime(2020, 1, 1), delivered=5)
+    db.commit()
+
+    assert rebuild_rollups(db, chunk_size=1) == 5
+    db.commit()
+    assert buckets(db) == {
+        ("hour", datetime(2026, 3, 1, 8)): (1, 2, 3),
+        ("day", datetime(2026, 3, 1)): (1, 2, 3),
+        ("hour", datetime(2026, 3, 2, 9)): (0, 3, 0),
+        ("hour", datetime(2026, 3, 2, 23)): (1, 0, 0),
+        ("day", datetime(2026, 3, 2)): (1, 3, 0),
+    }
+    # 重复重建结果不变
+    assert rebuild_rollups(db) == 5
+    db.commit()
+    assert db.query(DeliveryRollup).count() == 5
+
+
+def test_series_fills_missing_buckets_with_zero(db):
+    record_delivery(db, at=datetime(2026, 3, 1, 8, 5), delivered=1, papers=4)
+    record_delivery(db, at=datetime(2026, 3, 3, 1), failed=2)
+    db.commit()
+
+    series = delivery_series(db, datetime(2026, 3, 1, 12), datetime(2026, 3, 4), "day")
+    assert [(item["bucket_start"], item["delivered"], item["failed"]) for item in series] == [
+        ("2026-03-01T00:00:00", 1, 0),
+        ("2026-03-02T00:00:00", 0, 0),
+        ("2026-03-03T00:00:00", 0, 2),
+    ]
+
+
+def test_delivery_series_endpoint(client, db):
+    record_delivery(db, at=datetime(2026, 3, 1, 8, 5), delivered=1, papers=4)
+    record_delivery(db, at=datetime(2026, 3, 1, 10), delivered=1, papers=1)
+    db.commit()
+
+    response = client.get("/api/v1/admin/delivery-series", params={
+        "from": "2026-03-01T16:00:00+08:00", "to": "2026-03-01T11:00:00Z", "bucket": "hour",
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    # 带时区的起始时间先换算为 UTC
+    assert body["from"] == "2026-03-01T08:00:00"
+    assert [item["delivered"] for item in body["items"]] == [1, 0, 1]
+    assert body["totals"] == {"delivered": 2, "failed": 0, "papers": 5}
+
+    assert client.get("/api/v1/admin/delivery-series", params={"from": "2026-03-02T00:00:00", "to": "2026-03-01T00:00:00"}).status_code == 400
+    assert client.get("/api/v1/admin/delivery-series", params={"from": "2000-01-01T00:00:00", "to": "2026-03-01T00:00:00", "bucket": "hour"}).status_code == 400
+    assert client.get("/api/v1/admin/delivery-series", params={"from": "2026-03-01T00:00:00", "bucket": "week"}).status_code == 422
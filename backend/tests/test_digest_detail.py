@@ -0,0 +1,79 @@
+from app.models.digest import DailyDigest
+from app.models.paper import Paper
+from app.models.user import User
+from app.services.digest_detail_cache import digest_detail_cache, etag_matches
+from app.services.digest_papers import record_digest_papers
+
+
+def make_digest(db, email: str, titles: list) -> int:
+    user = db.query(User).filter(User.email == email).one()
+    papers = [Paper(title=title, url=f"https://arxiv.org/abs/{i}") for i, title in enumerate(titles)]
+    db.add_all(papers)
+    db.flush()
+    digest = DailyDigest(user_id=user.id, paper_ids=[paper.id for paper in papers])
+    db.add(digest)
+    db.flush()
+    record_digest_papers(db, digest, digest.paper_ids)
+    db.commit()
+    return digest.id
+
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"other", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches("", '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+
+
+def test_detail_round_trip_returns_304_for_matching_etag(client, db, signup):
+    headers = signup("a@example.com")
+    digest_id = make_digest(db, "a@example.com", ["First", "Second"])
+
+    response = client.get(f"/api/v1/users/me/digests/{digest_id}", headers=headers)
+    assert response.status_code == 200
+    assert [paper["title"] for paper in response.json()["papers"]] == ["First", "Second"]
+    etag = response.headers["etag"]
+    assert "immutable" in response.headers["cache-control"]
+    assert "private" in response.headers["cache-control"]
+
+    for tag in (etag, f"W/{etag}", f'"stale", {etag}'):
+        cached = client.get(f"/api/v1/users/me/digests/{digest_id}", headers={**headers, "If-None-Match": tag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+
+    changed = client.get(f"/api/v1/users/me/digests/{digest_id}", headers={**headers, "If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+    assert changed.content == response.content
+    assert digest_detail_cache.stats()["hits"] >= 4
+
+
+def test_cached_detail_is_not_served_to_other_users(client, db, signup):
+    alice = signup("a@example.com")
+    bob = signup("b@example.com")
+    digest_id = make_digest(db, "a@example.com", ["Private"])
+
+    # 先让 alice 的响应进入缓存，再以 bob 的身份请求同一条日报
+    etag = client.get(f"/api/v1/users/me/digests/{digest_id}", headers=alice).headers["etag"]
+    assert client.get(f"/api/v1/users/me/digests/{digest_id}", headers=bob).status_code == 404
+    assert client.get(f"/api/v1/users/me/digests/{digest_id}", headers={**bob, "If-None-Match": etag}).status_code == 404
+    assert client.get(f"/api/v1/users/me/digests/{digest_id}", headers={**alice, "If-None-Match": etag}).status_code == 304
+
+
+def test_detail_without_papers_is_not_cached(client, db, signup):
+    headers = signup("a@example.com")
+    user = db.query(User).filter(User.email == "a@example.com").one()
+    paper = Paper(title="Late", url="https://arxiv.org/abs/late")
+    db.add(paper)
+    digest = DailyDigest(user_id=user.id, paper_ids=[])
+    db.add(digest)
+    db.commit()
+
+    assert client.get(f"/api/v1/users/me/digests/{digest.id}", headers=headers).json()["papers"] == []
+    # 历史日报迁移到关联表后，再次查看即可看到论文
+    record_digest_papers(db, digest, [paper.id])
+    db.commit()
+    assert [item["title"] for item in client.get(f"/api/v1/users/me/digests/{digest.id}", headers=headers).json()["papers"]] == ["Late"]
@@ -0,0 +1,68 @@
+from app.models.digest import DailyDigest
+from app.models.digest_paper import DigestPaper
+from app.models.paper import Paper
+from app.models.user import User
+from app.services.digest_papers import digest_papers, exclude_delivered, migrate_digest_papers, record_digest_papers
+
+
+def setup_papers(db, count: int) -> list:
+    papers = [Paper(title=f"Paper {i}", url=f"u{i}") for i in range(count)]
+    db.add_all(papers)
+    db.commit()
+    return [paper.id for paper in papers]
+
+
+def make_user(db, email: str) -> User:
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_digest_papers_keep_delivery_order(db):
+    user = make_user(db, "a@example.com")
+    ids = setup_papers(db, 3)
+    digest = DailyDigest(user_id=user.id, paper_ids=[ids[2], ids[0], ids[1]])
+    db.add(digest)
+    db.flush()
+    record_digest_papers(db, digest, digest.paper_ids)
+    db.commit()
+    assert [paper.id for paper in digest_papers(db, digest.id)] == [ids[2], ids[0], ids[1]]
+
+
+def test_migration_is_idempotent_and_skips_deleted_papers(db):
+    user = make_user(db, "a@example.com")
+    ids = setup_papers(db, 4)
+    db.add_all([
+        DailyDigest(user_id=user.id, paper_ids=[ids[0], ids[1]]),
+        DailyDigest(user_id=user.id, paper_ids=[ids[3], ids[2], ids[1]]),
+    ])
+    db.query(Paper).filter(Paper.id == ids[2]).delete()
+    db.commit()
+
+    assert migrate_digest_papers(db, chunk_size=1) == 2
+    rows = db.query(DigestPaper.digest_id, DigestPaper.paper_id, DigestPaper.position).order_by(DigestPaper.id).all()
+    # 已删除的论文不写入，其余论文保留原来的推送位置
+    assert [(paper_id, position) for _, paper_id, position in rows] == [(ids[0], 0), (ids[1], 1), (ids[3], 0), (ids[1], 2)]
+
+    assert migrate_digest_papers(db) == 2
+    assert db.query(DigestPaper).count() == 4
+
+
+def test_exclude_delivered_removes_papers_sent_on_earlier_days(db):
+    alice, bob = make_user(db, "a@example.com"), make_user(db, "b@example.com")
+    ids = setup_papers(db, 3)
+    yesterday = DailyDigest(user_id=alice.id, paper_ids=[ids[0]])
+    db.add(yesterday)
+    db.flush()
+    record_digest_papers(db, yesterday, yesterday.paper_ids)
+    db.commit()
+
+    candidates = {
+        alice.id: [{"id": ids[0]}, {"id": ids[1]}, {"url": "not ingested"}],
+        bob.id: [{"id": ids[0]}],
+    }
+    assert exclude_delivered(db, candidates) == {
+        alice.id: [{"id": ids[1]}, {"url": "not ingested"}],
+        bob.id: [{"id": ids[0]}],
+    }
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.models.digest_job import DigestJob
+from app.models.user import User
+from app.services.digest_queue import (
+    JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING, JOB_SENDING,
+    claim_jobs, enqueue_due_jobs, fail_job, mark_sent, renew_lease, start_sending,
+)
+
+NOW = datetime(2026, 3, 1, 8, 0)
+LEASE = timedelta(seconds=settings.DIGEST_JOB_LEASE_SECONDS + 1)
+
+
+@pytest.fixture
+def job(db) -> DigestJob:
+    db.add(User(email="a@example.com", hashed_password="x", next_digest_at=NOW - timedelta(minutes=1)))
+    db.commit()
+    assert enqueue_due_jobs(db, NOW) == 1
+    return db.query(DigestJob).one()
+
+
+def test_claim_is_exclusive(db, job):
+    (claimed,) = claim_jobs(db, NOW)
+    assert (claimed.status, claimed.attempts) == (JOB_RUNNING, 1)
+    assert claim_jobs(db, NOW) == []
+
+
+def test_expired_lease_is_reclaimed_and_old_token_rejected(db, job):
+    (first,) = claim_jobs(db, NOW)
+    old_token = first.locked_by
+    (second,) = claim_jobs(db, NOW + LEASE)
+    assert second.locked_by != old_token
+    assert second.attempts == 2
+    assert second.last_error == "Lease expired"
+    # 原执行者恢复后既不能续租也不能开始发送
+    assert not renew_lease(db, second, old_token, NOW + LEASE)
+    assert not start_sending(db, second, old_token, NOW + LEASE)
+    assert start_sending(db, second, second.locked_by, NOW + LEASE)
+
+
+def test_renewed_lease_is_not_reclaimed(db, job):
+    (claimed,) = claim_jobs(db, NOW)
+    assert renew_lease(db, claimed, claimed.locked_by, NOW + LEASE - timedelta(seconds=2))
+    assert claim_jobs(db, NOW + LEASE) == []
+    db.refresh(claimed)
+    assert claimed.status == JOB_RUNNING
+
+
+def test_mark_sent_rejects_stale_token(db, job):
+    (claimed,) = claim_jobs(db, NOW)
+    token = claimed.locked_by
+    assert start_sending(db, claimed, token, NOW)
+    assert not mark_sent(db, claimed, "stale")
+    db.refresh(claimed)
+    assert claimed.status == JOB_SENDING
+    assert mark_sent(db, claimed, token)
+    db.refresh(claimed)
+    assert claimed.status == JOB_DONE
+
+
+def test_job_fails_after_max_attempts_of_expired_leases(db, job):
+    now = NOW
+    for attempt in range(1, settings.DIGEST_JOB_MAX_ATTEMPTS + 1):
+        (claimed,) = claim_jobs(db, now)
+        assert claimed.attempts == attempt
+        now += LEASE
+    assert claim_jobs(db, now) == []
+    db.refresh(job)
+    assert job.status == JOB_FAILED
+    assert job.last_error == "Lease expired; max attempts reached"
+
+
+def test_failed_attempts_are_retried_then_fail(db, job):
+    now = NOW
+    for attempt in range(1, settings.DIGEST_JOB_MAX_ATTEMPTS + 1):
+        (claimed,) = claim_jobs(db, now)
+        assert fail_job(db, claimed, claimed.locked_by, "boom", now)
+        db.commit()
+        db.refresh(claimed)
+        if attempt < settings.DIGEST_JOB_MAX_ATTEMPTS:
+            assert claimed.status == JOB_PENDING
+            assert claimed.run_after > now
+            now = claimed.run_after
+    assert claimed.status == JOB_FAILED
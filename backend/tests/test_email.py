@@ -0,0 +1,29 @@
+from app.services.email import SMTPMailer
+
+
+def test_mailer_reuses_one_connection(smtp_sink):
+    with SMTPMailer(smtp_sink.settings(), pool_size=1) as mailer:
+        assert all(mailer.send(f"user{i}@example.com", "digest", "<p>hi</p>") for i in range(3))
+    assert len(smtp_sink.messages) == 3
+    assert smtp_sink.connections == 1
+    assert mailer.sent == 3
+
+
+def test_refused_recipient_keeps_the_connection(smtp_sink):
+    # SMTPRecipientsRefused 继承自 OSError：不能被当作断线而丢弃连接重试
+    with SMTPMailer(smtp_sink.settings(), pool_size=1) as mailer:
+        assert mailer.send("reject@example.com", "digest", "<p>hi</p>") is False
+        assert mailer.send("user@example.com", "digest", "<p>hi</p>") is True
+    assert smtp_sink.connections == 1
+    assert smtp_sink.commands.count("RCPT") == 2
+    assert "RSET" in smtp_sink.commands
+    assert (mailer.sent, mailer.failed) == (1, 1)
+
+
+def test_mailer_reconnects_after_server_disconnect(smtp_sink):
+    smtp_sink.drop_after = 1
+    with SMTPMailer(smtp_sink.settings(), pool_size=1) as mailer:
+        assert mailer.send("first@example.com", "digest", "<p>hi</p>") is True
+        assert mailer.send("second@example.com", "digest", "<p>hi</p>") is True
+    assert len(smtp_sink.messages) == 2
+    assert smtp_sink.connections == 2
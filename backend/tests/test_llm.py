@@ -0,0 +1,60 @@
+import time
+import pytest
+from app.models.paper import Paper
+from app.services import llm
+from app.services.summary_cache import SummaryStore
+
+
+@pytest.fixture
+def llm_endpoint(llm_server, monkeypatch):
+    monkeypatch.setattr(llm, "DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setattr(llm, "DEEPSEEK_API_BASE", llm_server.url)
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 2)
+    return llm_server
+
+
+def add_papers(db, count: int) -> list:
+    papers = [Paper(title=f"t{i}", url=f"http://arxiv.org/abs/x{i}", abstract=f"abstract {i}") for i in range(count)]
+    db.add_all(papers)
+    db.commit()
+    return [{"id": paper.id, "abstract": paper.abstract} for paper in papers]
+
+
+def test_summarize_batch_calls_endpoint_in_order(llm_endpoint):
+    assert llm.summarize_batch(["a", "b", "c"]) == ["SUMMARY: a", "SUMMARY: b", "SUMMARY: c"]
+    assert len(llm_endpoint.requests) == 3
+    assert llm_endpoint.requests[0]["messages"][0]["content"] == llm.SUMMARY_PROMPT
+
+
+def test_rate_limited_request_is_retried(llm_endpoint):
+    llm_endpoint.statuses = [429]
+    assert llm.request_summary("a") == "SUMMARY: a"
+    assert len(llm_endpoint.requests) == 2
+
+
+def test_real_summaries_are_stored_once(db, llm_endpoint):
+    papers = add_papers(db, 3)
+    store = SummaryStore()
+    assert store.summarize_many(db, papers)[0] == "SUMMARY: abstract 0"
+    assert db.query(Paper).filter(Paper.structured_abstract.isnot(None)).count() == 3
+    SummaryStore().summarize_many(db, papers)
+    assert len(llm_endpoint.requests) == 3
+
+
+def test_failed_summaries_fall_back_without_persisting(db, llm_endpoint, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+    llm_endpoint.statuses = [500, 500]
+    papers = add_papers(db, 2)
+    summaries = SummaryStore().summarize_many(db, papers)
+    assert all(summary.startswith("[AI生成摘要(Mock)]") for summary in summaries)
+    assert db.query(Paper).filter(Paper.structured_abstract.isnot(None)).count() == 0
+
+
+def test_missing_api_key_falls_back_quickly_without_persisting(db):
+    assert not llm.DEEPSEEK_API_KEY
+    papers = add_papers(db, 5)
+    started = time.monotonic()
+    summaries = SummaryStore().summarize_many(db, papers)
+    assert time.monotonic() - started < 0.5
+    assert summaries[0] == llm.fallback_summary("abstract 0")
+    assert db.query(Paper).filter(Paper.structured_abstract.isnot(None)).count() == 0
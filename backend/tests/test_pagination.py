@@ -0,0 +1,65 @@
+from datetime import datetime
+import pytest
+from app.db.pagination import decode_cursor, encode_cursor
+from app.models.digest import DailyDigest
+from app.models.user import User
+
+
+def walk(client, url: str, headers: dict | None = None) -> list:
+    items, cursor = [], None
+    # 游标重复返回同一行时分页永远不会结束，限制页数让测试失败而不是挂起
+    for _ in range(50):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers or {})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body["items"]) <= 2
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+    raise AssertionError(f"pagination did not terminate: {[item.get('id', item.get('email')) for item in items[:10]]}")
+
+
+def test_cursor_round_trip_and_invalid_cursors():
+    assert decode_cursor(encode_cursor(datetime(2026, 1, 2, 3, 4, 5, 6), 7)) == ("2026-01-02T03:04:05.000006", 7)
+    for cursor in ("garbage", encode_cursor("x", 1)[:-3], "WzEsMl0", "WyJ4IiwieSJd"):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_digest_pages_have_no_duplicates_or_gaps_across_equal_sent_at(client, db, signup):
+    headers = signup("a@example.com")
+    user = db.query(User).filter(User.email == "a@example.com").one()
+    same = datetime(2026, 3, 1, 8, 0, 0, 123456)
+    # 一部分记录带微秒且发送时间完全相同，一部分使用服务端默认值（SQLite 中不带微秒）
+    db.add_all([DailyDigest(user_id=user.id, paper_ids=[], sent_at=same) for _ in range(5)])
+    db.add_all([DailyDigest(user_id=user.id, paper_ids=[]) for _ in range(4)])
+    db.add(DailyDigest(user_id=user.id, paper_ids=[], sent_at=datetime(2026, 3, 1, 8, 0, 0)))
+    db.commit()
+
+    items = walk(client, "/api/v1/users/me/digests", headers)
+    ids = [item["id"] for item in items]
+    assert len(ids) == len(set(ids)) == 10
+    expected = [
+        digest.id
+        for digest in sorted(db.query(DailyDigest).all(), key=lambda d: (d.sent_at.replace(tzinfo=None), d.id), reverse=True)
+    ]
+    assert ids == expected
+
+
+def test_digest_list_rejects_invalid_cursor(client, db, signup):
+    headers = signup("a@example.com")
+    response = client.get("/api/v1/users/me/digests", params={"cursor": "garbage"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_recent_subscriptions_pages_users_created_in_the_same_second(client, db):
+    # 服务端默认值精确到秒，批量写入的用户创建时间相同，只能依靠主键区分
+    db.add_all([User(email=f"u{i}@example.com", hashed_password="x") for i in range(5)])
+    db.commit()
+
+    emails = [item["email"] for item in walk(client, "/api/v1/admin/recent-subscriptions")]
+    assert emails == [f"u{i}@example.com" for i in reversed(range(5))]
+    assert client.get("/api/v1/admin/recent-subscriptions", params={"cursor": "%%%"}).status_code == 400
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models.digest import DailyDigest
+from app.models.paper import Paper
+from app.models.paper_match import PaperMatch
+from app.models.subscription import ResearchProfile
+from app.models.user import User
+from app.services.paper_router import (
+    AhoCorasick, PaperRouter, compile_keyword, mark_matches_delivered, pending_matches, retire_stale_matches,
+)
+
+
+def make_user(db, email: str, keywords: list) -> User:
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(ResearchProfile(user_id=user.id, keywords=keywords))
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def make_paper(db, number: int, title: str = "", abstract: str = "", published: datetime | None = None) -> Paper:
+    paper = Paper(
+        title=title or f"Paper {number}",
+        abstract=abstract,
+        url=f"http://arxiv.org/abs/2601.{number:05d}v1",
+        published_date=published or datetime(2026, 1, 1) + timedelta(hours=number),
+    )
+    db.add(paper)
+    db.flush()
+    return paper
+
+
+@pytest.fixture
+def router(db):
+    router = PaperRouter()
+    router.load(db)
+    return router
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert automaton.find("ushers") == {"she", "he", "hers"}
+    assert automaton.find("this") == {"his"}
+    assert AhoCorasick([]).find("anything") == set()
+
+
+def test_compile_keyword():
+    assert compile_keyword("cat:cs.AI") == ("cat", "cs.AI")
+    assert compile_keyword("Cat:cs.*") == ("cat", "cs.*")
+    assert compile_keyword("ti:Graph  Neural-Networks") == ("text", " graph neural networks ")
+    assert compile_keyword("au:Geoffrey Hinton") == ("au", " geoffrey hinton ")
+    assert compile_keyword("  diffusion models ") == ("text", " diffusion models ")
+    assert compile_keyword("cat:") is None
+    assert compile_keyword("!!") is None
+
+
+def test_match_uses_phrases_authors_and_categories(db):
+    phrase = make_user(db, "a@example.com", ["graph neural"])
+    author = make_user(db, "b@example.com", ["au:Ada Lovelace"])
+    exact = make_user(db, "c@example.com", ["cat:cs.AI"])
+    wildcard = make_user(db, "d@example.com", ["cat:cs.*"])
+    router = PaperRouter()
+    router.load(db)
+    assert router.match({"title": "Deep Graph Neural networks", "categories": ["stat.ML"]}) == {phrase.id}
+    # 短语只在完整单词边界上命中
+    assert router.match({"title": "graph neurals", "categories": []}) == set()
+    assert router.match({"title": "x", "authors": ["Ada Lovelace"], "categories": ["cs.AI"]}) == {author.id, exact.id, wildcard.id}
+    assert router.match({"title": "x", "categories": ["cs.LG"]}) == {wildcard.id}
+
+
+def test_update_user_applies_keyword_changes_incrementally(db, router):
+    user = make_user(db, "a@example.com", ["protein folding"])
+    router.update_user(user)
+    assert router.match({"title": "protein folding at scale"}) == {user.id}
+
+    user.profile.keywords = ["sparse attention"]
+    db.commit()
+    router.update_user(user)
+    assert router.match({"title": "protein folding at scale"}) == set()
+    assert router.match({"abstract": "a sparse attention kernel"}) == {user.id}
+
+    user.subscription_enabled = False
+    db.commit()
+    router.update_user(user)
+    assert router.match({"abstract": "a sparse attention kernel"}) == set()
+    assert router.stats()["users"] == 0
+
+
+def test_route_writes_matches_once(db, router):
+    user = make_user(db, "a@example.com", ["graph"])
+    router.update_user(user)
+    paper = make_paper(db, 1, title="A graph model")
+    other = make_paper(db, 2, title="Unrelated")
+    papers = [{"id": p.id, "title": p.title, "abstract": ""} for p in (paper, other)]
+    assert router.route(db, papers) == 1
+    router.route(db, papers)
+    db.commit()
+    assert db.query(PaperMatch.user_id, PaperMatch.paper_id).all() == [(user.id, paper.id)]
+
+
+def test_pending_matches_limit_and_delivery_cleanup(db):
+    user = make_user(db, "a@example.com", ["graph"])
+    papers = [make_paper(db, number) for number in range(1, 6)]
+    db.add_all(PaperMatch(user_id=user.id, paper_id=paper.id) for paper in papers)
+    db.commit()
+
+    pending = pending_matches(db, [user.id], limit=3)[user.id]
+    assert [p["id"] for p in pending] == [papers[4].id, papers[3].id, papers[2].id]
+
+    digest = DailyDigest(user_id=user.id, paper_ids=[papers[4].id])
+    db.add(digest)
+    db.flush()
+    mark_matches_delivered(db, user.id, [papers[4].id], digest.id)
+    db.commit()
+    # 入选的匹配关联到日报，其余未入选的匹配被清理
+    assert db.query(PaperMatch.paper_id, PaperMatch.digest_id).all() == [(papers[4].id, digest.id)]
+    assert pending_matches(db, [user.id]) == {}
+
+
+def test_stale_matches_are_ignored_and_retired(db):
+    user = make_user(db, "a@example.com", ["graph"])
+    paper = make_paper(db, 1)
+    db.add(PaperMatch(user_id=user.id, paper_id=paper.id))
+    db.commit()
+    later = datetime.utcnow() + timedelta(days=30)
+    assert pending_matches(db, [user.id], now=later) == {}
+    assert retire_stale_matches(db, later) == 1
+    db.commit()
+    assert db.query(PaperMatch).count() == 0
@@ -0,0 +1,63 @@
+from app.models.paper import Paper
+from app.models.subscription import ResearchProfile
+from app.models.user import User
+from app.services.ranking import PaperIndex, rank_candidates
+
+
+def make_user(db, email: str, keywords: list) -> User:
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(ResearchProfile(user_id=user.id, keywords=keywords))
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def paper_dicts(db) -> list:
+    return [{"id": p.id, "url": p.url, "title": p.title} for p in db.query(Paper).order_by(Paper.id)]
+
+
+def test_rank_candidates_orders_by_profile(db, tmp_path):
+    db.add_all([
+        Paper(title="graph neural networks", url="u1", abstract="message passing on graphs"),
+        Paper(title="protein folding", url="u2", abstract="structure prediction for proteins"),
+    ])
+    db.commit()
+    index = PaperIndex(directory=str(tmp_path))
+    index.refresh(db)
+    user = make_user(db, "a@example.com", ["protein structure"])
+    ranked = rank_candidates(index, [user], {user.id: paper_dicts(db)}, top_k=2)
+    assert [p["url"] for p in ranked[user.id]] == ["u2", "u1"]
+
+
+def test_rank_candidates_handles_users_without_candidates(db, tmp_path):
+    db.add(Paper(title="graph neural networks", url="u1", abstract="message passing"))
+    db.commit()
+    index = PaperIndex(directory=str(tmp_path))
+    index.refresh(db)
+    with_papers = make_user(db, "a@example.com", ["graphs"])
+    without = make_user(db, "b@example.com", ["graphs"])
+    ranked = rank_candidates(index, [with_papers, without], {with_papers.id: paper_dicts(db), without.id: []})
+    assert [p["url"] for p in ranked[with_papers.id]] == ["u1"]
+    assert ranked[without.id] == []
+
+
+def test_rank_candidates_keeps_order_when_no_candidate_is_indexed(db, tmp_path):
+    index = PaperIndex(directory=str(tmp_path))
+    index.refresh(db)
+    user = make_user(db, "a@example.com", ["graphs"])
+    candidates = [{"id": 101, "url": "x"}, {"id": 102, "url": "y"}]
+    assert rank_candidates(index, [user], {user.id: candidates})[user.id] == candidates
+
+
+def test_index_refresh_appends_segments(db, tmp_path):
+    index = PaperIndex(directory=str(tmp_path))
+    for i in range(3):
+        db.add(Paper(title=f"paper {i}", url=f"u{i}", abstract="text"))
+        db.commit()
+        index.refresh(db)
+    assert len(index._segments) == 3
+    reloaded = PaperIndex(directory=str(tmp_path))
+    reloaded.refresh(db)
+    assert list(reloaded.ids) == list(index.ids)
@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from app.models.crawl_state import CrawlState
+from app.models.digest import DailyDigest
+from app.models.digest_job import DigestJob
+from app.models.email_config import EmailConfig
+from app.models.paper import Paper
+from app.models.user import User
+from app.services.digest_queue import JOB_DONE, enqueue_due_jobs
+from app.services.email import SMTPMailer, invalidate_smtp_settings_cache
+from app.services.ranking import PaperIndex
+from scripts import run_daily_digest
+
+
+@pytest.fixture
+def due_users(db, smtp_sink, tmp_path, monkeypatch):
+    """
+    创建一批已到期的订阅用户与本地论文库，并让日报邮件发往 SMTP 收件服务
+    """
+    monkeypatch.setattr(run_daily_digest, "paper_index", PaperIndex(directory=str(tmp_path)))
+    papers = [Paper(title=f"Paper {i}", url=f"http://arxiv.org/abs/2601.0000{i}", abstract=f"abstract {i}") for i in range(3)]
+    db.add_all(papers)
+    db.flush()
+    db.add(CrawlState(query="cat:cs.AI", recent_paper_ids=[paper.id for paper in papers]))
+    config = smtp_sink.settings()
+    db.add(EmailConfig(
+        smtp_host=config["host"], smtp_port=config["port"], smtp_tls=False, smtp_user="", smtp_password="",
+        from_email=config["from_email"], from_name=config["from_name"], is_active=True,
+    ))
+    now = datetime.utcnow()
+    users = [User(email=f"user{i}@example.com", hashed_password="x", next_digest_at=now - timedelta(minutes=1)) for i in range(5)]
+    db.add_all(users)
+    db.commit()
+    invalidate_smtp_settings_cache()
+    assert enqueue_due_jobs(db, now) == 5
+    yield users
+    invalidate_smtp_settings_cache()
+
+
+def test_drain_claims_at_most_one_job_per_worker(db, due_users, smtp_sink, monkeypatch):
+    batches = []
+    claim = run_daily_digest.claim_jobs
+
+    def claim_jobs(db, now, limit=None):
+        jobs = claim(db, now, limit=limit)
+        batches.append(len(jobs))
+        return jobs
+
+    monkeypatch.setattr(run_daily_digest, "claim_jobs", claim_jobs)
+    counts = run_daily_digest.drain_jobs(db, workers=2, mode="thread")
+    assert counts == {JOB_DONE: 5}
+    assert batches == [2, 2, 1, 0]
+    assert {job.attempts for job in db.query(DigestJob)} == {1}
+    assert db.query(DailyDigest).count() == 5
+    assert len(smtp_sink.messages) == 5
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_drain_delivers_and_closes_mailer_connections(db, due_users, smtp_sink, mode):
+    counts = run_daily_digest.drain_jobs(db, workers=2, mode=mode)
+    assert counts == {JOB_DONE: 5}
+    assert db.query(DailyDigest).count() == 5
+    recipients = sorted(message["to"][0].split(":", 1)[1] for message in smtp_sink.messages)
+    assert recipients == sorted(f"<{user.email}>" for user in due_users)
+    # 线程模式关闭共享发送器，进程模式在子进程退出时关闭各自的发送器
+    assert smtp_sink.connections > 0
+    assert wait_for(lambda: smtp_sink.commands.count("QUIT") == smtp_sink.connections)
+
+
+def test_shutdown_waits_for_running_workers_before_closing_mailer(smtp_sink):
+    mailer = SMTPMailer(smtp_sink.settings(), pool_size=1)
+    executor = run_daily_digest._create_executor("thread", 1)
+    release = threading.Event()
+
+    def late_send():
+        release.wait(5)
+        return mailer.send("late@example.com", "digest", "<p>hi</p>")
+
+    future = executor.submit(late_send)
+    run_daily_digest._shutdown_executor(executor, mailer, wait=False)
+    release.set()
+    assert future.result(timeout=5) is True
+    # 超时的执行者结束后连接才被关闭，不会泄漏
+    assert wait_for(lambda: smtp_sink.commands.count("QUIT") == 1)
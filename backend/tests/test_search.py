@@ -0,0 +1,66 @@
+from datetime import datetime
+from app.models.paper import Paper
+from app.services.crawler import _upsert_batch
+from app.services.search import rebuild_search_index, search_papers
+
+ABSTRACT = (
+    "We propose a sparse attention mechanism for long document transformers that scales linearly with "
+    "sequence length and evaluate it on summarization, question answering and retrieval benchmarks."
+)
+
+
+def paper(number: int, title: str, abstract: str) -> dict:
+    return {
+        "title": title,
+        "abstract": abstract,
+        "url": f"http://arxiv.org/abs/2601.{number:05d}v1",
+        "published_date": datetime(2026, 1, number),
+        "authors": [],
+        "source": "arxiv",
+    }
+
+
+def ingest(db) -> dict:
+    url_to_id, _ = _upsert_batch(db, [
+        paper(1, "Sparse attention for long documents", ABSTRACT),
+        paper(2, "Graph neural networks for molecules", "Message passing networks predict molecular properties with attention pooling."),
+        paper(3, "Protein folding benchmarks", "A benchmark suite for structure prediction."),
+    ])
+    db.commit()
+    # 第二版只做了很小的改动，入库时被标记为原论文的近似重复
+    url_to_id.update(_upsert_batch(db, [paper(4, "Sparse attention for long documents", ABSTRACT.replace("benchmarks", "benchmark tasks"))])[0])
+    db.commit()
+    return url_to_id
+
+
+def test_search_ranks_title_matches_and_skips_duplicates(db):
+    ids = ingest(db)
+    duplicate = db.query(Paper).filter(Paper.url.endswith("00004v1")).one()
+    assert duplicate.duplicate_of == ids[paper(1, "", "")["url"]]
+
+    total, hits = search_papers(db, "attention")
+    assert total == 2
+    assert [paper_id for paper_id, _ in hits] == [duplicate.duplicate_of, ids[paper(2, "", "")["url"]]]
+    assert hits[0][1] > hits[1][1]
+    assert search_papers(db, "attention molecules")[0] == 1
+    assert search_papers(db, "\"(*)\"") == (0, [])
+
+
+def test_rebuilt_index_matches_incremental_index(db):
+    ingest(db)
+    incremental = search_papers(db, "sparse attention")
+    rebuild_search_index(db)
+    db.commit()
+    assert search_papers(db, "sparse attention") == incremental
+    assert incremental[0] == 1
+
+
+def test_search_endpoint_pages_results(client, db, signup):
+    ingest(db)
+    assert client.get("/api/v1/papers/search", params={"q": "attention"}).status_code == 401
+    headers = signup("a@example.com")
+    response = client.get("/api/v1/papers/search", params={"q": "attention", "page_size": 1}, headers=headers).json()
+    assert response["total"] == 2
+    assert [item["title"] for item in response["items"]] == ["Sparse attention for long documents"]
+    second = client.get("/api/v1/papers/search", params={"q": "attention", "page": 2, "page_size": 1}, headers=headers).json()
+    assert [item["title"] for item in second["items"]] == ["Graph neural networks for molecules"]
@@ -0,0 +1,89 @@
+from sqlalchemy import event
+from app.db.session import engine
+from app.models.user import User
+from app.services.user_cache import UserCache, user_cache
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def make_user(db, email: str = "a@example.com") -> int:
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def test_hit_does_not_query_and_copies_are_isolated(db):
+    user_id = make_user(db)
+    cache = UserCache(ttl=60)
+    db.expire_all()
+
+    assert cache.get(db, user_id).email == "a@example.com"
+    db.expire_all()
+    with QueryCounter() as counter:
+        user = cache.get(db, user_id)
+    assert counter.count == 0
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # 请求内对副本的修改不影响缓存中的对象
+    user.email = "changed@example.com"
+    db.rollback()
+    assert cache.get(db, user_id).email == "a@example.com"
+    assert cache.get(db, 999) is None
+
+
+def test_entries_expire_after_ttl(db):
+    user_id = make_user(db)
+    cache = UserCache(ttl=0)
+    cache.get(db, user_id)
+    cache.get(db, user_id)
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
+
+
+def test_updating_endpoints_invalidate_cached_user(client, db, signup):
+    headers = signup("a@example.com")
+    user_id = db.query(User.id).filter(User.email == "a@example.com").scalar()
+
+    def fetch(path: str = "/api/v1/users/me") -> tuple[dict, bool]:
+        misses = user_cache.stats()["misses"]
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json(), user_cache.stats()["misses"] > misses
+
+    fetch()
+    body, missed = fetch()
+    assert not missed
+
+    # 绕过接口直接改库时缓存仍返回旧值，说明请求确实命中了缓存
+    db.query(User).filter(User.id == user_id).update({"digest_time": "06:30"})
+    db.commit()
+    body, missed = fetch("/api/v1/users/me/digest-time")
+    assert body["digest_time"] is None and not missed
+    user_cache.invalidate(user_id)
+
+    enabled = fetch()[0]["subscription_enabled"]
+    assert client.post("/api/v1/users/me/subscription-toggle", headers=headers).json()["subscription_enabled"] is not enabled
+    body, missed = fetch()
+    assert missed and body["subscription_enabled"] is not enabled
+
+    response = client.post("/api/v1/users/me/digest-time", json={"digest_time": "07:15", "timezone": "UTC"}, headers=headers)
+    assert response.status_code == 200, response.text
+    body, missed = fetch("/api/v1/users/me/digest-time")
+    assert missed and body["digest_time"] == "07:15" and body["timezone"] == "UTC"
+
+    response = client.post("/api/v1/users/me/profile", json={"keywords": ["graph neural networks"]}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert fetch()[1]